@@ -0,0 +1,200 @@
+"""
+This script compares the throughput of the read endpoints under WSGI with
+the sync views and under ASGI with the async views (ASYNC_VIEWS).
+
+Both servers are started on the configured database, gunicorn with threads
+for WSGI and uvicorn for ASGI, then every endpoint is loaded by each number
+of concurrent clients for a fixed duration. Clients are keep-alive HTTP/1.1
+connections logged in as --email, e.g. a user of user_generation_script.py.
+
+Usage:
+    python -m benchmarks.asgi_benchmark --clients 100 200 --duration 10
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+import http.cookiejar
+import urllib.request
+
+ENDPOINTS = {
+    "friends": "/social/api/v1/friends/",
+    "pending": "/social/api/v1/pending-friend-requests/",
+    "search": "/user/api/v1/search/?q=user_1",
+}
+
+
+def get_server_command(server, port, workers, threads):
+    """
+    Returns the command line starting a server and its settings module.
+    """
+    if server == "wsgi":
+        command = [
+            "gunicorn",
+            "social_networking_app.wsgi:application",
+            "--worker-class=gthread",
+            f"--workers={workers}",
+            f"--threads={threads}",
+            f"--bind=127.0.0.1:{port}",
+            "--log-level=warning",
+        ]
+        return command, "social_networking_app.settings"
+
+    command = [
+        "uvicorn",
+        "social_networking_app.asgi:application",
+        f"--workers={workers}",
+        f"--port={port}",
+        "--log-level=warning",
+        "--no-access-log",
+    ]
+    return command, "benchmarks.asgi_settings"
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not start on port {port}")
+
+
+def log_in(port, email, password):
+    """
+    Logs in through the API and returns the Cookie header of the session.
+    """
+    cookies = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookies))
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/user/api/v1/login/",
+        data=f'{{"email": "{email}", "password": "{password}"}}'.encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    opener.open(request).read()
+    return "; ".join(f"{cookie.name}={cookie.value}" for cookie in cookies)
+
+
+async def read_response(reader):
+    """
+    Reads one HTTP/1.1 response with a Content-Length, returns the status.
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def run_client(port, path, cookie, deadline, latencies, errors):
+    """
+    Sends requests on one keep-alive connection until the deadline.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = (
+        f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n"
+        f"Cookie: {cookie}\r\nConnection: keep-alive\r\n\r\n"
+    ).encode()
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+    except (ConnectionError, asyncio.IncompleteReadError):
+        errors.append("connection")
+    finally:
+        writer.close()
+
+
+async def load(port, path, cookie, clients, duration):
+    """
+    Runs `clients` concurrent clients for `duration` seconds.
+    """
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(
+        *(
+            run_client(port, path, cookie, deadline, latencies, errors)
+            for _ in range(clients)
+        )
+    )
+    return latencies, errors
+
+
+def percentile(sorted_values, percent):
+    index = max(int(len(sorted_values) * percent / 100 + 0.5) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def benchmark_server(server, args):
+    """
+    Starts a server and loads every endpoint with each number of clients.
+    """
+    command, settings_module = get_server_command(
+        server, args.port, args.workers, args.threads
+    )
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    process = subprocess.Popen(command, env=env)
+    try:
+        wait_for_port(args.port)
+        cookie = log_in(args.port, args.email, args.password)
+        for name in args.endpoints:
+            for clients in args.clients:
+                # Warm up connections, caches and indexes
+                asyncio.run(load(args.port, ENDPOINTS[name], cookie, clients, 1))
+                latencies, errors = asyncio.run(
+                    load(args.port, ENDPOINTS[name], cookie, clients, args.duration)
+                )
+                latencies.sort()
+                if not latencies:
+                    print(f"{server} {name} clients={clients} no response")
+                    continue
+                print(
+                    f"{server} {name} clients={clients} "
+                    f"req/s={len(latencies) / args.duration:,.0f} "
+                    f"p50={percentile(latencies, 50) * 1000:.1f}ms "
+                    f"p99={percentile(latencies, 99) * 1000:.1f}ms "
+                    f"errors={len(errors)}",
+                    flush=True,
+                )
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--servers", nargs="+", default=["wsgi", "asgi"])
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS))
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--threads", type=int, default=32, help="Threads per WSGI worker"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--email", default="user_0@example.com")
+    parser.add_argument("--password", default="Test@123")
+    args = parser.parse_args()
+
+    for server in args.servers:
+        if server not in ("wsgi", "asgi"):
+            sys.exit(f"Unknown server {server}, use wsgi or asgi")
+        benchmark_server(server, args)
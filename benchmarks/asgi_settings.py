@@ -0,0 +1,8 @@
+"""
+Settings used by benchmarks.asgi_benchmark for the ASGI server, the project
+settings with the async views enabled.
+"""
+
+from social_networking_app.settings import *  # noqa: F401,F403
+
+ASYNC_VIEWS = True
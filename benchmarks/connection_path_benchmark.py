@@ -0,0 +1,207 @@
+"""
+This script benchmarks the connection path search on synthetic power-law
+friendship graphs.
+
+Each graph is a Chung-Lu random graph whose expected degrees follow a power
+law, as made by user_generation_script.py. Random pairs of users are
+searched with the bidirectional search of the connection path endpoint and,
+for comparison, with a plain breadth-first search from one side. Both read
+the in-memory graph index. With --sql the bidirectional search also runs on
+the Friend table of a throwaway test database, the configured database is
+not touched.
+
+Usage:
+    python -m benchmarks.connection_path_benchmark --users 10000 100000
+"""
+
+import os
+import time
+import random
+import contextlib
+import argparse
+from bisect import bisect_left
+from collections import deque
+from itertools import accumulate
+
+import django
+
+# Set up Django environment
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_networking_app.settings")
+django.setup()
+
+from django.db import connection
+from django.test.utils import override_settings, CaptureQueriesContext
+from django.contrib.auth.models import User
+
+from social_interactions import graph_index
+from social_interactions.models import Friend
+from social_interactions.graph_index import FriendGraphIndex
+from social_interactions.connection_path import (
+    VisitBudgetExceeded,
+    find_connection_path,
+)
+
+
+def generate_graph(num_users, average_degree, exponent, seed):
+    """
+    Returns the sorted (user_id, friend_id) pairs of a Chung-Lu graph, both
+    directions of every friendship included.
+    """
+    rng = random.Random(seed)
+    weights = [(i + 1) ** (-1 / (exponent - 1)) for i in range(num_users)]
+    rng.shuffle(weights)
+    cum_weights = list(accumulate(weights))
+    total = cum_weights[-1]
+
+    edges = set()
+    for _ in range(num_users * average_degree // 2):
+        user1_id = bisect_left(cum_weights, rng.random() * total) + 1
+        user2_id = bisect_left(cum_weights, rng.random() * total) + 1
+        if user1_id != user2_id:
+            edges.add((user1_id, user2_id))
+            edges.add((user2_id, user1_id))
+    return sorted(edges)
+
+
+class CountingIndex(FriendGraphIndex):
+    """
+    Graph index counting the friendships read.
+    """
+
+    reads = 0
+
+    def neighbours_of(self, user_id):
+        friend_ids = super().neighbours_of(user_id)
+        self.reads += len(friend_ids)
+        return friend_ids
+
+
+def breadth_first_search(index, source_id, target_id, max_depth):
+    """
+    Returns the length of a shortest path searched from one side only.
+    """
+    depths = {source_id: 0}
+    queue = deque([source_id])
+    while queue:
+        user_id = queue.popleft()
+        if depths[user_id] == max_depth:
+            break
+        for friend_id in index.neighbours_of(user_id):
+            if friend_id not in depths:
+                depths[friend_id] = depths[user_id] + 1
+                if friend_id == target_id:
+                    return depths[friend_id]
+                queue.append(friend_id)
+    return None
+
+
+def percentile(sorted_values, percent):
+    index = max(int(len(sorted_values) * percent / 100 + 0.5) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def search_pairs(pairs, max_depth, max_visits, count_queries=False):
+    """
+    Runs the bidirectional search for each pair and returns the latencies,
+    path lengths (None if not found, -1 if over budget) and queries run.
+    """
+    latencies, lengths = [], []
+    # Capturing queries opens a connection, which would create the
+    # configured SQLite database when only the index is searched
+    queries = CaptureQueriesContext(connection) if count_queries else []
+    with queries if count_queries else contextlib.nullcontext():
+        for user1_id, user2_id in pairs:
+            started = time.perf_counter()
+            try:
+                path = find_connection_path(
+                    user1_id, user2_id, max_depth=max_depth, max_visits=max_visits
+                )
+                lengths.append(len(path) - 1 if path else None)
+            except VisitBudgetExceeded:
+                lengths.append(-1)
+            latencies.append(time.perf_counter() - started)
+    return latencies, lengths, len(queries)
+
+
+def report(name, latencies, lengths, queries, reads=None):
+    latencies = sorted(latencies)
+    found = [length for length in lengths if length is not None and length >= 0]
+    line = (
+        f"  {name}: found={len(found) / len(lengths):.0%} "
+        f"over_budget={lengths.count(-1) / len(lengths):.0%} "
+        f"avg_degrees={sum(found) / max(len(found), 1):.2f} "
+        f"p50={percentile(latencies, 50) * 1000:.2f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.2f}ms "
+        f"queries/search={queries / len(lengths):.1f}"
+    )
+    if reads is not None:
+        line += f" friendships_read/search={reads / len(lengths):,.0f}"
+    print(line)
+
+
+def run(num_users, args):
+    edges = generate_graph(num_users, args.average_degree, args.exponent, args.seed)
+    index = CountingIndex.from_edges(edges)
+    rng = random.Random(args.seed)
+    pairs = [
+        (rng.randint(1, num_users), rng.randint(1, num_users))
+        for _ in range(args.searches)
+    ]
+    print(f"users={num_users:,} friendships={len(edges) // 2:,}")
+
+    graph_index._index = index
+    try:
+        with override_settings(SOCIAL_GRAPH_INDEX={"ENABLED": True, "MAX_AGE": None}):
+            latencies, lengths, queries = search_pairs(
+                pairs, args.max_depth, args.max_visits
+            )
+    finally:
+        graph_index.reset_friend_graph_index()
+    report("bidirectional, index", latencies, lengths, queries, index.reads)
+
+    index.reads = 0
+    latencies, lengths = [], []
+    for user1_id, user2_id in pairs:
+        started = time.perf_counter()
+        lengths.append(breadth_first_search(index, user1_id, user2_id, args.max_depth))
+        latencies.append(time.perf_counter() - started)
+    report("one-sided, index", latencies, lengths, 0, index.reads)
+
+    if args.sql:
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            User.objects.bulk_create(
+                (User(id=i, username=f"user{i}") for i in range(1, num_users + 1)),
+                batch_size=5000,
+            )
+            Friend.objects.bulk_create(
+                (Friend(friend1_id=u, friend2_id=v) for u, v in edges),
+                batch_size=5000,
+            )
+            with override_settings(SOCIAL_GRAPH_INDEX={"ENABLED": False}):
+                latencies, lengths, queries = search_pairs(
+                    pairs, args.max_depth, args.max_visits, count_queries=True
+                )
+            report("bidirectional, SQL", latencies, lengths, queries)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--average-degree", type=int, default=20)
+    parser.add_argument("--exponent", type=float, default=2.5)
+    parser.add_argument("--searches", type=int, default=1000)
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--max-visits", type=int, default=100000)
+    parser.add_argument(
+        "--sql", action="store_true", help="Also search the Friend table"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for num_users in args.users:
+        run(num_users, args)
@@ -0,0 +1,113 @@
+"""
+This script benchmarks the in-memory friend graph index on synthetic graphs,
+built in memory and mapped from a snapshot file.
+
+Usage:
+    python -m benchmarks.graph_index_benchmark --edges 1000000 10000000
+"""
+
+import os
+import time
+import random
+import argparse
+import tempfile
+
+import django
+
+# Set up Django environment
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_networking_app.settings")
+django.setup()
+
+from social_interactions.graph_index import FriendGraphIndex
+from social_interactions.graph_snapshot import GraphSnapshot, write_snapshot
+
+
+def generate_edges(num_edges, average_degree, seed):
+    """
+    Yields (user_id, friend_id) pairs sorted by user_id, then friend_id.
+    """
+    rng = random.Random(seed)
+    num_users = max(num_edges // average_degree, 1)
+    remaining = num_edges
+    for user_id in range(1, num_users + 1):
+        degree = remaining if user_id == num_users else min(average_degree, remaining)
+        for friend_id in sorted(rng.sample(range(1, num_users + 1), degree)):
+            yield user_id, friend_id
+        remaining -= degree
+
+
+def time_lookups(index, pairs):
+    """
+    Returns the average seconds of `are_friends` and `neighbours_of`.
+    """
+    started = time.perf_counter()
+    for user1_id, user2_id in pairs:
+        index.are_friends(user1_id, user2_id)
+    membership_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for user_id, _ in pairs:
+        index.neighbours_of(user_id)
+    neighbours_seconds = time.perf_counter() - started
+    return membership_seconds / len(pairs), neighbours_seconds / len(pairs)
+
+
+def run(num_edges, average_degree, lookups, seed):
+    """
+    Builds an index with the given number of edges and prints its cost, then
+    does the same for the index mapped from a snapshot of the same graph.
+    """
+    started = time.perf_counter()
+    index = FriendGraphIndex.from_edges(generate_edges(num_edges, average_degree, seed))
+    build_seconds = time.perf_counter() - started
+
+    rng = random.Random(seed)
+    num_users = len(index.user_ids)
+    pairs = [
+        (rng.randint(1, num_users), rng.randint(1, num_users)) for _ in range(lookups)
+    ]
+    membership, neighbours = time_lookups(index, pairs)
+
+    memory = index.memory_usage()
+    print(
+        f"edges={len(index):,} users={num_users:,} "
+        f"build={build_seconds:.1f}s "
+        f"memory={memory / 2**20:.1f}MiB ({memory / len(index):.2f} bytes/edge) "
+        f"are_friends={membership * 1e6:.2f}us "
+        f"neighbours_of={neighbours * 1e6:.2f}us"
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "graph.snapshot")
+        started = time.perf_counter()
+        write_snapshot(path, edges=generate_edges(num_edges, average_degree, seed))
+        write_seconds = time.perf_counter() - started
+
+        for verify in (True, False):
+            started = time.perf_counter()
+            snapshot = GraphSnapshot(path, verify=verify)
+            load_seconds = time.perf_counter() - started
+            mapped = FriendGraphIndex(
+                snapshot.user_ids, snapshot.offsets, snapshot.neighbours
+            )
+            membership, neighbours = time_lookups(mapped, pairs)
+            print(
+                f"snapshot size={os.path.getsize(path) / 2**20:.1f}MiB "
+                f"write={write_seconds:.1f}s verify={verify} "
+                f"load={load_seconds * 1000:.1f}ms "
+                f"are_friends={membership * 1e6:.2f}us "
+                f"neighbours_of={neighbours * 1e6:.2f}us"
+            )
+            del mapped, snapshot
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--edges", type=int, nargs="+", default=[1000000, 10000000])
+    parser.add_argument("--average-degree", type=int, default=50)
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for num_edges in args.edges:
+        run(num_edges, args.average_degree, args.lookups, args.seed)
@@ -0,0 +1,148 @@
+"""
+This script writes a synthetic JSONL request trace for benchmarks.replay,
+using the users and friend requests of the configured database, e.g. as
+created by user_generation_script.py.
+
+The trace mixes signups, logins, searches, friend request actions and list
+reads by random users. Passwords are written as null, the replay fills them
+in with its --password.
+
+Usage:
+    python -m benchmarks.make_trace --requests 10000 > trace.jsonl
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+from urllib.parse import urlencode
+
+import django
+
+# Set up Django environment
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_networking_app.settings")
+django.setup()
+
+from django.db.models import Max
+from django.contrib.auth.models import User
+
+from social_interactions.models import FriendRequest
+
+# Relative frequency of each kind of request
+MIX = {
+    "signup": 1,
+    "login": 2,
+    "search": 10,
+    "autocomplete": 10,
+    "send": 5,
+    "accept": 3,
+    "reject": 1,
+    "friends": 25,
+    "mutual_friends": 8,
+    "pending": 15,
+    "suggestions": 10,
+}
+
+
+def make_entry(kind, rng, users, pending_requests, signups):
+    """
+    Returns a trace entry of the given kind, or None if the database has
+    nothing to build it from.
+    """
+    user_id, email = rng.choice(users)
+    other_id, other_email = rng.choice(users)
+    prefix = email[: rng.randint(3, 8)]
+
+    if kind == "signup":
+        signups[0] += 1
+        name = f"bench_{rng.getrandbits(64):x}_{signups[0]}"
+        data = {"name": name, "email": f"{name}@example.com", "password": None}
+        return {"method": "POST", "path": "/user/api/v1/signup/", "data": data}
+    if kind == "login":
+        data = {"email": email, "password": None}
+        return {"method": "POST", "path": "/user/api/v1/login/", "data": data}
+    if kind == "search":
+        path = "/user/api/v1/search/?" + urlencode({"q": prefix})
+        return {"method": "GET", "path": path, "user": email}
+    if kind == "autocomplete":
+        path = "/user/api/v1/autocomplete/?" + urlencode({"prefix": prefix})
+        return {"method": "GET", "path": path, "user": email}
+    if kind == "send":
+        data = {"action": "send", "friend_id": other_id}
+        return {
+            "method": "POST",
+            "path": "/social/api/v1/friend-request/",
+            "user": email,
+            "data": data,
+        }
+    if kind in ("accept", "reject"):
+        if not pending_requests:
+            return None
+        friend_request_id, to_email = pending_requests.pop()
+        data = {"action": kind, "friend_request_id": friend_request_id}
+        return {
+            "method": "POST",
+            "path": "/social/api/v1/friend-request/",
+            "user": to_email,
+            "data": data,
+        }
+    if kind == "mutual_friends":
+        path = "/social/api/v1/mutual-friends/?" + urlencode({"user_id": other_id})
+        return {"method": "GET", "path": path, "user": email}
+
+    path = {
+        "friends": "/social/api/v1/friends/",
+        "pending": "/social/api/v1/pending-friend-requests/",
+        "suggestions": "/social/api/v1/suggestions/",
+    }[kind]
+    if rng.random() < 0.2:
+        path += "?pagination=cursor"
+    return {"method": "GET", "path": path, "user": email}
+
+
+def make_trace(num_requests, sample_size, seed, out):
+    """
+    Writes `num_requests` entries drawn from the MIX to `out`.
+    """
+    rng = random.Random(seed)
+    max_id = User.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+    sample_ids = rng.sample(range(1, max_id + 1), min(sample_size, max_id))
+    users = list(
+        User.objects.filter(id__in=sample_ids)
+        .order_by("id")
+        .values_list("id", "username")
+    )
+    if len(users) < 2:
+        raise SystemExit("Create some users first, e.g. with user_generation_script.py")
+
+    pending_requests = list(
+        FriendRequest.objects.filter(accepted=False, rejected=False)
+        .order_by("id")
+        .values_list("id", "to_user__username")[:num_requests]
+    )
+    rng.shuffle(pending_requests)
+    kinds, weights = zip(*MIX.items())
+    signups = [0]
+
+    written = 0
+    while written < num_requests:
+        kind = rng.choices(kinds, weights)[0]
+        entry = make_entry(kind, rng, users, pending_requests, signups)
+        if entry is not None:
+            out.write(json.dumps(entry) + "\n")
+            written += 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument(
+        "--users", type=int, default=1000, help="Number of users to sample"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    make_trace(args.requests, args.users, args.seed, sys.stdout)
@@ -0,0 +1,285 @@
+"""
+This script replays a JSONL request trace and reports per-endpoint latency,
+throughput and database queries.
+
+Each line of the trace is a JSON object with the request `method` and
+`path`, and optionally the email of the `user` to authenticate as, a JSON
+`data` body and a `name` to group the request under. Null passwords in the
+body are replaced by --password. Traces are recorded from real traffic with
+TRAFFIC_RECORDER or synthesized with benchmarks.make_trace.
+
+With --target client, requests go through the Django test client against the
+configured database, users are authenticated without a login request and
+queries are counted in process. With --target http://host:port, every user
+logs in once before the replay starts, and queries are read from the
+X-Query-Count header when the server sets QUERY_COUNT_HEADER.
+
+Usage:
+    python -m benchmarks.replay trace.jsonl --concurrency 8
+    python -m benchmarks.replay trace.jsonl --target http://127.0.0.1:8000
+"""
+
+import os
+import json
+import math
+import time
+import argparse
+import threading
+import http.cookiejar
+import urllib.request
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+# Set up Django environment
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_networking_app.settings")
+django.setup()
+
+from django.urls import resolve, Resolver404
+from django.db import connection
+from django.contrib.auth.models import User
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIClient
+
+LOGIN_PATH = "/user/api/v1/login/"
+
+
+def load_trace(path, password):
+    """
+    Reads the trace entries, filling in redacted passwords.
+    """
+    entries = []
+    with open(path) as trace:
+        for line in trace:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            data = entry.get("data")
+            if isinstance(data, dict) and "password" in data:
+                data["password"] = data["password"] or password
+            entry.setdefault("name", get_endpoint_name(entry))
+            entries.append(entry)
+    return entries
+
+
+def get_endpoint_name(entry):
+    """
+    Returns the method and URL name of a request, e.g. "GET friend-list-api".
+    """
+    path = urlsplit(entry["path"]).path
+    try:
+        url_name = resolve(path).url_name or path
+    except Resolver404:
+        url_name = path
+    return f"{entry['method'].upper()} {url_name}"
+
+
+class ClientSession:
+    """
+    Sends requests through the Django test client, one per thread.
+    """
+
+    def __init__(self):
+        self.client = APIClient(raise_request_exception=False)
+        self.users = {}
+        self.current_user = None
+
+    def get_user(self, email):
+        if email not in self.users:
+            self.users[email] = User.objects.get(username=email)
+        return self.users[email]
+
+    def request(self, entry):
+        """
+        Sends a request and returns (status, seconds, queries).
+        """
+        email = entry.get("user")
+        if email != self.current_user:
+            self.client.force_authenticate(self.get_user(email) if email else None)
+            self.current_user = email
+
+        data = entry.get("data")
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = self.client.generic(
+                entry["method"].upper(),
+                entry["path"],
+                json.dumps(data) if data is not None else "",
+                content_type="application/json",
+            )
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, len(queries)
+
+
+class HttpSession:
+    """
+    Sends requests to a running server, keeping a cookie jar per user.
+
+    Users are logged in by `log_in` before the replay starts, the session is
+    then shared by all threads.
+    """
+
+    def __init__(self, base_url, password):
+        self.base_url = base_url.rstrip("/")
+        self.password = password
+        self.openers = {}
+
+    def log_in(self, email):
+        """
+        Creates the opener of a user, logging in unless the email is None.
+        """
+        if email not in self.openers:
+            cookies = http.cookiejar.CookieJar()
+            opener = urllib.request.build_opener(
+                urllib.request.HTTPCookieProcessor(cookies)
+            )
+            opener.cookies = cookies
+            if email:
+                status, _, _ = self.send(
+                    opener,
+                    {
+                        "method": "POST",
+                        "path": LOGIN_PATH,
+                        "data": {"email": email, "password": self.password},
+                    },
+                )
+                if status != 200:
+                    raise RuntimeError(f"Login of {email} failed with status {status}")
+            self.openers[email] = opener
+
+    def send(self, opener, entry):
+        data = entry.get("data")
+        headers = {"Content-Type": "application/json"}
+        for cookie in opener.cookies:
+            if cookie.name == "csrftoken":
+                headers["X-CSRFToken"] = cookie.value
+
+        request = urllib.request.Request(
+            self.base_url + entry["path"],
+            data=json.dumps(data).encode() if data is not None else None,
+            headers=headers,
+            method=entry["method"].upper(),
+        )
+        started = time.perf_counter()
+        try:
+            with opener.open(request) as response:
+                response.read()
+                status, headers = response.status, response.headers
+        except HTTPError as error:
+            error.read()
+            status, headers = error.code, error.headers
+        elapsed = time.perf_counter() - started
+
+        queries = headers.get("X-Query-Count")
+        return status, elapsed, int(queries) if queries is not None else None
+
+    def request(self, entry):
+        """
+        Sends a request and returns (status, seconds, queries).
+        """
+        return self.send(self.openers[entry.get("user")], entry)
+
+
+def percentile(sorted_values, percent):
+    """
+    Returns the nearest-rank percentile of sorted values.
+    """
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def replay(entries, make_session, concurrency):
+    """
+    Replays the entries on `concurrency` threads, each calling `make_session`
+    once to get the session it sends requests with.
+
+    Entries are handed out in trace order. Returns the wall time and a dict of
+    endpoint name to list of (status, seconds, queries).
+    """
+    results = defaultdict(list)
+    lock = threading.Lock()
+    position = iter(range(len(entries)))
+
+    def worker():
+        session = make_session()
+        try:
+            while True:
+                with lock:
+                    index = next(position, None)
+                if index is None:
+                    break
+                entry = entries[index]
+                result = session.request(entry)
+                with lock:
+                    results[entry["name"]].append(result)
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - started
+
+    return wall, results
+
+
+def report(wall, results):
+    """
+    Prints one line of statistics per endpoint and a total.
+    """
+    header = (
+        f"{'endpoint':<40} {'count':>7} {'errors':>6} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'queries':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    rows = sorted(results.items())
+    rows.append(("TOTAL", [result for _, items in rows for result in items]))
+    for name, items in rows:
+        latencies = sorted(elapsed * 1000 for _, elapsed, _ in items)
+        errors = sum(status >= 400 for status, _, _ in items)
+        counted = [queries for _, _, queries in items if queries is not None]
+        queries = f"{sum(counted) / len(counted):.1f}" if counted else "-"
+        print(
+            f"{name:<40} {len(items):>7} {errors:>6} "
+            f"{percentile(latencies, 50):>8.2f} {percentile(latencies, 95):>8.2f} "
+            f"{percentile(latencies, 99):>8.2f} {len(items) / wall:>8.1f} "
+            f"{queries:>7}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("trace")
+    parser.add_argument("--target", default="client")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--password", default="Test@123")
+    args = parser.parse_args()
+
+    entries = load_trace(args.trace, args.password) * args.repeat
+    if not entries:
+        raise SystemExit(f"{args.trace} has no requests")
+
+    if args.target == "client":
+        make_session = ClientSession
+    else:
+        http_session = HttpSession(args.target, args.password)
+        for email in {entry.get("user") for entry in entries}:
+            http_session.log_in(email)
+        make_session = lambda: http_session
+
+    wall, results = replay(entries, make_session, args.concurrency)
+    print(
+        f"Replayed {len(entries)} requests in {wall:.2f}s "
+        f"with concurrency {args.concurrency} against {args.target}"
+    )
+    report(wall, results)
@@ -0,0 +1,120 @@
+"""
+This script compares serializer based and values() based rendering of the
+list endpoints' rows, in rows per second.
+
+The rows are created in a throwaway test database, the configured database
+is not touched.
+
+Usage:
+    python -m benchmarks.serialization_benchmark --page-sizes 10 100 1000
+"""
+
+import os
+import time
+import argparse
+
+import django
+
+# Set up Django environment
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_networking_app.settings")
+django.setup()
+
+from django.db import connection
+from django.contrib.auth.models import User
+
+from rest_framework.renderers import JSONRenderer
+
+from user_operations.serializers import (
+    UserSerializer,
+    USER_VALUE_FIELDS,
+    serialize_users,
+)
+from social_interactions.models import FriendRequest
+from social_interactions.serializers import (
+    FriendRequestSerializer,
+    FRIEND_REQUEST_VALUE_FIELDS,
+    serialize_friend_requests,
+)
+
+
+def create_rows(num_rows):
+    """
+    Creates users and pending friend requests to the first user.
+    """
+    users = User.objects.bulk_create(
+        User(username=f"user{i}", email=f"user{i}@example.com", first_name=f"User {i}")
+        for i in range(num_rows + 1)
+    )
+    FriendRequest.objects.bulk_create(
+        FriendRequest(from_user=user, to_user=users[0]) for user in users[1:]
+    )
+    return users[0]
+
+
+def measure(render, repeat):
+    """
+    Returns the best time of `repeat` runs of `render`.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(page_size, user, repeat):
+    """
+    Renders one page of users and one of friend requests with both paths.
+    """
+    renderer = JSONRenderer()
+    users = User.objects.order_by("email")
+    friend_requests = FriendRequest.objects.filter(to_user=user).order_by(
+        "-created_at", "id"
+    )
+
+    cases = {
+        "users": (
+            lambda: renderer.render(UserSerializer(users[:page_size], many=True).data),
+            lambda: renderer.render(
+                serialize_users(users.values(*USER_VALUE_FIELDS)[:page_size])
+            ),
+        ),
+        "friend_requests": (
+            lambda: renderer.render(
+                FriendRequestSerializer(friend_requests[:page_size], many=True).data
+            ),
+            lambda: renderer.render(
+                serialize_friend_requests(
+                    friend_requests.values(*FRIEND_REQUEST_VALUE_FIELDS)[:page_size]
+                )
+            ),
+        ),
+    }
+    for name, (serializer_render, values_render) in cases.items():
+        assert serializer_render() == values_render()
+        before = measure(serializer_render, repeat)
+        after = measure(values_render, repeat)
+        print(
+            f"{name} page_size={page_size} "
+            f"serializer={page_size / before:,.0f} rows/s "
+            f"values={page_size / after:,.0f} rows/s "
+            f"speedup={before / after:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        user = create_rows(max(args.page_sizes))
+        for page_size in args.page_sizes:
+            run(page_size, user, args.repeat)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
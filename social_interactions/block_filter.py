@@ -0,0 +1,298 @@
+import math
+import time
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.core.cache import caches
+
+from utitlities.metrics import get_metrics
+
+from .models import Block
+
+GENERATION_KEY = "block_filter_generation"
+
+# Blocks created this many seconds before a delta load are read again, to
+# catch transactions that committed after it started
+DELTA_OVERLAP = 300
+
+
+def record_check(result):
+    get_metrics().increment("block_filter_checks_total", result=result)
+
+
+class BloomFilter:
+    """
+    Set of byte strings that answers "maybe present" or "definitely absent".
+
+    Sized for `capacity` items at a false positive rate of `error_rate`,
+    which costs about 9.6 bits per item at 1%. Items cannot be removed.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.num_bits = max(
+            math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2), 64
+        )
+        self.num_hashes = max(round(self.num_bits / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing, two 64-bit halves of one digest give every position
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        hash1, hash2 = struct.unpack("<QQ", digest)
+        for i in range(self.num_hashes):
+            yield (hash1 + i * hash2) % self.num_bits
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def memory_usage(self):
+        """
+        Returns the size in bytes of the bit array.
+        """
+        return len(self.bits)
+
+
+def user_key(user_id):
+    return struct.pack("<q", user_id)
+
+
+def pair_key(user1_id, user2_id):
+    return struct.pack("<qq", min(user1_id, user2_id), max(user1_id, user2_id))
+
+
+def load_blocked_ids(user_id):
+    """
+    Returns the ids of the users a user blocked or was blocked by.
+    """
+    blocked_ids = set()
+    for blocker_id, blocked_id in Block.objects.filter(
+        Q(blocker_id=user_id) | Q(blocked_id=user_id)
+    ).values_list("blocker_id", "blocked_id"):
+        blocked_ids.add(blocked_id if blocker_id == user_id else blocker_id)
+    return frozenset(blocked_ids)
+
+
+class BlockFilter:
+    """
+    In-memory filter of the blocks between users, in either direction.
+
+    Two bloom filters hold the users involved in any block and the blocked
+    pairs. Most users have no blocks, so most checks end at a negative
+    answer without a query. A positive answer is confirmed against the
+    user's exact block set, read with one query and kept in a size-bounded
+    LRU until the blocks change.
+
+    Unblocks cannot be removed from the bloom filters, they only cost false
+    positives until the next rebuild.
+    """
+
+    def __init__(self, capacity, error_rate=0.01, exact_max_entries=10000):
+        self.capacity = capacity
+        # Every block adds up to two users
+        self.users = BloomFilter(capacity * 2, error_rate)
+        self.pairs = BloomFilter(capacity, error_rate)
+        self.exact_max_entries = exact_max_entries
+        self.count = 0
+        self.generation = None
+        self.loaded_at = None
+        self.built_at = time.monotonic()
+        self._exact = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, capacity, error_rate=0.01, exact_max_entries=10000):
+        """
+        Builds the filter from the Block table with one streamed query, sized
+        for twice the current blocks or `capacity`, whichever is larger.
+        """
+        block_filter = cls(
+            max(capacity, Block.objects.count() * 2), error_rate, exact_max_entries
+        )
+        block_filter.load_delta(since=None)
+        return block_filter
+
+    def add_block(self, blocker_id, blocked_id):
+        key = pair_key(blocker_id, blocked_id)
+        # Blocks read again by an overlapping delta load, or mutual ones, are
+        # not counted twice. `count` is approximate, as a false positive on
+        # a new pair also leaves it unchanged, but every key is always set.
+        if key not in self.pairs:
+            self.count += 1
+        self.users.add(user_key(blocker_id))
+        self.users.add(user_key(blocked_id))
+        self.pairs.add(key)
+
+    def load_delta(self, since=DELTA_OVERLAP):
+        """
+        Adds the blocks created in the `since` seconds before the last load,
+        or all of them if `since` is None, and drops the exact block sets.
+        """
+        loaded_at = timezone.now()
+        blocks = Block.objects.all()
+        if since is not None and self.loaded_at is not None:
+            blocks = blocks.filter(
+                created_at__gte=self.loaded_at - timedelta(seconds=since)
+            )
+        for blocker_id, blocked_id in blocks.values_list(
+            "blocker_id", "blocked_id"
+        ).iterator():
+            self.add_block(blocker_id, blocked_id)
+        self.loaded_at = loaded_at
+        with self._lock:
+            self._exact.clear()
+
+    def may_have_blocks(self, user_id):
+        """
+        Checks if a user might have blocked or been blocked by anyone.
+        """
+        return user_key(user_id) in self.users
+
+    def get_blocked_ids(self, user_id):
+        """
+        Returns the ids of the users a user blocked or was blocked by.
+        """
+        if not self.may_have_blocks(user_id):
+            return frozenset()
+
+        generation = self.generation
+        with self._lock:
+            entry = self._exact.get(user_id)
+            if entry is not None and entry[0] == generation:
+                self._exact.move_to_end(user_id)
+                return entry[1]
+
+        blocked_ids = load_blocked_ids(user_id)
+        with self._lock:
+            self._exact[user_id] = (generation, blocked_ids)
+            self._exact.move_to_end(user_id)
+            while len(self._exact) > self.exact_max_entries:
+                self._exact.popitem(last=False)
+        return blocked_ids
+
+    def is_blocked(self, user1_id, user2_id):
+        """
+        Checks if either user blocked the other.
+        """
+        if pair_key(user1_id, user2_id) not in self.pairs:
+            record_check("negative")
+            return False
+        if user2_id in self.get_blocked_ids(user1_id):
+            record_check("blocked")
+            return True
+        record_check("false_positive")
+        return False
+
+    @property
+    def is_full(self):
+        """
+        Checks if the filter holds more blocks than it was sized for, which
+        raises its false positive rate.
+        """
+        return self.count > self.capacity
+
+    @property
+    def age(self):
+        """
+        Seconds since the filter was built.
+        """
+        return time.monotonic() - self.built_at
+
+    def memory_usage(self):
+        """
+        Returns the size in bytes of the bloom filters.
+        """
+        return self.users.memory_usage() + self.pairs.memory_usage()
+
+
+_filter = None
+_filter_lock = threading.Lock()
+
+
+def get_generation(cache):
+    """
+    Returns the current block generation from the shared cache.
+    """
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Start from a value never used before, like the friend list versions
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def get_block_filter():
+    """
+    Returns the process-wide block filter, or None if it is disabled.
+
+    Every block or unblock bumps a generation in the shared cache. When it
+    differs from the one the filter was loaded at, the blocks created since
+    the last load are added before the filter is used, so blocks made by
+    other worker processes apply at once. The filter is rebuilt once it is
+    older than `BLOCK_FILTER["MAX_AGE"]` seconds, dropping unblocked pairs,
+    or holds more blocks than it was sized for.
+    """
+    global _filter
+
+    config = settings.BLOCK_FILTER
+    if not config.get("ENABLED"):
+        return None
+
+    generation = get_generation(caches[config.get("CACHE", "default")])
+    block_filter = _filter
+    max_age = config.get("MAX_AGE")
+    stale = block_filter is None or (
+        block_filter.is_full or (max_age is not None and block_filter.age > max_age)
+    )
+    if stale or block_filter.generation != generation:
+        with _filter_lock:
+            if _filter is block_filter:
+                if stale:
+                    block_filter = BlockFilter.build(
+                        config.get("CAPACITY", 100000),
+                        config.get("ERROR_RATE", 0.01),
+                        config.get("EXACT_MAX_ENTRIES", 10000),
+                    )
+                else:
+                    block_filter.load_delta()
+                block_filter.generation = generation
+                _filter = block_filter
+
+    return _filter
+
+
+def bump_generation():
+    """
+    Makes every process reload the blocks before its next check. Call once
+    a block or unblock is committed.
+    """
+    config = settings.BLOCK_FILTER
+    if not config.get("ENABLED"):
+        return
+
+    cache = caches[config.get("CACHE", "default")]
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def reset_block_filter():
+    """
+    Drops the process-wide filter, it is rebuilt on next use.
+    """
+    global _filter
+    _filter = None
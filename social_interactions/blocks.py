@@ -0,0 +1,77 @@
+from django.db.models import Q
+
+from .models import Block
+from .block_filter import get_block_filter, load_blocked_ids
+
+
+def is_blocked(user1_id, user2_id):
+    """
+    Checks if either user blocked the other, using the block filter when
+    enabled.
+    """
+    block_filter = get_block_filter()
+    if block_filter is not None:
+        return block_filter.is_blocked(user1_id, user2_id)
+    return Block.objects.filter(
+        Q(blocker_id=user1_id, blocked_id=user2_id)
+        | Q(blocker_id=user2_id, blocked_id=user1_id)
+    ).exists()
+
+
+def get_blocked_ids(user_id):
+    """
+    Returns the frozenset of ids of the users a user blocked or was blocked by.
+    """
+    block_filter = get_block_filter()
+    if block_filter is not None:
+        return block_filter.get_blocked_ids(user_id)
+    return load_blocked_ids(user_id)
+
+
+def get_blocked_among(user_id, candidate_ids):
+    """
+    Returns the set of candidate user ids blocked by or blocking a user.
+    """
+    block_filter = get_block_filter()
+    if block_filter is not None:
+        return {
+            candidate_id
+            for candidate_id in candidate_ids
+            if block_filter.is_blocked(user_id, candidate_id)
+        }
+    return get_blocked_ids(user_id).intersection(candidate_ids)
+
+
+def exclude_blocked(users_queryset, user_id):
+    """
+    Excludes the users blocked by or blocking a user from a User queryset,
+    with subqueries of the same query. Left as is when the block filter
+    knows the user has no blocks.
+    """
+    block_filter = get_block_filter()
+    if block_filter is not None and not block_filter.may_have_blocks(user_id):
+        return users_queryset
+    return users_queryset.exclude(
+        Q(id__in=Block.objects.filter(blocker_id=user_id).values("blocked_id"))
+        | Q(id__in=Block.objects.filter(blocked_id=user_id).values("blocker_id"))
+    )
+
+
+def block_user(blocker_id, blocked_id):
+    """
+    Blocks a user. Returns False if they were already blocked.
+    """
+    _, created = Block.objects.get_or_create(
+        blocker_id=blocker_id, blocked_id=blocked_id
+    )
+    return created
+
+
+def unblock_user(blocker_id, blocked_id):
+    """
+    Unblocks a user. Returns False if they were not blocked.
+    """
+    deleted, _ = Block.objects.filter(
+        blocker_id=blocker_id, blocked_id=blocked_id
+    ).delete()
+    return bool(deleted)
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Cache backends whose entries are private to each process
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register()
+def check_block_filter_cache(app_configs, **kwargs):
+    """
+    Rejects a block filter whose generation is kept in a per-process cache,
+    as blocks made on one worker would not reach the others.
+    """
+    config = settings.BLOCK_FILTER
+    if not config.get("ENABLED"):
+        return []
+
+    alias = config.get("CACHE", "default")
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if backend in PROCESS_LOCAL_CACHES:
+        return [
+            Error(
+                f'BLOCK_FILTER needs a cache shared by all workers, "{alias}" '
+                f"uses {backend}.",
+                hint=(
+                    "Use a shared backend such as RedisCache, or disable "
+                    "BLOCK_FILTER. A single-process server can silence this "
+                    "check with SILENCED_SYSTEM_CHECKS."
+                ),
+                id="social_interactions.E001",
+            )
+        ]
+    return []
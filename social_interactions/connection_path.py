@@ -0,0 +1,115 @@
+from django.db import connection
+
+from .models import Friend
+from .graph_index import get_friend_graph_index
+
+
+class VisitBudgetExceeded(Exception):
+    """
+    Raised when a search examines more friendships than its budget allows.
+    """
+
+
+def fetch_neighbours(user_ids, budget):
+    """
+    Returns the friend ids of each of `user_ids` and the budget left.
+
+    Reads the graph index when enabled, otherwise the Friend table with one
+    query per level, split only where the database limits the number of
+    query parameters. Every friendship read counts against `budget`, the
+    query stops one row past it so that a hub user cannot make it read
+    its whole friend list.
+    """
+    neighbours = {}
+    index = get_friend_graph_index()
+    if index is not None:
+        for user_id in user_ids:
+            friend_ids = index.neighbours_of(user_id)
+            budget -= len(friend_ids)
+            if budget < 0:
+                raise VisitBudgetExceeded
+            neighbours[user_id] = friend_ids
+        return neighbours, budget
+
+    user_ids = list(user_ids)
+    batch_size = connection.features.max_query_params or len(user_ids)
+    for start in range(0, len(user_ids), batch_size):
+        rows = Friend.objects.filter(
+            friend1_id__in=user_ids[start : start + batch_size]
+        ).values_list("friend1_id", "friend2_id")[: budget + 1]
+        for user_id, friend_id in rows:
+            neighbours.setdefault(user_id, []).append(friend_id)
+            budget -= 1
+        if budget < 0:
+            raise VisitBudgetExceeded
+    return neighbours, budget
+
+
+def build_path(meeting_id, forward_parents, backward_parents):
+    path = []
+    user_id = meeting_id
+    while user_id is not None:
+        path.append(user_id)
+        user_id = forward_parents[user_id]
+    path.reverse()
+    user_id = backward_parents[meeting_id]
+    while user_id is not None:
+        path.append(user_id)
+        user_id = backward_parents[user_id]
+    return path
+
+
+def find_connection_path(source_id, target_id, max_depth=6, max_visits=100000):
+    """
+    Returns the user ids of a shortest friendship path from `source_id` to
+    `target_id`, both included, or None if there is none of at most
+    `max_depth` friendships.
+
+    Runs a breadth-first search from both users, always expanding the
+    smaller frontier by one level, and stops as soon as the two searches
+    meet. Raises VisitBudgetExceeded once more than `max_visits`
+    friendships have been read.
+    """
+    if source_id == target_id:
+        return [source_id]
+
+    forward_parents = {source_id: None}
+    backward_parents = {target_id: None}
+    forward_frontier = [source_id]
+    backward_frontier = [target_id]
+    budget = max_visits
+    depth = 0
+
+    while forward_frontier and backward_frontier and depth < max_depth:
+        # Expanding the smaller side keeps both searches shallow
+        if len(forward_frontier) > len(backward_frontier):
+            forward_frontier, backward_frontier = backward_frontier, forward_frontier
+            forward_parents, backward_parents = backward_parents, forward_parents
+            reversed_sides = True
+        else:
+            reversed_sides = False
+
+        neighbours, budget = fetch_neighbours(forward_frontier, budget)
+        next_frontier = []
+        meeting_id = None
+        for user_id in forward_frontier:
+            for friend_id in neighbours.get(user_id, ()):
+                if friend_id in forward_parents:
+                    continue
+                forward_parents[friend_id] = user_id
+                if friend_id in backward_parents:
+                    meeting_id = friend_id
+                    break
+                next_frontier.append(friend_id)
+            if meeting_id is not None:
+                break
+
+        forward_frontier = next_frontier
+        if reversed_sides:
+            forward_frontier, backward_frontier = backward_frontier, forward_frontier
+            forward_parents, backward_parents = backward_parents, forward_parents
+        if meeting_id is not None:
+            return build_path(meeting_id, forward_parents, backward_parents)
+        depth += 1
+
+    return None
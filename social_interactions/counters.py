@@ -0,0 +1,193 @@
+from django.db import transaction
+from django.db.models import F, Count
+from django.contrib.auth.models import User
+
+from .models import Friend, FriendRequest, SocialCounter
+
+COUNTER_FIELDS = ("friends", "incoming_pending", "outgoing_pending")
+
+
+def adjust_counters(deltas):
+    """
+    Applies counter changes, given as {user_id: {field: delta}}.
+
+    Missing counter rows are created first, then users sharing the same
+    changes are updated together with F() expressions, so concurrent
+    requests never overwrite each other. The rows of several users are
+    locked in user id order first, so that requests touching the same users
+    in opposite roles, such as A to B and B to A, cannot deadlock. Call
+    inside the transaction that makes the change being counted.
+    """
+    deltas = {
+        user_id: {field: delta for field, delta in changes.items() if delta}
+        for user_id, changes in deltas.items()
+    }
+    deltas = {user_id: changes for user_id, changes in deltas.items() if changes}
+    if not deltas:
+        return
+
+    user_ids = sorted(deltas)
+    SocialCounter.objects.bulk_create(
+        [SocialCounter(user_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+    if len(user_ids) > 1:
+        list(
+            SocialCounter.objects.select_for_update()
+            .filter(user_id__in=user_ids)
+            .order_by("user_id")
+            .values_list("user_id", flat=True)
+        )
+
+    groups = {}
+    for user_id, changes in deltas.items():
+        groups.setdefault(tuple(sorted(changes.items())), []).append(user_id)
+
+    for changes, user_ids in groups.items():
+        SocialCounter.objects.filter(user_id__in=user_ids).update(
+            **{field: F(field) + delta for field, delta in changes}
+        )
+
+
+def get_counters(user_id):
+    """
+    Returns the counters of a user.
+    """
+    counters = (
+        SocialCounter.objects.filter(user_id=user_id).values(*COUNTER_FIELDS).first()
+    )
+    return counters or dict.fromkeys(COUNTER_FIELDS, 0)
+
+
+async def aget_counters(user_id):
+    """
+    Async counterpart of `get_counters`.
+    """
+    counters = (
+        await SocialCounter.objects.filter(user_id=user_id)
+        .values(*COUNTER_FIELDS)
+        .afirst()
+    )
+    return counters or dict.fromkeys(COUNTER_FIELDS, 0)
+
+
+def count_actual(user_ids):
+    """
+    Counts friends and pending requests of the given users from the source
+    tables. Returns {user_id: {field: count}}.
+    """
+    counts = {user_id: dict.fromkeys(COUNTER_FIELDS, 0) for user_id in user_ids}
+    pending = FriendRequest.objects.filter(accepted=False, rejected=False)
+
+    for field, queryset, user_field in (
+        ("friends", Friend.objects.filter(friend1_id__in=user_ids), "friend1_id"),
+        ("incoming_pending", pending.filter(to_user_id__in=user_ids), "to_user_id"),
+        ("outgoing_pending", pending.filter(from_user_id__in=user_ids), "from_user_id"),
+    ):
+        for user_id, count in (
+            queryset.order_by()
+            .values(user_field)
+            .annotate(count=Count("pk"))
+            .values_list(user_field, "count")
+        ):
+            counts[user_id][field] = count
+
+    return counts
+
+
+def reconcile_counters(chunk_size=1000, progress=None):
+    """
+    Recounts the counters of every user and repairs the ones that drifted.
+
+    Users are walked in id order in chunks, each in its own transaction. The
+    chunk's counters are locked before recounting, so friend requests
+    handled meanwhile wait for the repair and apply their F() changes on top
+    of it instead of being overwritten. Returns the number of users whose
+    counters were repaired.
+    """
+    repaired = 0
+    checked = 0
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            break
+
+        with transaction.atomic():
+            # Every user gets a row to lock, like in adjust_counters
+            SocialCounter.objects.bulk_create(
+                [SocialCounter(user_id=user_id) for user_id in user_ids],
+                ignore_conflicts=True,
+            )
+            stored = list(
+                SocialCounter.objects.select_for_update().filter(user_id__in=user_ids)
+            )
+            actual = count_actual(user_ids)
+
+            to_update = []
+            for counter in stored:
+                counts = actual[counter.pk]
+                if any(getattr(counter, field) != counts[field] for field in counts):
+                    for field, count in counts.items():
+                        setattr(counter, field, count)
+                    to_update.append(counter)
+            SocialCounter.objects.bulk_update(to_update, COUNTER_FIELDS)
+
+        repaired += len(to_update)
+        checked += len(user_ids)
+        last_id = user_ids[-1]
+        if progress is not None:
+            progress(checked, repaired)
+
+    return repaired
+
+
+def record_requests_sent(user_id_pairs):
+    """
+    Counts new pending friend requests, given as (from_user_id, to_user_id).
+    """
+    deltas = {}
+    for from_user_id, to_user_id in user_id_pairs:
+        _add(deltas, from_user_id, "outgoing_pending", 1)
+        _add(deltas, to_user_id, "incoming_pending", 1)
+    adjust_counters(deltas)
+
+
+def record_requests_resolved(user_id_pairs):
+    """
+    Counts pending friend requests, given as (from_user_id, to_user_id), that
+    were rejected or expired.
+    """
+    deltas = {}
+    _add_resolved(deltas, user_id_pairs)
+    adjust_counters(deltas)
+
+
+def record_requests_accepted(pending_pairs, new_friendship_pairs):
+    """
+    Counts accepted friend requests. The `pending_pairs` stop being pending,
+    and only the `new_friendship_pairs` actually stored are counted as
+    friends, as the users may already be friends through a request in the
+    other direction.
+    """
+    deltas = {}
+    _add_resolved(deltas, pending_pairs)
+    for user1_id, user2_id in new_friendship_pairs:
+        _add(deltas, user1_id, "friends", 1)
+        _add(deltas, user2_id, "friends", 1)
+    adjust_counters(deltas)
+
+
+def _add_resolved(deltas, user_id_pairs):
+    for from_user_id, to_user_id in user_id_pairs:
+        _add(deltas, from_user_id, "outgoing_pending", -1)
+        _add(deltas, to_user_id, "incoming_pending", -1)
+
+
+def _add(deltas, user_id, field, delta):
+    changes = deltas.setdefault(user_id, {})
+    changes[field] = changes.get(field, 0) + delta
@@ -0,0 +1,158 @@
+import time
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from utitlities.metrics import get_metrics
+
+
+def record_lookup(result):
+    get_metrics().increment("cache_requests_total", cache="friend_list", result=result)
+
+
+class FriendListCache:
+    """
+    Two-tier cache of friend list pages, versioned per user.
+
+    Pages are keyed by user, the user's friend list version and the page URL.
+    The version lives in the shared Django cache and is bumped whenever the
+    user's friendships change, so pages cached under an older version are
+    never read again and simply expire. Each process keeps the most recently
+    used pages in a size-bounded LRU in front of the shared cache, but always
+    reads the current version from the shared cache first.
+    """
+
+    def __init__(self, cache_alias="default", ttl=300, local_max_entries=10000):
+        self.cache = caches[cache_alias]
+        self.ttl = ttl
+        self.local_max_entries = local_max_entries
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _version_key(user_id):
+        return f"friend_list_version:{user_id}"
+
+    def get_version(self, user_id):
+        """
+        Returns the current friend list version of a user.
+        """
+        version = self.cache.get(self._version_key(user_id))
+        if version is None:
+            # Start from a value never used before, so pages cached under a
+            # version that was evicted from the cache cannot be read again
+            self.cache.add(self._version_key(user_id), time.time_ns(), timeout=None)
+            version = self.cache.get(self._version_key(user_id))
+        return version
+
+    def bump_version(self, user_id):
+        """
+        Invalidates every cached page of a user's friend list.
+        """
+        try:
+            self.cache.incr(self._version_key(user_id))
+        except ValueError:
+            self.cache.add(self._version_key(user_id), time.time_ns(), timeout=None)
+
+    def get(self, user_id, version, page_key):
+        """
+        Returns a cached page, or None.
+        """
+        key = f"friend_list:{user_id}:{version}:{page_key}"
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None and entry[0] > now:
+                self._local.move_to_end(key)
+                self.local_hits += 1
+                record_lookup("local_hit")
+                return entry[1]
+
+        data = self.cache.get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                record_lookup("miss")
+                return None
+            self.shared_hits += 1
+            self._store_local(key, data, now)
+        record_lookup("shared_hit")
+        return data
+
+    def set(self, user_id, version, page_key, data):
+        """
+        Caches a page computed for the given friend list version.
+        """
+        key = f"friend_list:{user_id}:{version}:{page_key}"
+        self.cache.set(key, data, timeout=self.ttl)
+        with self._lock:
+            self._store_local(key, data, time.monotonic())
+
+    def _store_local(self, key, data, now):
+        self._local[key] = (now + self.ttl, data)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_max_entries:
+            self._local.popitem(last=False)
+
+    def stats(self):
+        """
+        Returns hit and miss counts of this process.
+        """
+        with self._lock:
+            return {
+                "local_hits": self.local_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "local_entries": len(self._local),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_friend_list_cache():
+    """
+    Returns the process-wide friend list cache, or None if it is disabled.
+    """
+    global _cache
+
+    config = settings.FRIEND_LIST_CACHE
+    if not config.get("ENABLED"):
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = FriendListCache(
+                    cache_alias=config.get("CACHE", "default"),
+                    ttl=config.get("TTL", 300),
+                    local_max_entries=config.get("LOCAL_MAX_ENTRIES", 10000),
+                )
+    return _cache
+
+
+def invalidate_friend_lists(user_ids):
+    """
+    Bumps the friend list version of users whose friendships changed.
+    """
+    if not settings.FRIEND_LIST_CACHE.get("ENABLED"):
+        return
+
+    friend_list_cache = get_friend_list_cache()
+    for user_id in set(user_ids):
+        friend_list_cache.bump_version(user_id)
+
+
+def reset_friend_list_cache():
+    """
+    Drops the process-wide cache object, its local tier included.
+    """
+    global _cache
+    _cache = None
@@ -0,0 +1,139 @@
+from bisect import bisect_left
+
+from django.db import transaction
+
+from .models import Friend
+from .graph_index import get_friend_graph_index, record_friendship
+from .friend_list_cache import invalidate_friend_lists
+
+
+def are_friends(user1_id, user2_id):
+    """
+    Checks if two users are friends, using the graph index when enabled.
+    """
+    index = get_friend_graph_index()
+    if index is not None:
+        return index.are_friends(user1_id, user2_id)
+    return Friend.objects.are_friends(user1_id, user2_id)
+
+
+def get_friend_ids(user_id):
+    """
+    Returns the friend ids of a user for use in an `id__in` filter.
+
+    With the graph index enabled this is a sorted list read from memory,
+    otherwise a lazy queryset that is evaluated as a subquery.
+    """
+    index = get_friend_graph_index()
+    if index is not None:
+        return index.neighbours_of(user_id)
+    return Friend.objects.friend_ids(user_id)
+
+
+def get_sorted_friend_ids(*user_ids):
+    """
+    Returns the sorted friend id lists of the given users, in the same order.
+
+    All lists are read with a single query when the graph index is disabled.
+    """
+    index = get_friend_graph_index()
+    if index is not None:
+        return [index.neighbours_of(user_id) for user_id in user_ids]
+
+    friend_ids = {user_id: [] for user_id in user_ids}
+    for user_id, friend_id in (
+        Friend.objects.filter(friend1_id__in=user_ids)
+        .order_by("friend1_id", "friend2_id")
+        .values_list("friend1_id", "friend2_id")
+    ):
+        friend_ids[user_id].append(friend_id)
+    return [friend_ids[user_id] for user_id in user_ids]
+
+
+def intersect_sorted(ids1, ids2):
+    """
+    Returns the sorted intersection of two sorted id lists.
+
+    Walks both lists in step, or binary searches the longer list for each id
+    of the shorter one when their sizes are far apart.
+    """
+    if len(ids1) > len(ids2):
+        ids1, ids2 = ids2, ids1
+
+    if len(ids1) * 16 < len(ids2):
+        common = []
+        position = 0
+        for value in ids1:
+            position = bisect_left(ids2, value, position)
+            if position == len(ids2):
+                break
+            if ids2[position] == value:
+                common.append(value)
+        return common
+
+    common = []
+    i = j = 0
+    while i < len(ids1) and j < len(ids2):
+        if ids1[i] < ids2[j]:
+            i += 1
+        elif ids1[i] > ids2[j]:
+            j += 1
+        else:
+            common.append(ids1[i])
+            i += 1
+            j += 1
+    return common
+
+
+def get_mutual_friend_ids(user1_id, user2_id):
+    """
+    Returns the sorted ids of the friends two users have in common.
+    """
+    return intersect_sorted(*get_sorted_friend_ids(user1_id, user2_id))
+
+
+def get_friends_among(user_id, candidate_ids):
+    """
+    Returns the set of candidate user ids that are friends of a user.
+    """
+    index = get_friend_graph_index()
+    if index is not None:
+        return {
+            candidate_id
+            for candidate_id in candidate_ids
+            if index.are_friends(user_id, candidate_id)
+        }
+    return set(Friend.objects.friend_ids(user_id).filter(friend2_id__in=candidate_ids))
+
+
+def create_friendships(user_id_pairs):
+    """
+    Stores friendships between pairs of user ids. Once committed, they are
+    added to the graph index and the users' cached friend lists are dropped.
+
+    Returns the pairs that were not friends yet, for the friend counters.
+    Call inside the transaction that locks the friend requests being
+    accepted.
+    """
+    user_id_pairs = list(dict.fromkeys(user_id_pairs))
+    if not user_id_pairs:
+        return []
+
+    existing = set(
+        Friend.objects.filter(
+            friend1_id__in={user1_id for user1_id, _ in user_id_pairs},
+            friend2_id__in={user2_id for _, user2_id in user_id_pairs},
+        ).values_list("friend1_id", "friend2_id")
+    )
+    user_id_pairs = [pair for pair in user_id_pairs if pair not in existing]
+    Friend.objects.create_friendships(user_id_pairs)
+
+    def record_friendships():
+        for user1_id, user2_id in user_id_pairs:
+            record_friendship(user1_id, user2_id)
+        invalidate_friend_lists(
+            user_id for user_id_pair in user_id_pairs for user_id in user_id_pair
+        )
+
+    transaction.on_commit(record_friendships)
+    return user_id_pairs
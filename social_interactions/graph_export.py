@@ -0,0 +1,203 @@
+import csv
+import json
+import zlib
+from io import StringIO
+from datetime import timezone as dt_timezone
+
+from django.utils import timezone
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Friend, FriendRequest
+
+# Columns of every exported record, in CSV column order
+EXPORT_FIELDS = [
+    "type",
+    "id",
+    "user1",
+    "user2",
+    "status",
+    "created_at",
+    "accepted_at",
+    "rejected_at",
+]
+
+# Bytes gathered before a chunk is handed to the response or file
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
+
+def format_datetime(value):
+    return value.isoformat() if value is not None else None
+
+
+def parse_since(value):
+    """
+    Returns the aware datetime of an ISO 8601 timestamp, naive ones are taken
+    as UTC. Raises ValueError if it is not a timestamp.
+    """
+    since = parse_datetime(value)
+    if since is None:
+        raise ValueError(f"Invalid timestamp: {value}")
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, dt_timezone.utc)
+    return since
+
+
+def get_request_status(accepted, rejected):
+    if accepted:
+        return "accepted"
+    if rejected:
+        return "rejected"
+    return "pending"
+
+
+def iter_friendships(since=None, chunk_size=5000):
+    """
+    Yields a record per friendship, created at or after `since` if given.
+
+    Friendships are stored as two mirrored rows, only the one with the
+    smaller user id first is exported.
+    """
+    friends = Friend.objects.filter(friend1_id__lt=F("friend2_id"))
+    if since is not None:
+        friends = friends.filter(created_at__gte=since)
+    rows = (
+        friends.order_by("id")
+        .values_list("friend1_id", "friend2_id", "created_at")
+        .iterator(chunk_size=chunk_size)
+    )
+    for friend1_id, friend2_id, created_at in rows:
+        yield {
+            "type": "friend",
+            "id": None,
+            "user1": friend1_id,
+            "user2": friend2_id,
+            "status": "friends",
+            "created_at": format_datetime(created_at),
+            "accepted_at": None,
+            "rejected_at": None,
+        }
+
+
+def iter_friend_requests(since=None, chunk_size=5000):
+    """
+    Yields a record per friend request, sent, accepted or rejected at or
+    after `since` if given.
+    """
+    friend_requests = FriendRequest.objects.all()
+    if since is not None:
+        friend_requests = friend_requests.filter(
+            Q(created_at__gte=since)
+            | Q(accepted_at__gte=since)
+            | Q(rejected_at__gte=since)
+        )
+    rows = (
+        friend_requests.order_by("id")
+        .values_list(
+            "id",
+            "from_user_id",
+            "to_user_id",
+            "accepted",
+            "rejected",
+            "created_at",
+            "accepted_at",
+            "rejected_at",
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        request_id, from_user_id, to_user_id, accepted, rejected = row[:5]
+        created_at, accepted_at, rejected_at = row[5:]
+        yield {
+            "type": "friend_request",
+            "id": request_id,
+            "user1": from_user_id,
+            "user2": to_user_id,
+            "status": get_request_status(accepted, rejected),
+            "created_at": format_datetime(created_at),
+            "accepted_at": format_datetime(accepted_at),
+            "rejected_at": format_datetime(rejected_at),
+        }
+
+
+def iter_records(include=("friends", "requests"), since=None, chunk_size=5000):
+    """
+    Yields the friendship and friend request records to export. Rows are
+    fetched `chunk_size` at a time, with a server-side cursor where the
+    database supports it, so memory use does not depend on the graph size.
+    """
+    if "friends" in include:
+        yield from iter_friendships(since, chunk_size)
+    if "requests" in include:
+        yield from iter_friend_requests(since, chunk_size)
+
+
+def format_ndjson(records):
+    """
+    Yields each record as a line of JSON.
+    """
+    for record in records:
+        yield json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def format_csv(records):
+    """
+    Yields a header line, then each record as a line of CSV.
+    """
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, lineterminator="\n")
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+FORMATS = {"ndjson": format_ndjson, "csv": format_csv}
+
+
+def encode_chunks(lines, chunk_size=OUTPUT_CHUNK_SIZE):
+    """
+    Joins lines into UTF-8 chunks of about `chunk_size` bytes.
+    """
+    chunk = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        chunk.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b"".join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b"".join(chunk)
+
+
+def gzip_chunks(chunks):
+    """
+    Compresses a stream of chunks into a single gzip stream.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_graph(
+    output_format="ndjson",
+    include=("friends", "requests"),
+    since=None,
+    gzip=False,
+    chunk_size=5000,
+):
+    """
+    Returns an iterator of the bytes of the export, see iter_records.
+    """
+    records = iter_records(include, since, chunk_size)
+    chunks = encode_chunks(FORMATS[output_format](records))
+    return gzip_chunks(chunks) if gzip else chunks
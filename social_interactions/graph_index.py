@@ -0,0 +1,312 @@
+import time
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+
+from .models import Friend
+from .graph_snapshot import GraphSnapshot, SnapshotError
+
+logger = logging.getLogger(__name__)
+
+
+class FriendGraphIndex:
+    """
+    In-memory CSR (compressed sparse row) adjacency of the friendship graph.
+
+    `user_ids` holds the sorted ids of users with at least one friend,
+    `offsets[i]:offsets[i + 1]` is the slice of `neighbours` holding the sorted
+    friend ids of `user_ids[i]`. Edges created after the build are kept in a
+    small per-user delta until the next rebuild.
+
+    Memory: the arrays are 8-byte signed integers, so the index costs 8 bytes
+    per Friend row (16 bytes per friendship, as rows are mirrored) plus
+    16 bytes per user with friends. Delta edges cost roughly 100 bytes each.
+    An index loaded with from_snapshot reads the arrays from a mapped file
+    shared by all processes instead.
+    """
+
+    def __init__(self, user_ids, offsets, neighbours, built_at=None):
+        self.user_ids = user_ids
+        self.offsets = offsets
+        self.neighbours = neighbours
+        self.built_at = time.monotonic() if built_at is None else built_at
+        self._added = {}
+        self._lock = threading.Lock()
+        self.snapshot = None
+
+    @classmethod
+    def from_edges(cls, edges):
+        """
+        Builds the index in one pass over (user_id, friend_id) pairs sorted by
+        user_id, then friend_id.
+        """
+        user_ids = array("q")
+        offsets = array("q", [0])
+        neighbours = array("q")
+
+        previous_user_id = None
+        for user_id, friend_id in edges:
+            if user_id != previous_user_id:
+                if previous_user_id is not None:
+                    offsets.append(len(neighbours))
+                user_ids.append(user_id)
+                previous_user_id = user_id
+            neighbours.append(friend_id)
+
+        if previous_user_id is not None:
+            offsets.append(len(neighbours))
+
+        return cls(user_ids, offsets, neighbours)
+
+    @classmethod
+    def build(cls, chunk_size=10000):
+        """
+        Builds the index from the Friend table with one streamed query.
+        """
+        edges = (
+            Friend.objects.order_by("friend1_id", "friend2_id")
+            .values_list("friend1_id", "friend2_id")
+            .iterator(chunk_size=chunk_size)
+        )
+        return cls.from_edges(edges)
+
+    @classmethod
+    def from_snapshot(cls, path, overlap=300, verify=False, delta_warning=None):
+        """
+        Loads the index from a snapshot file written by write_snapshot, plus
+        the friendships created since the snapshot as the delta.
+
+        The arrays are used in place from the mapped file, its checksum is
+        only read with `verify`. Friendships created up to `overlap` seconds
+        before the snapshot are read again, to catch transactions that
+        committed while it was being written. A warning is logged when more
+        than `delta_warning` friendships are read.
+        """
+        snapshot = GraphSnapshot(path, verify=verify)
+        index = cls(snapshot.user_ids, snapshot.offsets, snapshot.neighbours)
+        index.snapshot = snapshot
+        num_read = index.load_delta(snapshot.as_of - timedelta(seconds=overlap))
+        if delta_warning is not None and num_read > delta_warning:
+            logger.warning(
+                "Read %d friendships created after the snapshot %s, write a new snapshot",
+                num_read,
+                path,
+            )
+        return index
+
+    def load_delta(self, since):
+        """
+        Adds the friendships created since a time that are not in the arrays.
+        Returns the number of friendships read.
+        """
+        edges = (
+            Friend.objects.filter(created_at__gte=since, friend1_id__lt=F("friend2_id"))
+            .values_list("friend1_id", "friend2_id")
+            .iterator()
+        )
+        num_read = 0
+        for user1_id, user2_id in edges:
+            num_read += 1
+            if not self._has_edge(user1_id, user2_id):
+                self.add_friendship(user1_id, user2_id)
+        return num_read
+
+    def _bounds(self, user_id):
+        """
+        Returns the (start, end) slice of `neighbours` for a user.
+        """
+        position = bisect_left(self.user_ids, user_id)
+        if position < len(self.user_ids) and self.user_ids[position] == user_id:
+            return self.offsets[position], self.offsets[position + 1]
+        return 0, 0
+
+    def neighbours_of(self, user_id):
+        """
+        Returns the sorted friend ids of a user.
+        """
+        start, end = self._bounds(user_id)
+        friend_ids = self.neighbours[start:end].tolist()
+        added = self._added.get(user_id)
+        if added:
+            friend_ids = sorted(set(friend_ids).union(added))
+        return friend_ids
+
+    def _has_edge(self, user1_id, user2_id):
+        """
+        Checks if the CSR arrays hold an edge, ignoring the delta.
+        """
+        start, end = self._bounds(user1_id)
+        position = bisect_left(self.neighbours, user2_id, start, end)
+        return position < end and self.neighbours[position] == user2_id
+
+    def degree(self, user_id):
+        """
+        Returns the number of friends of a user.
+        """
+        start, end = self._bounds(user_id)
+        return end - start + len(self._added.get(user_id, ()))
+
+    def are_friends(self, user1_id, user2_id):
+        """
+        Checks if two users are friends.
+        """
+        if self._has_edge(user1_id, user2_id):
+            return True
+        return user2_id in self._added.get(user1_id, ())
+
+    def add_friendship(self, user1_id, user2_id):
+        """
+        Records a friendship created after the index was built.
+        """
+        with self._lock:
+            self._added.setdefault(user1_id, set()).add(user2_id)
+            self._added.setdefault(user2_id, set()).add(user1_id)
+
+    def merge_added(self, other):
+        """
+        Copies the edges added to another index that this one is missing.
+        """
+        with other._lock:
+            added = [(user_id, set(ids)) for user_id, ids in other._added.items()]
+        with self._lock:
+            for user_id, friend_ids in added:
+                missing = {
+                    friend_id
+                    for friend_id in friend_ids
+                    if not self._has_edge(user_id, friend_id)
+                }
+                if missing:
+                    self._added.setdefault(user_id, set()).update(missing)
+
+    @property
+    def age(self):
+        """
+        Seconds since the index was built.
+        """
+        return time.monotonic() - self.built_at
+
+    def __len__(self):
+        """
+        Returns the number of directed edges held in the CSR arrays.
+        """
+        return len(self.neighbours)
+
+    def memory_usage(self):
+        """
+        Returns the size in bytes of the CSR arrays.
+        """
+        return sum(
+            len(values) * values.itemsize
+            for values in (self.user_ids, self.offsets, self.neighbours)
+        )
+
+
+_index = None
+_build_lock = threading.Lock()
+# Held while recording friendships and while swapping in a rebuilt index, so
+# none is recorded in the old index after its delta was carried over
+_swap_lock = threading.Lock()
+
+
+def load_friend_graph_index(config):
+    """
+    Loads the index from the snapshot at `SNAPSHOT_PATH` if there is one,
+    otherwise builds it from the Friend table.
+    """
+    path = config.get("SNAPSHOT_PATH")
+    if path:
+        try:
+            return FriendGraphIndex.from_snapshot(
+                path,
+                overlap=config.get("SNAPSHOT_OVERLAP", 300),
+                verify=config.get("SNAPSHOT_VERIFY", False),
+                delta_warning=config.get("SNAPSHOT_DELTA_WARNING"),
+            )
+        except SnapshotError as error:
+            logger.warning("Building the friend graph index from SQL: %s", error)
+    return FriendGraphIndex.build(chunk_size=config.get("CHUNK_SIZE", 10000))
+
+
+def rebuild_in_background(index, config):
+    """
+    Rebuilds a stale index in a background thread and swaps it in once it is
+    finished. Call with `_build_lock` held, the thread releases it.
+    """
+
+    def rebuild():
+        global _index
+
+        try:
+            rebuilt = load_friend_graph_index(config)
+            # Friendships recorded in the old index while the build ran may
+            # be missing from it, carry the old delta over.
+            with _swap_lock:
+                if _index is index:
+                    rebuilt.merge_added(index)
+                    _index = rebuilt
+        except Exception:
+            logger.exception("Rebuilding the friend graph index failed")
+        finally:
+            connections.close_all()
+            _build_lock.release()
+
+    threading.Thread(
+        target=rebuild, name="friend-graph-index-rebuild", daemon=True
+    ).start()
+
+
+def get_friend_graph_index():
+    """
+    Returns the process-wide friend graph index, or None if it is disabled.
+
+    The index is built on first use and rebuilt once it is older than
+    `SOCIAL_GRAPH_INDEX["MAX_AGE"]` seconds, so that edges created by other
+    worker processes are picked up. Only the first build runs in the
+    calling thread, a stale index is rebuilt in a background thread and
+    keeps serving reads until the new one is swapped in.
+    """
+    global _index
+
+    config = settings.SOCIAL_GRAPH_INDEX
+    if not config.get("ENABLED"):
+        return None
+
+    index = _index
+    if index is None:
+        with _build_lock:
+            if _index is None:
+                _index = load_friend_graph_index(config)
+        return _index
+
+    max_age = config.get("MAX_AGE")
+    if max_age is not None and index.age > max_age:
+        if _build_lock.acquire(blocking=False):
+            if _index is index:
+                rebuild_in_background(index, config)
+            else:
+                _build_lock.release()
+
+    return index
+
+
+def record_friendship(user1_id, user2_id):
+    """
+    Adds a new friendship to the index if it has been built in this process.
+    """
+    with _swap_lock:
+        if _index is not None:
+            _index.add_friendship(user1_id, user2_id)
+
+
+def reset_friend_graph_index():
+    """
+    Drops the process-wide index, it is rebuilt on next use.
+    """
+    global _index
+    _index = None
@@ -0,0 +1,176 @@
+import os
+import sys
+import mmap
+import zlib
+import struct
+import tempfile
+from array import array
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+
+from .models import Friend
+
+MAGIC = b"FRNDCSR\x00"
+VERSION = 1
+
+# Magic, version, number of users and of edges, byte offsets of the user
+# ids, CSR offsets and neighbour arrays, snapshot time in microseconds since
+# the epoch and CRC-32 of the arrays. All integers are little-endian.
+HEADER = struct.Struct("<8sI4xQQQQQqI4x")
+
+ITEM_SIZE = 8
+
+
+class SnapshotError(Exception):
+    """
+    Raised when a snapshot file is missing, truncated or corrupt.
+    """
+
+
+def to_little_endian(values):
+    if sys.byteorder == "big":
+        values = array("q", values)
+        values.byteswap()
+    return values
+
+
+def write_snapshot(path, chunk_size=10000, edges=None):
+    """
+    Writes the friendship graph to `path` as a CSR snapshot and returns the
+    number of users and edges written. `edges` replaces the Friend table with
+    (user_id, friend_id) pairs sorted by user_id, then friend_id.
+
+    Layout: header, neighbour ids, sorted user ids, then CSR offsets, each an
+    array of 8-byte little-endian signed integers, so that readers can map
+    the file and use it as is. Neighbours are streamed to the file as they
+    are read, only the user ids and offsets (16 bytes per user) are kept in
+    memory. The file is written next to `path`, read back to check its
+    checksum and renamed over it, so readers never see a partial snapshot.
+    """
+    # Taken before the query, see load_delta
+    as_of = timezone.now()
+    if edges is None:
+        edges = (
+            Friend.objects.order_by("friend1_id", "friend2_id")
+            .values_list("friend1_id", "friend2_id")
+            .iterator(chunk_size=chunk_size)
+        )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as snapshot:
+            snapshot.write(b"\0" * HEADER.size)
+            checksum = 0
+
+            def write(values):
+                nonlocal checksum
+                data = to_little_endian(values).tobytes()
+                checksum = zlib.crc32(data, checksum)
+                snapshot.write(data)
+
+            user_ids = array("q")
+            offsets = array("q", [0])
+            chunk = array("q")
+            num_edges = 0
+            previous_user_id = None
+            for user_id, friend_id in edges:
+                if user_id != previous_user_id:
+                    if previous_user_id is not None:
+                        offsets.append(num_edges)
+                    user_ids.append(user_id)
+                    previous_user_id = user_id
+                chunk.append(friend_id)
+                num_edges += 1
+                if len(chunk) >= chunk_size:
+                    write(chunk)
+                    chunk = array("q")
+            write(chunk)
+            if previous_user_id is not None:
+                offsets.append(num_edges)
+            write(user_ids)
+            write(offsets)
+
+            neighbours_offset = HEADER.size
+            user_ids_offset = neighbours_offset + num_edges * ITEM_SIZE
+            offsets_offset = user_ids_offset + len(user_ids) * ITEM_SIZE
+            snapshot.seek(0)
+            snapshot.write(
+                HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    len(user_ids),
+                    num_edges,
+                    user_ids_offset,
+                    offsets_offset,
+                    neighbours_offset,
+                    int(as_of.timestamp() * 1_000_000),
+                    checksum,
+                )
+            )
+        # Checked once here, so workers can map it without reading it whole
+        GraphSnapshot(temporary_path, verify=True)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+    return len(user_ids), num_edges
+
+
+class GraphSnapshot:
+    """
+    Read-only view of a snapshot file, mapped into memory.
+
+    `user_ids`, `offsets` and `neighbours` are memoryviews of 8-byte integers
+    over the mapping, so loading reads no data up front and the pages are
+    shared with every other process mapping the same file, through the page
+    cache, instead of being copied into each worker.
+    """
+
+    def __init__(self, path, verify=True):
+        try:
+            with open(path, "rb") as snapshot:
+                self._mmap = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as error:
+            raise SnapshotError(f"Cannot map {path}: {error}")
+
+        if len(self._mmap) < HEADER.size:
+            raise SnapshotError(f"{path} is truncated")
+        (
+            magic,
+            version,
+            num_users,
+            num_edges,
+            user_ids_offset,
+            offsets_offset,
+            neighbours_offset,
+            as_of,
+            checksum,
+        ) = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError(f"{path} is not a version {VERSION} graph snapshot")
+        if len(self._mmap) != offsets_offset + (num_users + 1) * ITEM_SIZE:
+            raise SnapshotError(f"{path} is truncated")
+
+        data = memoryview(self._mmap)
+        if verify and zlib.crc32(data[HEADER.size :]) != checksum:
+            raise SnapshotError(f"{path} failed its checksum")
+
+        self.path = path
+        self.as_of = datetime.fromtimestamp(as_of / 1_000_000, tz=dt_timezone.utc)
+        self.user_ids = self._get_array(data, user_ids_offset, num_users)
+        self.offsets = self._get_array(data, offsets_offset, num_users + 1)
+        self.neighbours = self._get_array(data, neighbours_offset, num_edges)
+
+    @staticmethod
+    def _get_array(data, offset, length):
+        values = data[offset : offset + length * ITEM_SIZE].cast("q")
+        if sys.byteorder == "big":
+            # Cannot be used in place, fall back to a private copy
+            copy = array("q")
+            copy.frombytes(values.tobytes())
+            copy.byteswap()
+            return copy
+        return values
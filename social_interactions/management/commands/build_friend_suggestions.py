@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from social_interactions.suggestions import build_suggestions
+
+
+class Command(BaseCommand):
+    help = "Recomputes the top friend suggestions of every user."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top-k",
+            type=int,
+            default=20,
+            help="Number of suggestions stored per user.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of users processed per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(done, total, stored):
+            self.stdout.write(f"Processed {done}/{total} users, {stored} suggestions")
+
+        stored = build_suggestions(
+            top_k=options["top_k"],
+            chunk_size=options["chunk_size"],
+            progress=progress,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored {stored} suggestions in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,92 @@
+import time
+import argparse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from social_interactions.retention import (
+    count_expired,
+    expire_friend_requests,
+    get_retention_query,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Archives, or deletes, pending friend requests older than the "
+        "retention period and old rejected ones, in small batches. Meant to "
+        "run periodically, e.g. daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        config = settings.FRIEND_REQUEST_RETENTION
+        parser.add_argument(
+            "--pending-days",
+            type=int,
+            default=config["PENDING_DAYS"],
+            help="Expire pending requests sent more than this many days ago.",
+        )
+        parser.add_argument(
+            "--rejected-days",
+            type=int,
+            default=config["REJECTED_DAYS"],
+            help="Remove rejected requests rejected more than this many days ago.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=config["BATCH_SIZE"],
+            help="Number of requests removed per transaction.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=config["BATCH_PAUSE"],
+            help="Seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            "--archive",
+            action=argparse.BooleanOptionalAction,
+            default=config["ARCHIVE"],
+            help="Archive the requests, or with --no-archive delete them.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the requests that would be removed.",
+        )
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            counts = count_expired(
+                get_retention_query(options["pending_days"], options["rejected_days"])
+            )
+            self.stdout.write(
+                f"Would remove {counts['expired']} expired and "
+                f"{counts['rejected']} rejected friend requests"
+            )
+            return
+
+        started = time.monotonic()
+
+        def progress(removed):
+            self.stdout.write(
+                f"Removed {removed['expired']} expired and "
+                f"{removed['rejected']} rejected friend requests"
+            )
+
+        removed = expire_friend_requests(
+            options["pending_days"],
+            options["rejected_days"],
+            archive=options["archive"],
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            progress=progress,
+        )
+        action = "Archived" if options["archive"] else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} {removed['expired']} expired and {removed['rejected']} "
+                f"rejected friend requests in {time.monotonic() - started:.1f}s"
+            )
+        )
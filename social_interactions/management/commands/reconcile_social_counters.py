@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from social_interactions.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recounts friends and pending friend requests of every user and "
+        "repairs the stored counters that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of users recounted per batch.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(checked, repaired):
+            self.stdout.write(f"Checked {checked} users, repaired {repaired}")
+
+        repaired = reconcile_counters(
+            chunk_size=options["chunk_size"], progress=progress
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Repaired {repaired} users in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from social_interactions.graph_snapshot import write_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes the friendship graph to a binary CSR snapshot that the friend "
+        "graph index can map into memory, see SOCIAL_GRAPH_INDEX."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=settings.SOCIAL_GRAPH_INDEX.get("SNAPSHOT_PATH"),
+            help="File to write, by default SOCIAL_GRAPH_INDEX['SNAPSHOT_PATH'].",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.SOCIAL_GRAPH_INDEX.get("CHUNK_SIZE", 10000),
+            help="Number of Friend rows fetched per round trip.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["output"]:
+            raise CommandError("Set SOCIAL_GRAPH_INDEX['SNAPSHOT_PATH'] or --output.")
+
+        started = time.monotonic()
+        num_users, num_edges = write_snapshot(
+            options["output"], chunk_size=options["chunk_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {num_edges} edges of {num_users} users to "
+                f"{options['output']} in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import Max
+
+BATCH_SIZE = 1000
+
+
+def create_mirrored_rows(apps, schema_editor):
+    """
+    Backfills the (friend2, friend1) row for every existing friendship.
+    """
+    Friend = apps.get_model("social_interactions", "Friend")
+
+    # Walk the rows that existed before the migration in primary key order,
+    # the mirrored rows inserted on the way all get higher ids.
+    max_id = Friend.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+    last_id = 0
+    while last_id < max_id:
+        rows = list(
+            Friend.objects.filter(id__gt=last_id, id__lte=max_id)
+            .order_by("id")
+            .values_list("id", "friend1_id", "friend2_id")[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+
+        Friend.objects.bulk_create(
+            [
+                Friend(friend1_id=friend2_id, friend2_id=friend1_id)
+                for _, friend1_id, friend2_id in rows
+            ],
+            ignore_conflicts=True,
+        )
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_interactions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_mirrored_rows, migrations.RunPython.noop),
+    ]
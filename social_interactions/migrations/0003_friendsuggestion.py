@@ -0,0 +1,79 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("social_interactions", "0002_mirror_friend_rows"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FriendSuggestion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "rank",
+                    models.PositiveIntegerField(
+                        help_text="Position of the suggestion in the user's list, starting at 1."
+                    ),
+                ),
+                (
+                    "mutual_friends",
+                    models.PositiveIntegerField(
+                        help_text="Number of friends the two users have in common."
+                    ),
+                ),
+                (
+                    "score",
+                    models.FloatField(
+                        help_text="Jaccard overlap of the two users' friend sets."
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="The date and time when the suggestion was computed.",
+                    ),
+                ),
+                (
+                    "suggested_user",
+                    models.ForeignKey(
+                        help_text="The user being suggested as a friend.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="suggested_to",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        help_text="The user the suggestion is shown to.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="friend_suggestions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Friend Suggestion",
+                "verbose_name_plural": "Friend Suggestions",
+                "ordering": ["user", "rank"],
+                "unique_together": {("user", "rank")},
+            },
+        ),
+    ]
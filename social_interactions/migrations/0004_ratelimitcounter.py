@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_interactions", "0003_friendsuggestion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RateLimitCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="The rate-limited action and the client it is counted for.",
+                        max_length=200,
+                    ),
+                ),
+                (
+                    "window",
+                    models.BigIntegerField(
+                        help_text="Number of the fixed time window the count belongs to."
+                    ),
+                ),
+                (
+                    "count",
+                    models.IntegerField(
+                        default=0, help_text="Number of hits counted in the window."
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Rate Limit Counter",
+                "verbose_name_plural": "Rate Limit Counters",
+                "unique_together": {("key", "window")},
+            },
+        ),
+    ]
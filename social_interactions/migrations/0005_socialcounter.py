@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("social_interactions", "0004_ratelimitcounter"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SocialCounter",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        help_text="The user the counters belong to.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="social_counter",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "friends",
+                    models.IntegerField(
+                        default=0, help_text="Number of friends of the user."
+                    ),
+                ),
+                (
+                    "incoming_pending",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Number of pending friend requests received by the user.",
+                    ),
+                ),
+                (
+                    "outgoing_pending",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Number of pending friend requests sent by the user.",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Social Counter",
+                "verbose_name_plural": "Social Counters",
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_interactions", "0005_socialcounter"),
+    ]
+
+    operations = [
+        # Existing friendships are dated to when the migration runs
+        migrations.AddField(
+            model_name="friend",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                db_index=True,
+                default=django.utils.timezone.now,
+                help_text="The date and time when the friendship was created.",
+            ),
+            preserve_default=False,
+        ),
+    ]
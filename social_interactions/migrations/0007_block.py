@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("social_interactions", "0006_friend_created_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Block",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        db_index=True,
+                        help_text="The date and time when the user was blocked.",
+                    ),
+                ),
+                (
+                    "blocked",
+                    models.ForeignKey(
+                        help_text="The user who was blocked.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="blocked_by",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "blocker",
+                    models.ForeignKey(
+                        help_text="The user who blocked the other user.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="blocks",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Block",
+                "verbose_name_plural": "Blocks",
+                "unique_together": {("blocker", "blocked")},
+            },
+        ),
+    ]
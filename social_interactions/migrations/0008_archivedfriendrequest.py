@@ -0,0 +1,88 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("social_interactions", "0007_block"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedFriendRequest",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "request_id",
+                    models.BigIntegerField(
+                        help_text="The id the friend request had before it was archived."
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("expired", "Expired"), ("rejected", "Rejected")],
+                        help_text="Expired if it was still pending, rejected otherwise.",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        help_text="The date and time when the friend request was sent."
+                    ),
+                ),
+                (
+                    "rejected_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="The date and time when the friend request was rejected, if rejected.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "archived_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        db_index=True,
+                        help_text="The date and time when the friend request was archived.",
+                    ),
+                ),
+                (
+                    "from_user",
+                    models.ForeignKey(
+                        help_text="The user who sent the friend request.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_sent_friend_requests",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "to_user",
+                    models.ForeignKey(
+                        help_text="The user who received the friend request.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_received_friend_requests",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived Friend Request",
+                "verbose_name_plural": "Archived Friend Requests",
+            },
+        ),
+    ]
@@ -50,6 +50,51 @@ class FriendRequest(models.Model):
         )
 
 
+class FriendManager(models.Manager):
+    """
+    Manager for Friend model.
+
+    A friendship is stored as two mirrored rows, (a, b) and (b, a), so that
+    every lookup is keyed on `friend1` and can use the (friend1, friend2)
+    unique index: "are A and B friends" is a single index probe and a user's
+    friend list is a single range scan.
+    """
+
+    def create_friendship(self, user1, user2):
+        """
+        Creates both rows of a friendship between two users.
+        """
+        return self.create_friendships([(user1.id, user2.id)])
+
+    def create_friendships(self, user_id_pairs):
+        """
+        Creates both rows of the friendships between pairs of user IDs.
+        """
+        return self.bulk_create(
+            [
+                self.model(friend1_id=friend1_id, friend2_id=friend2_id)
+                for user1_id, user2_id in user_id_pairs
+                for friend1_id, friend2_id in (
+                    (user1_id, user2_id),
+                    (user2_id, user1_id),
+                )
+            ],
+            ignore_conflicts=True,
+        )
+
+    def are_friends(self, user1_id, user2_id):
+        """
+        Checks if two users are friends.
+        """
+        return self.filter(friend1_id=user1_id, friend2_id=user2_id).exists()
+
+    def friend_ids(self, user_id):
+        """
+        Returns a queryset of the user IDs of the friends of a user.
+        """
+        return self.filter(friend1_id=user_id).values_list("friend2_id", flat=True)
+
+
 class Friend(models.Model):
     friend1 = models.ForeignKey(
         User,
@@ -63,6 +108,13 @@ class Friend(models.Model):
         on_delete=models.CASCADE,
         help_text="The other user who is friends with the first user.",
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        help_text="The date and time when the friendship was created.",
+    )
+
+    objects = FriendManager()
 
     class Meta:
         verbose_name = "Friends"
@@ -71,3 +123,167 @@ class Friend(models.Model):
 
     def __str__(self):
         return f"Friends: {self.friend1.first_name} -> {self.friend2.first_name}"
+
+
+class FriendSuggestion(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name="friend_suggestions",
+        on_delete=models.CASCADE,
+        help_text="The user the suggestion is shown to.",
+    )
+    suggested_user = models.ForeignKey(
+        User,
+        related_name="suggested_to",
+        on_delete=models.CASCADE,
+        help_text="The user being suggested as a friend.",
+    )
+    rank = models.PositiveIntegerField(
+        help_text="Position of the suggestion in the user's list, starting at 1.",
+    )
+    mutual_friends = models.PositiveIntegerField(
+        help_text="Number of friends the two users have in common.",
+    )
+    score = models.FloatField(
+        help_text="Jaccard overlap of the two users' friend sets.",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="The date and time when the suggestion was computed.",
+    )
+
+    class Meta:
+        ordering = ["user", "rank"]
+        verbose_name = "Friend Suggestion"
+        verbose_name_plural = "Friend Suggestions"
+        unique_together = ("user", "rank")
+
+    def __str__(self):
+        return f"Friend Suggestion: {self.user.first_name} -> {self.suggested_user.first_name}"
+
+
+class RateLimitCounter(models.Model):
+    key = models.CharField(
+        max_length=200,
+        help_text="The rate-limited action and the client it is counted for.",
+    )
+    window = models.BigIntegerField(
+        help_text="Number of the fixed time window the count belongs to.",
+    )
+    count = models.IntegerField(
+        default=0,
+        help_text="Number of hits counted in the window.",
+    )
+
+    class Meta:
+        verbose_name = "Rate Limit Counter"
+        verbose_name_plural = "Rate Limit Counters"
+        unique_together = ("key", "window")
+
+    def __str__(self):
+        return f"Rate Limit Counter: {self.key} @ {self.window} = {self.count}"
+
+
+class SocialCounter(models.Model):
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name="social_counter",
+        on_delete=models.CASCADE,
+        help_text="The user the counters belong to.",
+    )
+    friends = models.IntegerField(
+        default=0,
+        help_text="Number of friends of the user.",
+    )
+    incoming_pending = models.IntegerField(
+        default=0,
+        help_text="Number of pending friend requests received by the user.",
+    )
+    outgoing_pending = models.IntegerField(
+        default=0,
+        help_text="Number of pending friend requests sent by the user.",
+    )
+
+    class Meta:
+        verbose_name = "Social Counter"
+        verbose_name_plural = "Social Counters"
+
+    def __str__(self):
+        return f"Social Counter: {self.user.first_name}"
+
+
+class Block(models.Model):
+    blocker = models.ForeignKey(
+        User,
+        related_name="blocks",
+        on_delete=models.CASCADE,
+        help_text="The user who blocked the other user.",
+    )
+    blocked = models.ForeignKey(
+        User,
+        related_name="blocked_by",
+        on_delete=models.CASCADE,
+        help_text="The user who was blocked.",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        help_text="The date and time when the user was blocked.",
+    )
+
+    class Meta:
+        verbose_name = "Block"
+        verbose_name_plural = "Blocks"
+        unique_together = ("blocker", "blocked")
+
+    def __str__(self):
+        return f"Block: {self.blocker.first_name} -> {self.blocked.first_name}"
+
+
+class ArchivedFriendRequest(models.Model):
+    STATUS_CHOICES = [
+        ("expired", "Expired"),
+        ("rejected", "Rejected"),
+    ]
+
+    request_id = models.BigIntegerField(
+        help_text="The id the friend request had before it was archived.",
+    )
+    from_user = models.ForeignKey(
+        User,
+        related_name="archived_sent_friend_requests",
+        on_delete=models.CASCADE,
+        help_text="The user who sent the friend request.",
+    )
+    to_user = models.ForeignKey(
+        User,
+        related_name="archived_received_friend_requests",
+        on_delete=models.CASCADE,
+        help_text="The user who received the friend request.",
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        help_text="Expired if it was still pending, rejected otherwise.",
+    )
+    created_at = models.DateTimeField(
+        help_text="The date and time when the friend request was sent.",
+    )
+    rejected_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="The date and time when the friend request was rejected, if rejected.",
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        help_text="The date and time when the friend request was archived.",
+    )
+
+    class Meta:
+        verbose_name = "Archived Friend Request"
+        verbose_name_plural = "Archived Friend Requests"
+
+    def __str__(self):
+        return f"Archived Friend Request: {self.from_user.first_name} -> {self.to_user.first_name} ({self.status})"
@@ -0,0 +1,164 @@
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q, Count
+from django.utils import timezone
+
+from utitlities.metrics import get_metrics
+
+from .models import ArchivedFriendRequest, FriendRequest
+from .counters import record_requests_resolved
+
+
+def get_retention_query(pending_days, rejected_days, now=None):
+    """
+    Returns the filter of the friend requests past retention: pending ones
+    sent more than `pending_days` ago and rejected ones rejected more than
+    `rejected_days` ago, or None if both are None. Accepted requests are
+    always kept.
+    """
+    now = timezone.now() if now is None else now
+    query = None
+    if pending_days is not None:
+        query = Q(
+            accepted=False,
+            rejected=False,
+            created_at__lt=now - timedelta(days=pending_days),
+        )
+    if rejected_days is not None:
+        rejected = Q(
+            accepted=False,
+            rejected=True,
+            rejected_at__lt=now - timedelta(days=rejected_days),
+        )
+        query = rejected if query is None else query | rejected
+    return query
+
+
+def count_expired(query):
+    """
+    Returns the number of friend requests matching a retention filter, as
+    {"expired": pending, "rejected": rejected}.
+    """
+    counts = {"expired": 0, "rejected": 0}
+    if query is None:
+        return counts
+    for rejected, count in (
+        FriendRequest.objects.filter(query)
+        .order_by()
+        .values("rejected")
+        .annotate(count=Count("pk"))
+        .values_list("rejected", "count")
+    ):
+        counts["rejected" if rejected else "expired"] = count
+    return counts
+
+
+def remove_batch(query, ids, archive):
+    """
+    Archives, unless `archive` is False, and deletes the friend requests of
+    `ids` that still match the retention filter, in one short transaction.
+    Returns {"expired": pending, "rejected": rejected} removed.
+    """
+    with transaction.atomic():
+        # Locks only the batch, and skips requests accepted since they were
+        # selected
+        rows = list(
+            FriendRequest.objects.select_for_update()
+            .filter(query, id__in=ids)
+            .values(
+                "id",
+                "from_user_id",
+                "to_user_id",
+                "rejected",
+                "created_at",
+                "rejected_at",
+            )
+        )
+        if archive:
+            ArchivedFriendRequest.objects.bulk_create(
+                [
+                    ArchivedFriendRequest(
+                        request_id=row["id"],
+                        from_user_id=row["from_user_id"],
+                        to_user_id=row["to_user_id"],
+                        status="rejected" if row["rejected"] else "expired",
+                        created_at=row["created_at"],
+                        rejected_at=row["rejected_at"],
+                    )
+                    for row in rows
+                ]
+            )
+        FriendRequest.objects.filter(id__in=[row["id"] for row in rows]).delete()
+
+        # Expired requests stop being pending, like rejected ones
+        pending_pairs = [
+            (row["from_user_id"], row["to_user_id"])
+            for row in rows
+            if not row["rejected"]
+        ]
+        record_requests_resolved(pending_pairs)
+
+    return {
+        "expired": len(pending_pairs),
+        "rejected": len(rows) - len(pending_pairs),
+    }
+
+
+def expire_friend_requests(
+    pending_days,
+    rejected_days,
+    archive=True,
+    batch_size=1000,
+    pause=0.1,
+    progress=None,
+):
+    """
+    Moves the friend requests past retention, see get_retention_query, to
+    ArchivedFriendRequest, or deletes them if `archive` is False, and
+    updates the pending counters of their users.
+
+    Requests are walked in id order `batch_size` at a time, each batch in
+    its own transaction so that locks are held briefly, with a `pause` in
+    seconds between batches to leave room for other writes. The cutoffs are
+    fixed when the run starts. `progress(removed)` is called after every
+    batch.
+
+    Returns {"expired": pending, "rejected": rejected} removed.
+    """
+    removed = {"expired": 0, "rejected": 0}
+    query = get_retention_query(pending_days, rejected_days)
+    if query is None:
+        return removed
+
+    metrics = get_metrics()
+    last_id = 0
+    while True:
+        ids = list(
+            FriendRequest.objects.filter(query, id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+
+        started = time.monotonic()
+        batch = remove_batch(query, ids, archive)
+        metrics.observe(
+            "friend_request_retention_batch_seconds", time.monotonic() - started
+        )
+        for status, count in batch.items():
+            removed[status] += count
+            if count:
+                metrics.increment(
+                    "friend_request_retention_total", count, status=status
+                )
+
+        last_id = ids[-1]
+        if progress is not None:
+            progress(removed)
+        if pause and len(ids) == batch_size:
+            time.sleep(pause)
+
+    return removed
@@ -1,8 +1,8 @@
 from rest_framework import serializers
 
-from user_operations.serializers import UserSerializer
+from user_operations.serializers import UserSerializer, serialize_user_values
 
-from .models import FriendRequest
+from .models import FriendRequest, FriendSuggestion
 
 
 class FriendRequestSerializer(serializers.ModelSerializer):
@@ -16,3 +16,69 @@ class FriendRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = FriendRequest
         fields = ["id", "from_user", "to_user"]
+
+
+class FriendSuggestionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for FriendSuggestion model.
+    """
+
+    user = UserSerializer(source="suggested_user")
+
+    class Meta:
+        model = FriendSuggestion
+        fields = ["user", "mutual_friends", "score"]
+
+
+# Fields to select with `values()` for `serialize_friend_requests`, both users
+# are joined in the same query. created_at is needed by cursor pagination.
+FRIEND_REQUEST_VALUE_FIELDS = [
+    "id",
+    "created_at",
+    "from_user__id",
+    "from_user__email",
+    "from_user__first_name",
+    "to_user__id",
+    "to_user__email",
+    "to_user__first_name",
+]
+
+
+def serialize_friend_requests(rows):
+    """
+    Serializes `values(*FRIEND_REQUEST_VALUE_FIELDS)` rows like
+    FriendRequestSerializer(many=True).
+    """
+    return [
+        {
+            "id": row["id"],
+            "from_user": serialize_user_values(row, "from_user__"),
+            "to_user": serialize_user_values(row, "to_user__"),
+        }
+        for row in rows
+    ]
+
+
+# Fields to select with `values()` for `serialize_friend_suggestions`
+FRIEND_SUGGESTION_VALUE_FIELDS = [
+    "suggested_user__id",
+    "suggested_user__email",
+    "suggested_user__first_name",
+    "mutual_friends",
+    "score",
+]
+
+
+def serialize_friend_suggestions(rows):
+    """
+    Serializes `values(*FRIEND_SUGGESTION_VALUE_FIELDS)` rows like
+    FriendSuggestionSerializer(many=True).
+    """
+    return [
+        {
+            "user": serialize_user_values(row, "suggested_user__"),
+            "mutual_friends": row["mutual_friends"],
+            "score": row["score"],
+        }
+        for row in rows
+    ]
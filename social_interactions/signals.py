@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete
+from django.contrib.auth.models import User
+
+from .models import Block, Friend
+from .block_filter import bump_generation
+from .friend_list_cache import invalidate_friend_lists
+
+# User fields shown in friend lists
+FRIEND_LIST_FIELDS = {"email", "first_name"}
+
+
+@receiver(post_delete, sender=Friend)
+def invalidate_friend_lists_on_delete(sender, instance, **kwargs):
+    """
+    Drops the cached friend lists of both users when a friendship row is
+    deleted, e.g. by an unfriend or a user deletion.
+    """
+    user_ids = [instance.friend1_id, instance.friend2_id]
+    transaction.on_commit(lambda: invalidate_friend_lists(user_ids))
+
+
+@receiver(post_save, sender=User)
+def invalidate_friend_lists_on_user_change(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    """
+    Drops the cached friend lists showing a user whose name or email may
+    have changed. Saves without update_fields count as a change.
+    """
+    if created or raw or not settings.FRIEND_LIST_CACHE.get("ENABLED"):
+        return
+
+    if update_fields is not None and not FRIEND_LIST_FIELDS & set(update_fields):
+        return
+
+    user_id = instance.pk
+    transaction.on_commit(
+        lambda: invalidate_friend_lists(Friend.objects.friend_ids(user_id))
+    )
+
+
+@receiver(post_save, sender=Block)
+@receiver(post_delete, sender=Block)
+def reload_block_filters(sender, instance, **kwargs):
+    """
+    Makes every process reload its block filter once a block or unblock is
+    committed, including blocks deleted with one of their users.
+    """
+    transaction.on_commit(bump_generation)
@@ -0,0 +1,92 @@
+import heapq
+
+from django.db import transaction
+
+from .models import FriendSuggestion
+from .graph_index import FriendGraphIndex
+
+
+def rank_suggestions(index, user_id, top_k):
+    """
+    Ranks the friends of friends of a user in the index.
+
+    Candidates are ordered by mutual friend count, then Jaccard overlap of
+    the two friend sets, then user id. Returns (user_id, mutual, score) tuples.
+    """
+    friend_ids = index.neighbours_of(user_id)
+
+    # Count how many of the user's friends each friend of a friend is linked to
+    mutual_counts = {}
+    for friend_id in friend_ids:
+        for candidate_id in index.neighbours_of(friend_id):
+            mutual_counts[candidate_id] = mutual_counts.get(candidate_id, 0) + 1
+
+    mutual_counts.pop(user_id, None)
+    for friend_id in friend_ids:
+        mutual_counts.pop(friend_id, None)
+
+    degree = len(friend_ids)
+    ranked = heapq.nsmallest(
+        top_k,
+        (
+            (
+                -mutual,
+                -mutual / (degree + index.degree(candidate_id) - mutual),
+                candidate_id,
+            )
+            for candidate_id, mutual in mutual_counts.items()
+        ),
+    )
+    return [(candidate_id, -mutual, -score) for mutual, score, candidate_id in ranked]
+
+
+def build_suggestions(top_k=20, chunk_size=1000, index=None, progress=None):
+    """
+    Recomputes the FriendSuggestion table from the friendship graph.
+
+    Users are processed in chunks of consecutive ids. The suggestions of a
+    chunk are computed in memory, then the stored rows of its id range are
+    replaced in one transaction, so memory stays bounded by the CSR index plus
+    one chunk of candidates. Returns the number of suggestions stored.
+    """
+    if index is None:
+        index = FriendGraphIndex.build()
+
+    total = 0
+    num_users = len(index.user_ids)
+    for chunk_start in range(0, max(num_users, 1), chunk_size):
+        chunk_end = min(chunk_start + chunk_size, num_users)
+
+        suggestions = []
+        for position in range(chunk_start, chunk_end):
+            user_id = index.user_ids[position]
+            for rank, (suggested_user_id, mutual, score) in enumerate(
+                rank_suggestions(index, user_id, top_k), start=1
+            ):
+                suggestions.append(
+                    FriendSuggestion(
+                        user_id=user_id,
+                        suggested_user_id=suggested_user_id,
+                        rank=rank,
+                        mutual_friends=mutual,
+                        score=score,
+                    )
+                )
+
+        # The id range covers users between chunks who have no friends left,
+        # and the first and last chunks are open ended.
+        stale = FriendSuggestion.objects.all()
+        if chunk_start > 0:
+            stale = stale.filter(user_id__gt=index.user_ids[chunk_start - 1])
+        if chunk_end < num_users:
+            stale = stale.filter(user_id__lte=index.user_ids[chunk_end - 1])
+
+        with transaction.atomic():
+            stale.delete()
+            FriendSuggestion.objects.bulk_create(suggestions, batch_size=1000)
+
+        total += len(suggestions)
+        if progress is not None:
+            progress(chunk_end, num_users, total)
+
+    return total
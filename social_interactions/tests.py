@@ -1,15 +1,71 @@
 from django.urls import reverse
+from django.core.management import call_command
 from django.utils import timezone
 from django.test import override_settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 
 from rest_framework import status
 from rest_framework.test import APIClient
 from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.test import force_authenticate
+from rest_framework.renderers import JSONRenderer
 
+import gc
+import csv
+import gzip
+import json
+import tempfile
+import threading
+from pathlib import Path
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from io import StringIO
 from unittest.mock import patch
 
-from .models import FriendRequest, Friend
+from utitlities.metrics import MetricsRegistry, get_metrics, reset_metrics
+
+from .models import (
+    ArchivedFriendRequest,
+    Block,
+    FriendRequest,
+    Friend,
+    FriendSuggestion,
+    SocialCounter,
+)
+from . import graph_index
+from .graph_index import (
+    FriendGraphIndex,
+    get_friend_graph_index,
+    reset_friend_graph_index,
+)
+from .graph_snapshot import GraphSnapshot, SnapshotError
+from .friendships import intersect_sorted
+from .block_filter import (
+    BlockFilter,
+    BloomFilter,
+    pair_key,
+    bump_generation,
+    get_block_filter,
+    reset_block_filter,
+)
+from .checks import check_block_filter_cache
+from .counters import get_counters, record_requests_sent
+from .retention import expire_friend_requests
+from .views import AsyncFriendListAPI, AsyncPendingFriendListAPI
+from .serializers import FriendRequestSerializer, FriendSuggestionSerializer
+from .friend_list_cache import get_friend_list_cache, reset_friend_list_cache
+from .throttles.custom_throttles import PerMinuteThrottle
+from .throttles.rate_limiter import (
+    CacheBackend,
+    DatabaseBackend,
+    LocMemBackend,
+    SlidingWindowRateLimiter,
+)
 
 
 class FriendRequestAPITest(APITestCase):
@@ -57,6 +113,34 @@ class FriendRequestAPITest(APITestCase):
             response.data["response"]["message"], "Friend request accepted successfully!"  # type: ignore
         )
 
+    def test_accept_friend_request_creates_mirrored_friendship(self):
+        """
+        Test accepting a friend request stores the friendship for both users.
+        """
+        # Set up
+        friend_request = FriendRequest.objects.create(
+            from_user=self.user1, to_user=self.user2
+        )
+        self.client.force_authenticate(user=self.user2)  # type: ignore
+        data = {"action": "accept", "friend_request_id": friend_request.id}  # type: ignore
+
+        # Test
+        response = self.client.post(self.URL, data, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Friend.objects.are_friends(self.user1.id, self.user2.id))  # type: ignore
+        self.assertTrue(Friend.objects.are_friends(self.user2.id, self.user1.id))  # type: ignore
+
+        # Sending a new request to a friend is rejected
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        FriendRequest.objects.all().delete()
+        response = self.client.post(
+            self.URL, {"action": "send", "friend_id": self.user2.id}, format="json"  # type: ignore
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["response"]["message"], "Friend request already accepted!"  # type: ignore
+        )
+
     def test_reject_friend_request(self):
         """
         Test rejecting a friend request from user2 to user1.
@@ -107,6 +191,168 @@ class FriendRequestAPITest(APITestCase):
         self.assertEqual(response.status_code, 429)
 
 
+class FriendRequestBulkAPITest(APITestCase):
+    URL = reverse("friend-request-bulk-api")
+
+    def setUp(self):
+        """
+        Set up the test environment by creating a user and four other users.
+        """
+        self.user = User.objects.create_user(
+            username="user", email="user@example.com", password="password"
+        )
+        self.others = [
+            User.objects.create_user(
+                username=f"user{i}", email=f"user{i}@example.com", password="password"
+            )
+            for i in range(4)
+        ]
+        self.client.force_authenticate(user=self.user)  # type: ignore
+
+    def test_bulk_send(self):
+        """
+        Test sending friend requests to many users with per item results.
+        """
+        # Set up
+        Friend.objects.create_friendship(self.user, self.others[0])
+        FriendRequest.objects.create(from_user=self.others[1], to_user=self.user)
+        friend_ids = [other.id for other in self.others] + [0]  # type: ignore
+
+        # Test
+        response = self.client.post(
+            self.URL, {"action": "send", "friend_ids": friend_ids}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data["success"])  # type: ignore
+        self.assertEqual(
+            [
+                (result["friend_id"], result["status"])
+                for result in response.data["response"]["results"]  # type: ignore
+            ],
+            [
+                (self.others[0].id, 400),  # type: ignore
+                (self.others[1].id, 400),  # type: ignore
+                (self.others[2].id, 200),  # type: ignore
+                (self.others[3].id, 429),  # type: ignore
+                (0, 400),
+            ],
+        )
+        self.assertTrue(
+            FriendRequest.objects.filter(
+                from_user=self.user, to_user=self.others[2]
+            ).exists()
+        )
+
+    def test_bulk_accept_and_reject(self):
+        """
+        Test accepting and rejecting many friend requests.
+        """
+        # Set up
+        friend_requests = [
+            FriendRequest.objects.create(from_user=other, to_user=self.user)
+            for other in self.others
+        ]
+        outgoing_request = FriendRequest.objects.create(
+            from_user=self.user, to_user=User.objects.create(username="user5")
+        )
+
+        # Test
+        with self.assertNumQueries(10):
+            response = self.client.post(
+                self.URL,
+                {
+                    "action": "accept",
+                    "friend_request_ids": [fr.id for fr in friend_requests[:3]]  # type: ignore
+                    + [outgoing_request.id],  # type: ignore
+                },
+                format="json",
+            )
+        self.assertEqual(
+            [
+                result["status"]
+                for result in response.data["response"]["results"]  # type: ignore
+            ],
+            [200, 200, 200, 404],
+        )
+        for other in self.others[:3]:
+            self.assertTrue(Friend.objects.are_friends(self.user.id, other.id))  # type: ignore
+
+        response = self.client.post(
+            self.URL,
+            {"action": "reject", "friend_request_ids": [friend_requests[3].id, "x"]},  # type: ignore
+            format="json",
+        )
+        self.assertEqual(
+            [
+                result["status"]
+                for result in response.data["response"]["results"]  # type: ignore
+            ],
+            [200, 404],
+        )
+        self.assertTrue(FriendRequest.objects.get(id=friend_requests[3].id).rejected)  # type: ignore
+
+    def test_bulk_validation(self):
+        """
+        Test the bulk endpoint validates its input like the single endpoint.
+        """
+        response = self.client.post(self.URL, {"action": "send"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["response"]["message"], "Please select friend!")  # type: ignore
+
+        response = self.client.post(
+            self.URL,
+            {"action": "accept", "friend_request_ids": list(range(101))},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class RateLimiterTest(APITestCase):
+    def assert_sliding_window(self, backend):
+        """
+        Assert that the limiter allows `limit` hits per sliding window.
+        """
+        limiter = SlidingWindowRateLimiter(backend, limit=3, period=60)
+
+        # Three hits are allowed in the first window, the fourth is rejected
+        self.assertEqual(
+            [limiter.hit("user:1", now=600 + i).allowed for i in range(4)],
+            [True, True, True, False],
+        )
+        self.assertEqual(limiter.hit("user:1", now=610).retry_after, 50)
+        self.assertTrue(limiter.hit("user:2", now=610).allowed)
+
+        # Halfway into the next window half of the previous hits still count
+        self.assertTrue(limiter.hit("user:1", now=690).allowed)
+        self.assertFalse(limiter.hit("user:1", now=690).allowed)
+
+        # Two windows later the previous hits have slid out
+        self.assertTrue(limiter.hit("user:1", now=780).allowed)
+
+    def test_locmem_backend(self):
+        self.assert_sliding_window(LocMemBackend())
+
+    def test_database_backend(self):
+        self.assert_sliding_window(DatabaseBackend())
+
+    def test_cache_backend(self):
+        self.assert_sliding_window(CacheBackend())
+
+    @patch.object(PerMinuteThrottle, "THROTTLE_RATES", {"per_minute": "2/min"})
+    def test_per_minute_throttle(self):
+        """
+        Test that PerMinuteThrottle counts requests with the rate limiter.
+        """
+        user = User.objects.create_user(
+            username="user1", email="user1@example.com", password="password"
+        )
+        request = APIRequestFactory().get("/")
+        request.user = user
+
+        results = [PerMinuteThrottle().allow_request(request, None) for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+
+
 class FriendListAPITest(APITestCase):
     URL = reverse("friend-list-api")
 
@@ -165,6 +411,41 @@ class FriendListAPITest(APITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["count"], count)  # type: ignore
 
+    def test_cursor_pagination(self):
+        """
+        Test cursor pagination of the friend list.
+        """
+        # Set up
+        count = 15
+        users = [
+            User.objects.create_user(
+                username=f"user{i}@example.com",
+                email=f"user{i}@example.com",
+                password="password",
+            )
+            for i in range(30, 30 + count)
+        ]
+        for user in users:
+            Friend.objects.create(friend1=self.user1, friend2=user)
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+
+        # Test
+        response = self.client.get(self.URL, {"pagination": "cursor"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("count", response.data)  # type: ignore
+        self.assertEqual(len(response.data["results"]), 10)  # type: ignore
+        self.assertIsNotNone(response.data["next"])  # type: ignore
+
+        next_page = self.client.get(response.data["next"])  # type: ignore
+        self.assertEqual(next_page.status_code, 200)
+        self.assertEqual(len(next_page.data["results"]), count + 1 - 10)  # type: ignore
+        self.assertIsNone(next_page.data["next"])  # type: ignore
+        emails = [
+            user["email"]
+            for user in response.data["results"] + next_page.data["results"]  # type: ignore
+        ]
+        self.assertEqual(emails, sorted(emails))
+
     def test_authenticated_user_access(self):
         """
         Test authenticated access to the friend list.
@@ -179,6 +460,142 @@ class FriendListAPITest(APITestCase):
         self.assertEqual(response.status_code, 200)
 
 
+class MutualFriendListAPITest(APITestCase):
+    URL = reverse("mutual-friend-list-api")
+
+    def setUp(self):
+        """
+        Set up the test environment by creating four users, where user1 and user2 share user3 as a friend.
+        """
+        self.user1 = User.objects.create_user(
+            username="user1", email="user1@example.com", password="password"
+        )
+        self.user2 = User.objects.create_user(
+            username="user2", email="user2@example.com", password="password"
+        )
+        self.user3 = User.objects.create_user(
+            username="user3", email="user3@example.com", password="password"
+        )
+        self.user4 = User.objects.create_user(
+            username="user4", email="user4@example.com", password="password"
+        )
+        Friend.objects.create_friendship(self.user1, self.user3)
+        Friend.objects.create_friendship(self.user2, self.user3)
+        Friend.objects.create_friendship(self.user1, self.user4)
+
+    def test_get_mutual_friend_list(self):
+        """
+        Test getting the mutual friends of two users.
+        """
+        # Set up
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+
+        # Test
+        response = self.client.get(self.URL, {"user_id": self.user2.id})  # type: ignore
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)  # type: ignore
+        self.assertEqual(response.data["results"][0]["id"], self.user3.id)  # type: ignore
+
+    def test_get_mutual_friend_list_invalid_user(self):
+        """
+        Test getting mutual friends without a valid user.
+        """
+        # Set up
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+
+        # Test
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["response"]["message"], "Please select user!")  # type: ignore
+
+        response = self.client.get(self.URL, {"user_id": "unknown"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data["response"]["message"], "Please select valid user!"  # type: ignore
+        )
+
+    def test_intersect_sorted(self):
+        """
+        Test intersecting sorted id lists of similar and very different sizes.
+        """
+        self.assertEqual(intersect_sorted([1, 3, 5, 7], [2, 3, 4, 7]), [3, 7])
+        self.assertEqual(intersect_sorted([], [1, 2]), [])
+        self.assertEqual(
+            intersect_sorted(list(range(0, 1000, 2)), [4, 501, 998]), [4, 998]
+        )
+
+
+class ConnectionPathAPITest(APITestCase):
+    URL = "/social/api/v1/connection-path/"
+
+    def setUp(self):
+        """
+        Set up a chain of friends user0 - user1 - user2 - user3, with user1
+        also friends with user5, and user4 without friends.
+        """
+        self.users = [
+            User.objects.create_user(username=f"user{i}", email=f"user{i}@example.com")
+            for i in range(6)
+        ]
+        for user1, user2 in zip(self.users[:3], self.users[1:4]):
+            Friend.objects.create_friendship(user1, user2)
+        Friend.objects.create_friendship(self.users[1], self.users[5])
+        self.client.force_authenticate(user=self.users[0])  # type: ignore
+        reset_friend_graph_index()
+        self.addCleanup(reset_friend_graph_index)
+
+    def test_shortest_path(self):
+        """
+        Test the path is found with one Friend query per level.
+        """
+        # User check, three levels, then the users on the path
+        with self.assertNumQueries(5):
+            response = self.client.get(self.URL, {"user_id": self.users[3].id})
+        self.assertEqual(response.status_code, 200)  # type: ignore
+        self.assertEqual(response.data["response"]["degrees"], 3)  # type: ignore
+        self.assertEqual(
+            [user["id"] for user in response.data["response"]["path"]],  # type: ignore
+            [user.id for user in self.users[:4]],
+        )
+
+        with override_settings(SOCIAL_GRAPH_INDEX={"ENABLED": True, "MAX_AGE": None}):
+            response = self.client.get(self.URL, {"user_id": self.users[3].id})
+        self.assertEqual(response.data["response"]["degrees"], 3)  # type: ignore
+
+    def test_no_path(self):
+        """
+        Test users further than max_depth or unreachable are reported.
+        """
+        response = self.client.get(
+            self.URL, {"user_id": self.users[3].id, "max_depth": 2}
+        )
+        self.assertEqual(response.status_code, 404)  # type: ignore
+        self.assertEqual(
+            response.data["response"]["message"], "No connection within 2 degrees!"  # type: ignore
+        )
+
+        response = self.client.get(self.URL, {"user_id": self.users[4].id})
+        self.assertEqual(response.status_code, 404)  # type: ignore
+
+        response = self.client.get(self.URL, {"user_id": "abc"})
+        self.assertEqual(response.status_code, 400)  # type: ignore
+
+    @override_settings(CONNECTION_PATH={"MAX_DEPTH": 6, "MAX_VISITS": 2})
+    def test_visit_budget(self):
+        """
+        Test the search stops once it has read more friendships than allowed.
+        """
+        response = self.client.get(self.URL, {"user_id": self.users[3].id})
+        self.assertEqual(response.status_code, 404)  # type: ignore
+        self.assertEqual(
+            response.data["response"]["message"],  # type: ignore
+            "Search limit reached before finding a connection!",
+        )
+
+        response = self.client.get(self.URL, {"user_id": self.users[1].id})
+        self.assertEqual(response.status_code, 200)  # type: ignore
+
+
 class PendingFriendListAPITest(APITestCase):
     URL = reverse("pending-friend-requests")
 
@@ -244,6 +661,61 @@ class PendingFriendListAPITest(APITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data["count"], count)  # type: ignore
 
+    def test_cursor_pagination(self):
+        """
+        Test cursor pagination of the pending friend list.
+        """
+        # Set up
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+
+        # Test
+        response = self.client.get(self.URL, {"pagination": "cursor"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("count", response.data)  # type: ignore
+        self.assertEqual(
+            [request["id"] for request in response.data["results"]],  # type: ignore
+            [self.friend_request2.id, self.friend_request1.id],  # type: ignore
+        )
+
+    def test_matches_serializer_output(self):
+        """
+        Test the rendered results match FriendRequestSerializer byte for byte.
+        """
+        # Set up
+        self.user3.first_name = "Third"
+        self.user3.save()
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        friend_requests = FriendRequest.objects.filter(
+            id__in=[self.friend_request1.id, self.friend_request2.id]  # type: ignore
+        ).order_by("-created_at", "id")
+
+        # Test
+        response = self.client.get(self.URL)
+        expected = FriendRequestSerializer(friend_requests, many=True).data
+        self.assertEqual(
+            JSONRenderer().render(response.data["results"]),  # type: ignore
+            JSONRenderer().render(expected),
+        )
+
+    def test_users_joined_in_one_query(self):
+        """
+        Test a full page is listed without a query per friend request.
+        """
+        # Set up
+        for i in range(20):
+            user = User.objects.create_user(
+                username=f"sender{i}",
+                email=f"sender{i}@example.com",
+                password="password",
+            )
+            FriendRequest.objects.create(from_user=user, to_user=self.user1)
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+
+        # Test: count, page and counters
+        with self.assertNumQueries(3):
+            response = self.client.get(self.URL)
+        self.assertEqual(len(response.data["results"]), 10)  # type: ignore
+
     def test_authenticated_user_access(self):
         """
         Test authenticated access to the pending friend list.
@@ -256,3 +728,1127 @@ class PendingFriendListAPITest(APITestCase):
         self.client.force_authenticate(user=self.user1)  # type: ignore
         response = self.client.get(self.URL)
         self.assertEqual(response.status_code, 200)
+
+
+class FriendGraphIndexTest(APITestCase):
+    GRAPH_INDEX_SETTINGS = {"ENABLED": True, "MAX_AGE": None, "CHUNK_SIZE": 100}
+
+    def setUp(self):
+        """
+        Set up the test environment by creating three users, two of them friends.
+        """
+        self.user1 = User.objects.create_user(
+            username="user1", email="user1@example.com", password="password"
+        )
+        self.user2 = User.objects.create_user(
+            username="user2", email="user2@example.com", password="password"
+        )
+        self.user3 = User.objects.create_user(
+            username="user3", email="user3@example.com", password="password"
+        )
+        Friend.objects.create_friendship(self.user1, self.user2)
+        reset_friend_graph_index()
+        self.addCleanup(reset_friend_graph_index)
+
+    def test_from_edges(self):
+        """
+        Test building the index from sorted edges.
+        """
+        index = FriendGraphIndex.from_edges([(1, 2), (1, 3), (2, 1), (3, 1)])
+
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.neighbours_of(1), [2, 3])
+        self.assertEqual(index.neighbours_of(4), [])
+        self.assertTrue(index.are_friends(3, 1))
+        self.assertFalse(index.are_friends(2, 3))
+
+        index.add_friendship(2, 3)
+        self.assertTrue(index.are_friends(3, 2))
+        self.assertEqual(index.neighbours_of(2), [1, 3])
+
+    def test_friend_list_reads_from_index(self):
+        """
+        Test the friend list is served from the index and kept current on accept.
+        """
+        with override_settings(SOCIAL_GRAPH_INDEX=self.GRAPH_INDEX_SETTINGS):
+            self.client.force_authenticate(user=self.user2)  # type: ignore
+            response = self.client.get(reverse("friend-list-api"))
+            self.assertEqual(response.data["count"], 1)  # type: ignore
+
+            friend_request = FriendRequest.objects.create(
+                from_user=self.user3, to_user=self.user2
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("friend-request-api"),
+                    {"action": "accept", "friend_request_id": friend_request.id},  # type: ignore
+                    format="json",
+                )
+            self.assertEqual(response.status_code, 200)
+
+            # Count, page and counters, no Friend query
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse("friend-list-api"))
+            self.assertEqual(
+                [user["id"] for user in response.data["results"]],  # type: ignore
+                [self.user1.id, self.user3.id],  # type: ignore
+            )
+
+    def test_stale_index_rebuilds_in_background(self):
+        """
+        Test a stale index keeps serving while it is rebuilt in another thread.
+        """
+        settings = dict(self.GRAPH_INDEX_SETTINGS, MAX_AGE=60)
+        with override_settings(SOCIAL_GRAPH_INDEX=settings):
+            stale = get_friend_graph_index()
+            stale.built_at -= 120  # type: ignore
+            stale.add_friendship(self.user1.id, self.user3.id)  # type: ignore
+
+            threads = []
+            rebuilt = FriendGraphIndex.from_edges([(1, 2), (2, 1)])
+
+            def load(config):
+                threads.append(threading.current_thread())
+                graph_index.record_friendship(self.user2.id, self.user3.id)
+                return rebuilt
+
+            with patch("social_interactions.graph_index.load_friend_graph_index", load):
+                self.assertIs(get_friend_graph_index(), stale)
+                # Held until the rebuild is swapped in
+                with graph_index._build_lock:
+                    pass
+
+            self.assertIsNot(threads[0], threading.current_thread())
+            self.assertIs(get_friend_graph_index(), rebuilt)
+            # The friendships recorded before and during the rebuild are
+            # carried over
+            self.assertTrue(rebuilt.are_friends(self.user3.id, self.user1.id))  # type: ignore
+            self.assertTrue(rebuilt.are_friends(self.user3.id, self.user2.id))  # type: ignore
+
+    def write_snapshot(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = str(Path(directory.name) / "graph.snapshot")
+        call_command("write_graph_snapshot", f"--output={path}", stdout=StringIO())
+        return path
+
+    def test_snapshot_round_trip(self):
+        """
+        Test that a snapshot maps to the same arrays as a build from SQL.
+        """
+        Friend.objects.create_friendship(self.user1, self.user3)
+        path = self.write_snapshot()
+
+        snapshot = GraphSnapshot(path)
+        built = FriendGraphIndex.build()
+        self.assertEqual(list(snapshot.user_ids), list(built.user_ids))
+        self.assertEqual(list(snapshot.offsets), list(built.offsets))
+        self.assertEqual(list(snapshot.neighbours), list(built.neighbours))
+
+        # Flipping a byte of the arrays fails the checksum
+        data = bytearray(Path(path).read_bytes())
+        data[-1] ^= 0xFF
+        Path(path).write_bytes(bytes(data))
+        with self.assertRaises(SnapshotError):
+            GraphSnapshot(path)
+
+    def test_snapshot_index_reads_delta(self):
+        """
+        Test the index loaded from a snapshot includes friendships created since.
+        """
+        path = self.write_snapshot()
+        Friend.objects.create_friendship(self.user2, self.user3)
+
+        settings = dict(self.GRAPH_INDEX_SETTINGS, SNAPSHOT_PATH=path)
+        with override_settings(SOCIAL_GRAPH_INDEX=settings):
+            index = get_friend_graph_index()
+        self.assertIsNotNone(index.snapshot)  # type: ignore
+        self.assertEqual(len(index), 2)  # type: ignore
+        self.assertEqual(index.neighbours_of(self.user2.id), [self.user1.id, self.user3.id])  # type: ignore
+        self.assertTrue(index.are_friends(self.user3.id, self.user2.id))  # type: ignore
+
+    def test_large_delta_is_logged(self):
+        """
+        Test a warning is logged when many friendships were created since
+        the snapshot.
+        """
+        path = self.write_snapshot()
+        Friend.objects.create_friendship(self.user2, self.user3)
+
+        settings = dict(
+            self.GRAPH_INDEX_SETTINGS, SNAPSHOT_PATH=path, SNAPSHOT_DELTA_WARNING=0
+        )
+        with override_settings(SOCIAL_GRAPH_INDEX=settings):
+            with self.assertLogs("social_interactions.graph_index", "WARNING"):
+                index = get_friend_graph_index()
+        self.assertIsNotNone(index.snapshot)  # type: ignore
+
+    def test_missing_snapshot_builds_from_table(self):
+        """
+        Test the index falls back to the Friend table without a usable snapshot.
+        """
+        settings = dict(self.GRAPH_INDEX_SETTINGS, SNAPSHOT_PATH="/nonexistent/graph")
+        with override_settings(SOCIAL_GRAPH_INDEX=settings):
+            with self.assertLogs("social_interactions.graph_index", "WARNING"):
+                index = get_friend_graph_index()
+        self.assertIsNone(index.snapshot)  # type: ignore
+        self.assertTrue(index.are_friends(self.user1.id, self.user2.id))  # type: ignore
+
+
+class FriendSuggestionListAPITest(APITestCase):
+    URL = reverse("friend-suggestions")
+
+    def setUp(self):
+        """
+        Set up the test environment with user1 friends with user2 and user3, who are both friends with user4.
+        """
+        self.user1, self.user2, self.user3, self.user4, self.user5 = [
+            User.objects.create_user(
+                username=f"user{i}", email=f"user{i}@example.com", password="password"
+            )
+            for i in range(1, 6)
+        ]
+        Friend.objects.create_friendship(self.user1, self.user2)
+        Friend.objects.create_friendship(self.user1, self.user3)
+        Friend.objects.create_friendship(self.user2, self.user4)
+        Friend.objects.create_friendship(self.user3, self.user4)
+        Friend.objects.create_friendship(self.user3, self.user5)
+
+    def test_build_friend_suggestions(self):
+        """
+        Test the batch job ranks friends of friends by mutual friend count.
+        """
+        call_command("build_friend_suggestions", "--chunk-size", "2", stdout=StringIO())
+
+        suggestions = FriendSuggestion.objects.filter(user=self.user1)
+        self.assertEqual(
+            [(s.suggested_user_id, s.mutual_friends) for s in suggestions],
+            [(self.user4.id, 2), (self.user5.id, 1)],  # type: ignore
+        )
+        self.assertEqual(suggestions[0].score, 1.0)
+
+        # Rebuilding replaces the stored suggestions
+        call_command("build_friend_suggestions", stdout=StringIO())
+        self.assertEqual(FriendSuggestion.objects.filter(user=self.user1).count(), 2)
+
+    def test_get_friend_suggestions(self):
+        """
+        Test getting friend suggestions, excluding users who became friends since the build.
+        """
+        # Set up
+        call_command("build_friend_suggestions", stdout=StringIO())
+        Friend.objects.create_friendship(self.user1, self.user4)
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+
+        # Test
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)  # type: ignore
+        self.assertEqual(response.data["results"][0]["user"]["id"], self.user5.id)  # type: ignore
+        self.assertEqual(response.data["results"][0]["mutual_friends"], 1)  # type: ignore
+
+    def test_matches_serializer_output(self):
+        """
+        Test the rendered results match FriendSuggestionSerializer byte for byte.
+        """
+        # Set up
+        call_command("build_friend_suggestions", stdout=StringIO())
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+
+        # Test
+        response = self.client.get(self.URL)
+        expected = FriendSuggestionSerializer(
+            FriendSuggestion.objects.filter(user=self.user1).order_by("rank"),
+            many=True,
+        ).data
+        self.assertTrue(expected)
+        self.assertEqual(
+            JSONRenderer().render(response.data["results"]),  # type: ignore
+            JSONRenderer().render(expected),
+        )
+
+
+class SocialCounterTest(APITestCase):
+    URL = reverse("friend-request-api")
+
+    def setUp(self):
+        """
+        Set up the test environment by creating three users.
+        """
+        self.user1, self.user2, self.user3 = [
+            User.objects.create_user(
+                username=f"user{i}", email=f"user{i}@example.com", password="password"
+            )
+            for i in range(1, 4)
+        ]
+
+    def post_action(self, user, data):
+        self.client.force_authenticate(user=user)  # type: ignore
+        response = self.client.post(self.URL, data, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_counters_follow_friend_requests(self):
+        """
+        Test the counters are updated on send, accept and reject.
+        """
+        self.post_action(self.user1, {"action": "send", "friend_id": self.user2.id})  # type: ignore
+        self.post_action(self.user1, {"action": "send", "friend_id": self.user3.id})  # type: ignore
+        self.assertEqual(
+            get_counters(self.user1.id),  # type: ignore
+            {"friends": 0, "incoming_pending": 0, "outgoing_pending": 2},
+        )
+        self.assertEqual(get_counters(self.user2.id)["incoming_pending"], 1)  # type: ignore
+
+        request1, request2 = FriendRequest.objects.order_by("id")
+        self.post_action(self.user2, {"action": "accept", "friend_request_id": request1.id})  # type: ignore
+        self.post_action(self.user3, {"action": "reject", "friend_request_id": request2.id})  # type: ignore
+        # Accepting twice is not counted twice
+        self.post_action(self.user2, {"action": "accept", "friend_request_id": request1.id})  # type: ignore
+
+        self.assertEqual(
+            get_counters(self.user1.id),  # type: ignore
+            {"friends": 1, "incoming_pending": 0, "outgoing_pending": 0},
+        )
+        self.assertEqual(
+            get_counters(self.user2.id),  # type: ignore
+            {"friends": 1, "incoming_pending": 0, "outgoing_pending": 0},
+        )
+        self.assertEqual(get_counters(self.user3.id)["incoming_pending"], 0)  # type: ignore
+
+        # Counters are exposed on list responses
+        response = self.client.get(reverse("friend-list-api"))
+        self.assertEqual(response.data["counters"]["friends"], 1)  # type: ignore
+
+    def test_accepting_both_directions_counts_one_friendship(self):
+        """
+        Test accepting a request between users who are already friends is not counted.
+        """
+        # A rejected request and a pending one in the other direction, accepted
+        # one way or the other on both paths
+        requests = {}
+        for user in (self.user2, self.user3):
+            requests[user, "rejected"] = FriendRequest.objects.create(
+                from_user=self.user1, to_user=user, rejected=True
+            )
+            requests[user, "pending"] = FriendRequest.objects.create(
+                from_user=user, to_user=self.user1
+            )
+            record_requests_sent([(user.id, self.user1.id)])
+
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        self.client.post(
+            reverse("friend-request-bulk-api"),
+            {
+                "action": "accept",
+                "friend_request_ids": [requests[self.user2, "pending"].id],
+            },
+            format="json",
+        )
+        self.post_action(self.user2, {"action": "accept", "friend_request_id": requests[self.user2, "rejected"].id})  # type: ignore
+
+        self.post_action(self.user1, {"action": "accept", "friend_request_id": requests[self.user3, "pending"].id})  # type: ignore
+        self.client.force_authenticate(user=self.user3)  # type: ignore
+        self.client.post(
+            reverse("friend-request-bulk-api"),
+            {
+                "action": "accept",
+                "friend_request_ids": [requests[self.user3, "rejected"].id],
+            },
+            format="json",
+        )
+
+        self.assertEqual(
+            get_counters(self.user1.id),  # type: ignore
+            {"friends": 2, "incoming_pending": 0, "outgoing_pending": 0},
+        )
+        for user in (self.user2, self.user3):
+            self.assertEqual(
+                get_counters(user.id),  # type: ignore
+                {"friends": 1, "incoming_pending": 0, "outgoing_pending": 0},
+            )
+
+    def test_counters_are_locked_in_user_order(self):
+        """
+        Test the counter rows of both users are locked in user id order before updating.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            record_requests_sent([(self.user2.id, self.user1.id)])  # type: ignore
+        lock, *updates = [
+            query["sql"] for query in queries if not query["sql"].startswith("INSERT")
+        ]
+        self.assertTrue(lock.startswith("SELECT"))
+        self.assertIn(
+            'ORDER BY "social_interactions_socialcounter"."user_id" ASC', lock
+        )
+        self.assertEqual(len(updates), 2)
+
+    def test_reconcile_social_counters(self):
+        """
+        Test the reconciliation command repairs drifted counters.
+        """
+        Friend.objects.create_friendship(self.user1, self.user2)
+        FriendRequest.objects.create(from_user=self.user3, to_user=self.user1)
+        SocialCounter.objects.create(user=self.user2, friends=5, outgoing_pending=1)
+
+        out = StringIO()
+        call_command("reconcile_social_counters", stdout=out)
+        self.assertIn("Repaired 3 users", out.getvalue())
+
+        self.assertEqual(
+            get_counters(self.user1.id),  # type: ignore
+            {"friends": 1, "incoming_pending": 1, "outgoing_pending": 0},
+        )
+        self.assertEqual(
+            get_counters(self.user2.id),  # type: ignore
+            {"friends": 1, "incoming_pending": 0, "outgoing_pending": 0},
+        )
+        self.assertEqual(get_counters(self.user3.id)["outgoing_pending"], 1)  # type: ignore
+
+
+@override_settings(
+    FRIEND_LIST_CACHE={
+        "ENABLED": True,
+        "CACHE": "default",
+        "TTL": 300,
+        "LOCAL_MAX_ENTRIES": 2,
+    }
+)
+class FriendListCacheTest(APITestCase):
+    URL = reverse("friend-list-api")
+
+    def setUp(self):
+        """
+        Set up the test environment by creating three users, two of them friends.
+        """
+        self.user1, self.user2, self.user3 = [
+            User.objects.create_user(
+                username=f"user{i}", email=f"user{i}@example.com", password="password"
+            )
+            for i in range(1, 4)
+        ]
+        Friend.objects.create_friendship(self.user1, self.user2)
+        cache.clear()
+        reset_friend_list_cache()
+        self.addCleanup(cache.clear)
+        self.addCleanup(reset_friend_list_cache)
+
+    def get_emails(self, response):
+        return [user["email"] for user in response.data["results"]]  # type: ignore
+
+    def test_cached_page_is_served(self):
+        """
+        Test a repeated request is served from the cache without listing friends.
+        """
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        first = self.client.get(self.URL)
+        self.assertEqual(self.get_emails(first), ["user2@example.com"])
+
+        # Only the session user and the counters are loaded
+        with self.assertNumQueries(1):
+            second = self.client.get(self.URL)
+        self.assertEqual(second.data, first.data)  # type: ignore
+        self.assertEqual(get_friend_list_cache().stats()["local_hits"], 1)  # type: ignore
+
+    def test_pages_are_cached_separately(self):
+        """
+        Test query parameters are part of the cache key.
+        """
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        self.client.get(self.URL)
+        response = self.client.get(self.URL, {"pagination": "cursor"})
+        self.assertNotIn("count", response.data)  # type: ignore
+        self.assertEqual(get_friend_list_cache().stats()["misses"], 2)  # type: ignore
+
+    def test_accepting_request_invalidates_both_lists(self):
+        """
+        Test a new friendship is listed right away for both users.
+        """
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        self.client.get(self.URL)
+        self.client.force_authenticate(user=self.user3)  # type: ignore
+        self.assertEqual(self.get_emails(self.client.get(self.URL)), [])
+
+        friend_request = FriendRequest.objects.create(
+            from_user=self.user1, to_user=self.user3
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("friend-request-api"),
+                {"action": "accept", "friend_request_id": friend_request.id},  # type: ignore
+                format="json",
+            )
+
+        response = self.client.get(self.URL)
+        self.assertEqual(self.get_emails(response), ["user1@example.com"])
+        self.assertEqual(response.data["counters"]["friends"], 1)  # type: ignore
+
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        response = self.client.get(self.URL)
+        self.assertEqual(
+            self.get_emails(response), ["user2@example.com", "user3@example.com"]
+        )
+
+    def test_deleting_friendship_invalidates_list(self):
+        """
+        Test a deleted friendship is no longer listed.
+        """
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        self.assertEqual(
+            self.get_emails(self.client.get(self.URL)), ["user2@example.com"]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Friend.objects.filter(friend1=self.user1).delete()
+
+        self.assertEqual(self.get_emails(self.client.get(self.URL)), [])
+
+    def test_renaming_friend_invalidates_list(self):
+        """
+        Test a friend's new name and email are listed.
+        """
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        self.client.get(self.URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user2.email = "renamed@example.com"
+            self.user2.save(update_fields=["email"])
+
+        self.assertEqual(
+            self.get_emails(self.client.get(self.URL)), ["renamed@example.com"]
+        )
+
+    def test_pages_are_built_from_friend_table(self):
+        """
+        Test cached pages do not come from a graph index missing a friendship
+        accepted by another process.
+        """
+        reset_friend_graph_index()
+        self.addCleanup(reset_friend_graph_index)
+        with override_settings(SOCIAL_GRAPH_INDEX={"ENABLED": True, "MAX_AGE": None}):
+            get_friend_graph_index()
+            Friend.objects.bulk_create(
+                [
+                    Friend(friend1=self.user1, friend2=self.user3),
+                    Friend(friend1=self.user3, friend2=self.user1),
+                ]
+            )
+            self.client.force_authenticate(user=self.user1)  # type: ignore
+            response = self.client.get(self.URL)
+
+        self.assertEqual(
+            self.get_emails(response), ["user2@example.com", "user3@example.com"]
+        )
+
+    def test_local_entries_are_bounded(self):
+        """
+        Test the per-process tier evicts the least recently used pages.
+        """
+        friend_list_cache = get_friend_list_cache()
+        for page in range(3):
+            friend_list_cache.set(self.user1.id, 1, str(page), {"page": page})  # type: ignore
+
+        self.assertEqual(friend_list_cache.stats()["local_entries"], 2)  # type: ignore
+        # The evicted page is still read from the shared cache
+        self.assertEqual(friend_list_cache.get(self.user1.id, 1, "0"), {"page": 0})  # type: ignore
+        self.assertEqual(friend_list_cache.stats()["shared_hits"], 1)  # type: ignore
+
+
+class MetricsTest(APITestCase):
+    URL = reverse("metrics")
+
+    def setUp(self):
+        """
+        Set up the test environment with an empty registry and two users.
+        """
+        reset_metrics()
+        self.addCleanup(reset_metrics)
+        self.user1, self.user2 = [
+            User.objects.create_user(
+                username=f"user{i}", email=f"user{i}@example.com", password="password"
+            )
+            for i in range(1, 3)
+        ]
+        self.staff = User.objects.create_user(username="staff", is_staff=True)
+
+    def test_requests_are_recorded_per_view(self):
+        """
+        Test latency, status, query and 429 metrics are exported per URL name.
+        """
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        for _ in range(4):
+            self.client.post(
+                reverse("friend-request-api"),
+                {"action": "send", "friend_id": self.user2.id},  # type: ignore
+                format="json",
+            )
+        self.client.get(reverse("friend-list-api"))
+
+        self.client.force_login(self.staff)  # type: ignore
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            response["Content-Type"].startswith("text/plain; version=0.0.4")
+        )
+        body = response.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        self.assertIn(
+            'http_request_duration_seconds_count{method="POST",view="friend-request-api"} 4',
+            body,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{method="GET",view="friend-list-api",le="+Inf"} 1',
+            body,
+        )
+        self.assertIn(
+            'http_requests_total{method="POST",status="429",view="friend-request-api"} 1',
+            body,
+        )
+        self.assertIn('http_throttled_total{view="friend-request-api"} 1', body)
+        self.assertIn('db_queries_total{view="friend-list-api"}', body)
+
+    @override_settings(
+        FRIEND_LIST_CACHE={"ENABLED": True, "CACHE": "default", "TTL": 300}
+    )
+    def test_cache_lookups_are_recorded(self):
+        """
+        Test friend list cache hits and misses are counted.
+        """
+        cache.clear()
+        reset_friend_list_cache()
+        self.addCleanup(cache.clear)
+        self.addCleanup(reset_friend_list_cache)
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        self.client.get(reverse("friend-list-api"))
+        self.client.get(reverse("friend-list-api"))
+
+        body = get_metrics().render()
+        self.assertIn('cache_requests_total{cache="friend_list",result="miss"} 1', body)
+        self.assertIn(
+            'cache_requests_total{cache="friend_list",result="local_hit"} 1', body
+        )
+
+    def test_threads_are_summed(self):
+        """
+        Test values recorded by several threads are summed when collected.
+        """
+        registry = MetricsRegistry(buckets=(0.1, 1))
+
+        def record():
+            for value in (0.05, 0.5, 5):
+                registry.observe("latency", value, view="test")
+                registry.increment("hits", view="test")
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        counters, histograms = registry.collect()
+        self.assertEqual(counters[("hits", (("view", "test"),))], 12)
+        histogram = histograms[("latency", (("view", "test"),))]
+        self.assertEqual(histogram[:3], [4, 4, 4])
+        self.assertAlmostEqual(histogram[3], 22.2)
+
+        # The shards of the ended threads were folded into the base shard
+        gc.collect()
+        self.assertEqual(registry._shards, [])
+        self.assertEqual(registry.collect()[0], counters)
+
+    def test_access_is_restricted(self):
+        """
+        Test only staff users and allowed addresses can read the metrics.
+        """
+        self.client.force_login(self.user1)  # type: ignore
+        self.assertEqual(self.client.get(self.URL).status_code, 403)
+        self.client.force_login(self.staff)  # type: ignore
+        self.assertEqual(self.client.get(self.URL).status_code, 200)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(self.URL).status_code, 403)
+        with override_settings(METRICS={"ENABLED": True, "ALLOWED_IPS": ("10.0.0.1",)}):
+            response = self.client.get(self.URL, REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS={"ENABLED": False})
+    def test_disabled(self):
+        """
+        Test the endpoint is not found when metrics are disabled.
+        """
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 404)
+
+
+class AsyncViewsTest(APITestCase):
+    def setUp(self):
+        """
+        Set up the test environment with a user with 12 friends and 12 pending requests.
+        """
+        self.user = User.objects.create_user(
+            username="user", email="user@example.com", password="password"
+        )
+        for i in range(12):
+            friend = User.objects.create_user(
+                username=f"friend{i}",
+                email=f"friend{i:02}@example.com",
+                first_name=f"Friend {i}",
+                password="password",
+            )
+            Friend.objects.create_friendship(self.user, friend)
+            sender = User.objects.create_user(
+                username=f"sender{i}",
+                email=f"sender{i}@example.com",
+                password="password",
+            )
+            FriendRequest.objects.create(from_user=sender, to_user=self.user)
+
+    def get_async(self, view_class, url, params=None, user=None):
+        request = APIRequestFactory().get(url, params)
+        if user is not None:
+            force_authenticate(request, user=user)
+        return async_to_sync(view_class.as_view())(request)
+
+    def assert_same_responses(self, view_class, url, params):
+        """
+        Assert the async view renders the same body as the sync view, on the
+        first page and on the page its next link points to.
+        """
+        self.client.force_authenticate(user=self.user)  # type: ignore
+        for _ in range(2):
+            expected = self.client.get(url, params)
+            response = self.get_async(view_class, url, params, self.user)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(response.content, expected.content)
+            url, params = expected.data["next"], None  # type: ignore
+
+    def test_friend_list(self):
+        """
+        Test the async friend list matches the sync one in both pagination modes.
+        """
+        url = reverse("friend-list-api")
+        self.assert_same_responses(AsyncFriendListAPI, url, {})
+        self.assert_same_responses(AsyncFriendListAPI, url, {"pagination": "cursor"})
+
+    def test_pending_friend_list(self):
+        """
+        Test the async pending list matches the sync one in both pagination modes.
+        """
+        url = reverse("pending-friend-requests")
+        self.assert_same_responses(AsyncPendingFriendListAPI, url, {})
+        self.assert_same_responses(
+            AsyncPendingFriendListAPI, url, {"pagination": "cursor"}
+        )
+
+    def test_errors(self):
+        """
+        Test unauthenticated requests and invalid pages are rejected like the sync views.
+        """
+        url = reverse("friend-list-api")
+        response = self.get_async(AsyncFriendListAPI, url)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.content, self.client.get(url).content)
+
+        self.client.force_authenticate(user=self.user)  # type: ignore
+        response = self.get_async(AsyncFriendListAPI, url, {"page": 5}, self.user)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.content, self.client.get(url, {"page": 5}).content)
+
+
+class SocialGraphExportTest(APITestCase):
+    URL = "/social/api/v1/export/"
+
+    def setUp(self):
+        """
+        Set up a friendship, a pending and a rejected friend request.
+        """
+        self.admin = User.objects.create_user(username="admin", is_staff=True)
+        self.user1 = User.objects.create_user(username="user1")
+        self.user2 = User.objects.create_user(username="user2")
+        self.user3 = User.objects.create_user(username="user3")
+        Friend.objects.create_friendship(self.user2, self.user1)
+        self.pending = FriendRequest.objects.create(
+            from_user=self.user3, to_user=self.user1
+        )
+        self.rejected = FriendRequest.objects.create(
+            from_user=self.user2,
+            to_user=self.user3,
+            rejected=True,
+            rejected_at=timezone.now(),
+        )
+
+    def get_export(self, **params):
+        self.client.force_authenticate(user=self.admin)  # type: ignore
+        response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, 200)  # type: ignore
+        return response, b"".join(response.streaming_content)  # type: ignore
+
+    def test_export_ndjson(self):
+        """
+        Test that each friendship is exported once and requests with their status.
+        """
+        response, content = self.get_export()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        records = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0]["type"], "friend")
+        self.assertEqual(
+            (records[0]["user1"], records[0]["user2"]), (self.user1.id, self.user2.id)
+        )
+        statuses = {record["id"]: record["status"] for record in records[1:]}
+        self.assertEqual(
+            statuses, {self.pending.id: "pending", self.rejected.id: "rejected"}
+        )
+
+    def test_export_gzipped_csv_since(self):
+        """
+        Test the CSV output, gzip compression and the since filter.
+        """
+        since = timezone.now() - timedelta(hours=1)
+        Friend.objects.update(created_at=since - timedelta(days=1))
+        FriendRequest.objects.filter(id=self.pending.id).update(
+            created_at=since - timedelta(days=1)
+        )
+
+        response, content = self.get_export(
+            output="csv", gzip="true", since=since.isoformat()
+        )
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        rows = list(csv.DictReader(gzip.decompress(content).decode().splitlines()))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], str(self.rejected.id))
+        self.assertEqual(rows[0]["status"], "rejected")
+
+    def test_export_requires_admin_and_valid_params(self):
+        """
+        Test that only admins can export and that parameters are validated.
+        """
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        self.assertEqual(self.client.get(self.URL).status_code, 403)  # type: ignore
+
+        self.client.force_authenticate(user=self.admin)  # type: ignore
+        response = self.client.get(self.URL, {"output": "xml"})
+        self.assertEqual(response.status_code, 400)  # type: ignore
+        response = self.client.get(self.URL, {"since": "yesterday"})
+        self.assertEqual(response.status_code, 400)  # type: ignore
+
+    def test_command_writes_export(self):
+        """
+        Test that the command writes the same export to a file.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "graph.ndjson.gz"
+        call_command(
+            "export_social_graph",
+            f"--output={path}",
+            "--gzip",
+            "--include",
+            "friends",
+            stderr=StringIO(),
+        )
+        records = [
+            json.loads(line)
+            for line in gzip.decompress(path.read_bytes()).decode().splitlines()
+        ]
+        self.assertEqual([record["type"] for record in records], ["friend"])
+
+
+@override_settings(
+    BLOCK_FILTER={
+        "ENABLED": True,
+        "CACHE": "default",
+        "CAPACITY": 1000,
+        "ERROR_RATE": 0.01,
+        "MAX_AGE": 3600,
+        "EXACT_MAX_ENTRIES": 100,
+    }
+)
+class BlockTest(APITestCase):
+    URL = reverse("block-api")
+
+    def setUp(self):
+        """
+        Set up the test environment with three users and an empty block filter.
+        """
+        self.user1, self.user2, self.user3 = [
+            User.objects.create_user(
+                username=f"user{i}@example.com",
+                email=f"user{i}@example.com",
+                password="password",
+            )
+            for i in range(1, 4)
+        ]
+        reset_block_filter()
+        self.addCleanup(reset_block_filter)
+        self.addCleanup(cache.clear)
+
+    def block(self, blocker, blocked, action="block"):
+        self.client.force_authenticate(user=blocker)  # type: ignore
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                self.URL, {"action": action, "user_id": blocked.id}, format="json"
+            )
+
+    def send(self, sender, receiver):
+        self.client.force_authenticate(user=sender)  # type: ignore
+        return self.client.post(
+            reverse("friend-request-api"),
+            {"action": "send", "friend_id": receiver.id},
+            format="json",
+        )
+
+    def test_block_and_unblock(self):
+        """
+        Test blocked users cannot send friend requests to each other until unblocked.
+        """
+        get_block_filter()
+        response = self.block(self.user1, self.user2)
+        self.assertEqual(response.status_code, 200)  # type: ignore
+
+        # Both directions are refused
+        self.assertEqual(self.send(self.user2, self.user1).status_code, 403)  # type: ignore
+        self.assertEqual(self.send(self.user1, self.user2).status_code, 403)  # type: ignore
+        self.assertFalse(FriendRequest.objects.exists())
+
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        response = self.client.get(self.URL)
+        self.assertEqual(
+            [user["id"] for user in response.data["results"]], [self.user2.id]  # type: ignore
+        )
+
+        response = self.block(self.user1, self.user2, action="unblock")
+        self.assertEqual(response.status_code, 200)  # type: ignore
+        self.assertEqual(self.send(self.user2, self.user1).status_code, 200)  # type: ignore
+
+        response = self.block(self.user1, self.user2, action="unblock")
+        self.assertEqual(response.status_code, 404)  # type: ignore
+        response = self.block(self.user1, self.user1)
+        self.assertEqual(response.status_code, 400)  # type: ignore
+
+    def test_no_block_query_without_blocks(self):
+        """
+        Test users without blocks send friend requests without querying blocks.
+        """
+        self.block(self.user1, self.user2)
+        get_block_filter()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.send(self.user3, self.user1)
+        self.assertEqual(response.status_code, 200)  # type: ignore
+        self.assertFalse(
+            [query for query in queries if "social_interactions_block" in query["sql"]]
+        )
+
+        # The disabled filter falls back to a query
+        with override_settings(BLOCK_FILTER={"ENABLED": False}):
+            self.assertEqual(self.send(self.user2, self.user1).status_code, 403)  # type: ignore
+
+    def test_bulk_send(self):
+        """
+        Test blocked users are refused in bulk friend requests.
+        """
+        self.block(self.user2, self.user1)
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+        response = self.client.post(
+            reverse("friend-request-bulk-api"),
+            {"action": "send", "friend_ids": [self.user2.id, self.user3.id]},
+            format="json",
+        )
+        self.assertEqual(
+            [result["status"] for result in response.data["response"]["results"]],  # type: ignore
+            [403, 200],
+        )
+
+    def test_search_excludes_blocked(self):
+        """
+        Test blocked users are left out of search in the same query.
+        """
+        self.block(self.user2, self.user1)
+        get_block_filter()
+        self.client.force_authenticate(user=self.user1)  # type: ignore
+
+        # Exact match check, count and page, no separate block query
+        with self.assertNumQueries(3):
+            response = self.client.get("/user/api/v1/search/", {"q": "user"})
+        self.assertEqual(
+            [user["id"] for user in response.data["results"]], [self.user3.id]  # type: ignore
+        )
+
+        # Not even an exact email match
+        response = self.client.get("/user/api/v1/search/", {"q": "user2@example.com"})
+        self.assertEqual(response.data["results"], [])  # type: ignore
+
+        self.client.force_authenticate(user=self.user3)  # type: ignore
+        response = self.client.get("/user/api/v1/search/", {"q": "user"})
+        self.assertEqual(len(response.data["results"]), 2)  # type: ignore
+
+    def test_filter_follows_other_processes(self):
+        """
+        Test blocks and unblocks committed elsewhere apply once the generation is bumped.
+        """
+        block_filter = get_block_filter()
+        self.assertFalse(block_filter.is_blocked(self.user1.id, self.user2.id))
+
+        # Made by another process, which bumps the shared generation
+        block = Block.objects.create(blocker=self.user1, blocked=self.user2)
+        bump_generation()
+        self.assertTrue(get_block_filter().is_blocked(self.user2.id, self.user1.id))
+        self.assertEqual(
+            get_block_filter().get_blocked_ids(self.user1.id), {self.user2.id}
+        )
+
+        block.delete()
+        bump_generation()
+        self.assertFalse(get_block_filter().is_blocked(self.user1.id, self.user2.id))
+
+    def test_pair_collision_still_adds_users(self):
+        """
+        Test a block whose pair is a bloom false positive is still found.
+        """
+        block_filter = BlockFilter(1000)
+        # Force the collision, as if another pair had set the same bits
+        block_filter.pairs.add(pair_key(self.user1.id, self.user2.id))
+        Block.objects.create(blocker=self.user1, blocked=self.user2)
+        block_filter.add_block(self.user1.id, self.user2.id)
+
+        self.assertTrue(block_filter.may_have_blocks(self.user1.id))
+        self.assertTrue(block_filter.may_have_blocks(self.user2.id))
+        self.assertTrue(block_filter.is_blocked(self.user2.id, self.user1.id))
+
+    def test_bloom_filter(self):
+        """
+        Test the bloom filter has no false negatives and about its false positive rate.
+        """
+        bloom_filter = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom_filter.add(str(i).encode())
+
+        self.assertTrue(all(str(i).encode() in bloom_filter for i in range(1000)))
+        false_positives = sum(
+            str(i).encode() in bloom_filter for i in range(1000, 11000)
+        )
+        self.assertLess(false_positives, 200)
+
+    def test_check_requires_shared_cache(self):
+        """
+        Test the enabled filter fails the system check with a local memory cache.
+        """
+        self.assertEqual(
+            [error.id for error in check_block_filter_cache(None)],
+            ["social_interactions.E001"],
+        )
+        with override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                    "LOCATION": "redis://127.0.0.1:6379",
+                }
+            }
+        ):
+            self.assertEqual(check_block_filter_cache(None), [])
+        with override_settings(BLOCK_FILTER={"ENABLED": False}):
+            self.assertEqual(check_block_filter_cache(None), [])
+
+
+class FriendRequestRetentionTest(APITestCase):
+    def setUp(self):
+        """
+        Set up friend requests to user1: pending for 100 and 10 days, rejected
+        40 and 10 days ago, and accepted 100 days ago.
+        """
+        self.user1, *self.others = [
+            User.objects.create_user(username=f"user{i}", email=f"user{i}@example.com")
+            for i in range(1, 7)
+        ]
+        now = timezone.now()
+        (
+            self.old_pending,
+            self.new_pending,
+            self.old_rejected,
+            self.new_rejected,
+            self.accepted,
+        ) = [
+            FriendRequest.objects.create(from_user=other, to_user=self.user1)
+            for other in self.others
+        ]
+        record_requests_sent([(other.id, self.user1.id) for other in self.others[:2]])
+        for friend_request, days in [
+            (self.old_pending, 100),
+            (self.new_pending, 10),
+            (self.old_rejected, 100),
+            (self.new_rejected, 100),
+            (self.accepted, 100),
+        ]:
+            FriendRequest.objects.filter(id=friend_request.id).update(
+                created_at=now - timedelta(days=days)
+            )
+        FriendRequest.objects.filter(id=self.old_rejected.id).update(
+            rejected=True, rejected_at=now - timedelta(days=40)
+        )
+        FriendRequest.objects.filter(id=self.new_rejected.id).update(
+            rejected=True, rejected_at=now - timedelta(days=10)
+        )
+        FriendRequest.objects.filter(id=self.accepted.id).update(
+            accepted=True, accepted_at=now - timedelta(days=100)
+        )
+
+    def test_archives_in_batches(self):
+        """
+        Test old pending and rejected requests are archived and counters updated.
+        """
+        removed = expire_friend_requests(90, 30, batch_size=1, pause=0)
+        self.assertEqual(removed, {"expired": 1, "rejected": 1})
+
+        self.assertEqual(
+            set(FriendRequest.objects.values_list("id", flat=True)),
+            {self.new_pending.id, self.new_rejected.id, self.accepted.id},  # type: ignore
+        )
+        self.assertEqual(
+            sorted(ArchivedFriendRequest.objects.values_list("request_id", "status")),
+            [(self.old_pending.id, "expired"), (self.old_rejected.id, "rejected")],  # type: ignore
+        )
+        self.assertEqual(get_counters(self.user1.id)["incoming_pending"], 1)
+        self.assertEqual(get_counters(self.others[0].id)["outgoing_pending"], 0)
+
+        # Nothing is left to remove
+        self.assertEqual(
+            expire_friend_requests(90, 30, pause=0), {"expired": 0, "rejected": 0}
+        )
+
+    def test_command(self):
+        """
+        Test the command counts on a dry run and can delete without archiving.
+        """
+        output = StringIO()
+        call_command("expire_friend_requests", "--dry-run", stdout=output)
+        self.assertIn("Would remove 1 expired and 1 rejected", output.getvalue())
+        self.assertEqual(FriendRequest.objects.count(), 5)
+
+        output = StringIO()
+        call_command(
+            "expire_friend_requests",
+            "--no-archive",
+            "--pending-days=5",
+            "--pause=0",
+            stdout=output,
+        )
+        self.assertIn("Deleted 2 expired and 1 rejected", output.getvalue())
+        self.assertFalse(ArchivedFriendRequest.objects.exists())
+        self.assertEqual(get_counters(self.user1.id)["incoming_pending"], 0)
+
+    def test_command_archives_when_disabled_in_settings(self):
+        """
+        Test --archive archives the requests when ARCHIVE is off.
+        """
+        config = {
+            "PENDING_DAYS": 90,
+            "REJECTED_DAYS": 30,
+            "ARCHIVE": False,
+            "BATCH_SIZE": 1000,
+            "BATCH_PAUSE": 0,
+        }
+        with override_settings(FRIEND_REQUEST_RETENTION=config):
+            call_command(
+                "expire_friend_requests", "--archive", "--pause=0", stdout=StringIO()
+            )
+        self.assertEqual(ArchivedFriendRequest.objects.count(), 2)
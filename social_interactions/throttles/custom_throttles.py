@@ -1,5 +1,7 @@
 from rest_framework.throttling import UserRateThrottle
 
+from .rate_limiter import SlidingWindowRateLimiter, get_rate_limit_backend
+
 
 class PerMinuteThrottle(UserRateThrottle):
     """
@@ -7,3 +9,26 @@ class PerMinuteThrottle(UserRateThrottle):
     """
 
     scope = "per_minute"
+
+    def allow_request(self, request, view):
+        """
+        Counts the request with the shared sliding window rate limiter.
+        """
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        limiter = SlidingWindowRateLimiter(
+            get_rate_limit_backend(), self.num_requests, self.duration
+        )
+        self.result = limiter.hit(self.key)
+        return self.result.allowed
+
+    def wait(self):
+        """
+        Returns the recommended number of seconds to wait before retrying.
+        """
+        return self.result.retry_after
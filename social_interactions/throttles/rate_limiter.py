@@ -0,0 +1,221 @@
+import math
+import time
+import threading
+from functools import lru_cache
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.db import IntegrityError, transaction
+from django.utils.module_loading import import_string
+
+from ..models import RateLimitCounter
+
+RateLimitResult = namedtuple("RateLimitResult", ["allowed", "remaining", "retry_after"])
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+PERIOD_NAMES = {1: "second", 60: "minute", 3600: "hour", 86400: "day"}
+
+
+def parse_rate(rate):
+    """
+    Parses a rate such as "3/min" into (number of requests, period in seconds).
+    """
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+class LocMemBackend:
+    """
+    Counters held in process memory, only suitable for a single worker.
+    """
+
+    def __init__(self, **options):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def incr(self, key, window, amount, ttl):
+        """
+        Atomically adds `amount` to a window counter and returns the new count.
+        """
+        with self._lock:
+            windows = self._counters.setdefault(key, {})
+            count = windows.get(window, 0) + amount
+            # Only the current and previous windows are ever read
+            self._counters[key] = {w: c for w, c in windows.items() if w >= window - 1}
+            self._counters[key][window] = count
+            return count
+
+    def get(self, key, window):
+        """
+        Returns the count of a window counter.
+        """
+        return self._counters.get(key, {}).get(window, 0)
+
+
+class DatabaseBackend:
+    """
+    Counters stored in the RateLimitCounter table of the default database.
+
+    Counts are shared by every worker using the database, and increments are
+    single UPDATE statements so concurrent hits are never lost.
+    """
+
+    def __init__(self, **options):
+        pass
+
+    def incr(self, key, window, amount, ttl):
+        """
+        Atomically adds `amount` to a window counter and returns the new count.
+        """
+        counter = RateLimitCounter.objects.filter(key=key, window=window)
+        with transaction.atomic():
+            if not counter.update(count=F("count") + amount):
+                try:
+                    with transaction.atomic():
+                        RateLimitCounter.objects.create(
+                            key=key, window=window, count=amount
+                        )
+                except IntegrityError:
+                    # Another worker created the counter first
+                    counter.update(count=F("count") + amount)
+                else:
+                    # Drop windows that can no longer be read
+                    RateLimitCounter.objects.filter(
+                        key=key, window__lt=window - 1
+                    ).delete()
+
+            return counter.values_list("count", flat=True).get()
+
+    def get(self, key, window):
+        """
+        Returns the count of a window counter.
+        """
+        count = (
+            RateLimitCounter.objects.filter(key=key, window=window)
+            .values_list("count", flat=True)
+            .first()
+        )
+        return count or 0
+
+
+class CacheBackend:
+    """
+    Counters stored in a Django cache, e.g. Redis or Memcached.
+
+    Increments use the cache's `incr`, which is atomic on Redis and
+    Memcached, so this backend is shared by every worker using the cache.
+    """
+
+    def __init__(self, **options):
+        self.cache = caches[options.get("CACHE", "default")]
+        self.prefix = options.get("KEY_PREFIX", "rate_limit")
+
+    def _cache_key(self, key, window):
+        return f"{self.prefix}:{key}:{window}"
+
+    def incr(self, key, window, amount, ttl):
+        """
+        Atomically adds `amount` to a window counter and returns the new count.
+        """
+        cache_key = self._cache_key(key, window)
+        self.cache.add(cache_key, 0, timeout=ttl)
+        try:
+            return self.cache.incr(cache_key, amount)
+        except ValueError:
+            # The counter expired between add and incr
+            self.cache.add(cache_key, amount, timeout=ttl)
+            return amount
+
+    def get(self, key, window):
+        """
+        Returns the count of a window counter.
+        """
+        return self.cache.get(self._cache_key(key, window), 0)
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding window counter rate limiter.
+
+    Hits are counted in fixed windows of `period` seconds. The number of hits
+    in the last `period` seconds is estimated as the current window's count
+    plus the previous window's count weighted by how much of it still overlaps
+    the sliding window. A hit increments the counter first and is then
+    checked, so concurrent hits can never both take the last slot.
+    """
+
+    def __init__(self, backend, limit, period):
+        self.backend = backend
+        self.limit = limit
+        self.period = period
+
+    def hit(self, key, now=None):
+        """
+        Counts a hit for `key` and returns whether it is allowed.
+        """
+        allowed, remaining, retry_after = self.hit_many(key, 1, now=now)
+        return RateLimitResult(allowed == 1, remaining, retry_after)
+
+    def hit_many(self, key, count, now=None):
+        """
+        Counts `count` hits for `key` at once.
+
+        Returns a RateLimitResult whose `allowed` is the number of hits that fit
+        in the limit, the first ones being allowed and the rest rejected.
+        """
+        now = time.time() if now is None else now
+        window, offset = divmod(now, self.period)
+        window = int(window)
+        ttl = 2 * self.period
+
+        current = self.backend.incr(key, window, count, ttl)
+        previous = self.backend.get(key, window - 1)
+        weight = 1 - offset / self.period
+        estimate = previous * weight + current
+
+        rejected = min(max(math.ceil(estimate - self.limit), 0), count)
+        if not rejected:
+            return RateLimitResult(count, int(self.limit - estimate), 0)
+
+        # Rejected hits are given back so they do not extend the block
+        self.backend.incr(key, window, -rejected, ttl)
+        estimate -= rejected
+
+        # Wait until enough of the previous window has slid out, or at most
+        # until the current window ends
+        retry_after = self.period - offset
+        if previous:
+            retry_after = min(
+                retry_after, (estimate + 1 - self.limit) / previous * self.period
+            )
+        return RateLimitResult(count - rejected, 0, max(math.ceil(retry_after), 0))
+
+    def describe(self):
+        """
+        Returns the rate in words, e.g. "3 requests per minute".
+        """
+        period = PERIOD_NAMES.get(self.period, f"{self.period} seconds")
+        return f"{self.limit} requests per {period}"
+
+
+@lru_cache(maxsize=None)
+def _get_backend(path, options):
+    return import_string(path)(**dict(options))
+
+
+def get_rate_limit_backend():
+    """
+    Returns the process-wide instance of the configured backend.
+    """
+    config = settings.RATE_LIMITS
+    return _get_backend(config["BACKEND"], tuple(config.get("OPTIONS", {}).items()))
+
+
+def get_rate_limiter(scope):
+    """
+    Returns a rate limiter for a scope configured in `RATE_LIMITS["RATES"]`.
+    """
+    limit, period = parse_rate(settings.RATE_LIMITS["RATES"][scope])
+    return SlidingWindowRateLimiter(get_rate_limit_backend(), limit, period)
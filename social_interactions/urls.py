@@ -1,15 +1,58 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import FriendRequestAPI, FriendListAPI, PendingFriendListAPI
+from .views import (
+    FriendRequestAPI,
+    FriendRequestBulkAPI,
+    FriendListAPI,
+    AsyncFriendListAPI,
+    FriendSuggestionListAPI,
+    BlockAPI,
+    MutualFriendListAPI,
+    ConnectionPathAPI,
+    PendingFriendListAPI,
+    AsyncPendingFriendListAPI,
+    SocialGraphExportAPI,
+)
+
+# Read endpoints with an async version, see ASYNC_VIEWS
+if settings.ASYNC_VIEWS:
+    friend_list_view = AsyncFriendListAPI.as_view()
+    pending_friend_list_view = AsyncPendingFriendListAPI.as_view()
+else:
+    friend_list_view = FriendListAPI.as_view()
+    pending_friend_list_view = PendingFriendListAPI.as_view()
 
 urlpatterns = [
     path(
         "api/v1/friend-request/", FriendRequestAPI.as_view(), name="friend-request-api"
     ),
-    path("api/v1/friends/", FriendListAPI.as_view(), name="friend-list-api"),
+    path(
+        "api/v1/friend-request/bulk/",
+        FriendRequestBulkAPI.as_view(),
+        name="friend-request-bulk-api",
+    ),
+    path("api/v1/friends/", friend_list_view, name="friend-list-api"),
+    path(
+        "api/v1/mutual-friends/",
+        MutualFriendListAPI.as_view(),
+        name="mutual-friend-list-api",
+    ),
+    path(
+        "api/v1/connection-path/",
+        ConnectionPathAPI.as_view(),
+        name="connection-path-api",
+    ),
+    path(
+        "api/v1/suggestions/",
+        FriendSuggestionListAPI.as_view(),
+        name="friend-suggestions",
+    ),
     path(
         "api/v1/pending-friend-requests/",
-        PendingFriendListAPI.as_view(),
+        pending_friend_list_view,
         name="pending-friend-requests",
     ),
+    path("api/v1/block/", BlockAPI.as_view(), name="block-api"),
+    path("api/v1/export/", SocialGraphExportAPI.as_view(), name="social-graph-export"),
 ]
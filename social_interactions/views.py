@@ -1,18 +1,60 @@
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from django.core.cache import cache
 from django.contrib.auth.models import User
 
 from rest_framework import status
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.pagination import PageNumberPagination
 
 from utitlities.utils import get_api_response
-from user_operations.serializers import UserSerializer
-
-from .models import FriendRequest, Friend
-from .serializers import FriendRequestSerializer
+from utitlities.async_views import AsyncAPIView
+from utitlities.pagination import (
+    PaginationModeMixin,
+    EmailCursorPagination,
+    CreatedAtCursorPagination,
+)
+from user_operations.serializers import USER_VALUE_FIELDS, serialize_users
+
+from .models import Friend, FriendRequest, FriendSuggestion
+from .serializers import (
+    FRIEND_REQUEST_VALUE_FIELDS,
+    FRIEND_SUGGESTION_VALUE_FIELDS,
+    serialize_friend_requests,
+    serialize_friend_suggestions,
+)
+from .throttles.rate_limiter import get_rate_limiter
+from .friend_list_cache import get_friend_list_cache
+from .graph_index import get_friend_graph_index
+from .graph_export import FORMATS, export_graph, parse_since
+from .connection_path import VisitBudgetExceeded, find_connection_path
+from .blocks import (
+    is_blocked,
+    get_blocked_ids,
+    get_blocked_among,
+    block_user,
+    unblock_user,
+)
+from .counters import (
+    get_counters,
+    aget_counters,
+    record_requests_sent,
+    record_requests_resolved,
+    record_requests_accepted,
+)
+from .friendships import (
+    are_friends,
+    get_friend_ids,
+    get_friends_among,
+    get_mutual_friend_ids,
+    create_friendships,
+)
 
 
 class FriendRequestAPI(APIView):
@@ -33,32 +75,26 @@ class FriendRequestAPI(APIView):
         Handles sending a friend request.
         """
         user = request.user
-        request_count_key = f"request_count:{user.id}"
-        timestamp_key = f"timestamp:{user.id}"
-
-        # Get the current timestamp
-        current_time = timezone.now()
 
         # Check if the user has exceeded the rate limit
-        request_count = cache.get(request_count_key, 0)
-        last_request_timestamp = cache.get(timestamp_key)
-
-        if last_request_timestamp is not None:
-            time_difference = current_time - last_request_timestamp
-            if time_difference.total_seconds() < 60:
-                if request_count >= 3:
-                    return (
-                        False,
-                        {"message": "You can send only 3 requests per minute!"},
-                        status.HTTP_429_TOO_MANY_REQUESTS,
-                    )
-
-        # Increment the request count and update the timestamp
-        cache.set(request_count_key, request_count + 1, timeout=60)
-        cache.set(timestamp_key, current_time, timeout=60)
+        limiter = get_rate_limiter("friend_request_send")
+        if not limiter.hit(f"friend_request_send:{user.id}").allowed:
+            return (
+                False,
+                {"message": f"You can send only {limiter.describe()}!"},
+                status.HTTP_429_TOO_MANY_REQUESTS,
+            )
 
         friend_obj = kwargs.get("friend_obj")
 
+        # Check if either user blocked the other
+        if is_blocked(user.id, friend_obj.id):
+            return (
+                False,
+                {"message": "You cannot send a friend request to this user!"},
+                status.HTTP_403_FORBIDDEN,
+            )
+
         # Check if friend request already sent
         if (
             FriendRequest.objects.filter(
@@ -75,21 +111,21 @@ class FriendRequestAPI(APIView):
             )
 
         # Check if friend request already accepted
-        if Friend.objects.filter(
-            Q(friend1=request.user, friend2=friend_obj)
-            | Q(friend1=friend_obj, friend2=request.user)
-        ).exists():
+        if are_friends(request.user.id, friend_obj.id):
             return (
                 False,
                 {"message": "Friend request already accepted!"},
                 status.HTTP_400_BAD_REQUEST,
             )
 
-        friend_request = FriendRequest.objects.create(
-            from_user=request.user,
-            to_user=friend_obj,
-            created_at=timezone.now(),
-        )
+        with transaction.atomic():
+            friend_request = FriendRequest.objects.create(
+                from_user=request.user,
+                to_user=friend_obj,
+                created_at=timezone.now(),
+            )
+            record_requests_sent([(request.user.id, friend_obj.id)])
+
         return (
             True,
             {"message": "Friend request sent successfully!"},
@@ -101,18 +137,27 @@ class FriendRequestAPI(APIView):
         Handles accepting a friend request.
         """
         friend_request_id = kwargs.get("friend_request_id")
-        friend_request = FriendRequest.objects.filter(id=friend_request_id).first()
-
-        if friend_request and friend_request.to_user == request.user:
-            friend_request.accepted = True
-            friend_request.accepted_at = timezone.now()
-            friend_request.save()
 
-            friend = Friend.objects.create(
-                friend1=friend_request.from_user,
-                friend2=friend_request.to_user,
+        with transaction.atomic():
+            # Lock the request so the counters follow its state exactly
+            friend_request = (
+                FriendRequest.objects.select_for_update()
+                .filter(id=friend_request_id, to_user=request.user)
+                .first()
             )
 
+            if friend_request and not friend_request.accepted:
+                pair = (friend_request.from_user_id, friend_request.to_user_id)
+                friend_request.accepted = True
+                friend_request.accepted_at = timezone.now()
+                friend_request.save(update_fields=["accepted", "accepted_at"])
+
+                record_requests_accepted(
+                    [] if friend_request.rejected else [pair],
+                    create_friendships([pair]),
+                )
+
+        if friend_request:
             return (
                 True,
                 {"message": "Friend request accepted successfully!"},
@@ -130,13 +175,26 @@ class FriendRequestAPI(APIView):
         Handles rejecting a friend request.
         """
         friend_request_id = kwargs.get("friend_request_id")
-        friend_request = FriendRequest.objects.filter(id=friend_request_id).first()
 
-        if friend_request and friend_request.to_user == request.user:
-            friend_request.rejected = True
-            friend_request.rejected_at = timezone.now()
-            friend_request.save()
+        with transaction.atomic():
+            # Lock the request so the counters follow its state exactly
+            friend_request = (
+                FriendRequest.objects.select_for_update()
+                .filter(id=friend_request_id, to_user=request.user)
+                .first()
+            )
+
+            if friend_request:
+                if not friend_request.accepted and not friend_request.rejected:
+                    record_requests_resolved(
+                        [(friend_request.from_user_id, friend_request.to_user_id)]
+                    )
 
+                friend_request.rejected = True
+                friend_request.rejected_at = timezone.now()
+                friend_request.save(update_fields=["rejected", "rejected_at"])
+
+        if friend_request:
             return (
                 True,
                 {"message": "Friend request rejected successfully!"},
@@ -206,7 +264,290 @@ class FriendRequestAPI(APIView):
         )
 
 
-class FriendListAPI(APIView):
+class FriendRequestBulkAPI(APIView):
+    """
+    API endpoint for managing many friend requests in one call.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    MAX_ITEMS = 100
+
+    ACTIONS = {
+        "send": "handle_bulk_send",
+        "accept": "handle_bulk_accept",
+        "reject": "handle_bulk_reject",
+    }
+
+    @staticmethod
+    def get_result(success, message, resp_status, **item):
+        """
+        Builds the result of one item of a bulk action.
+        """
+        return {**item, "success": success, "message": message, "status": resp_status}
+
+    @staticmethod
+    def get_numeric_ids(ids):
+        """
+        Returns the well-formed ids, which are the only ones worth querying.
+        """
+        return [i for i in ids if isinstance(i, int)]
+
+    def handle_bulk_send(self, request, ids):
+        """
+        Handles sending friend requests to many users.
+        """
+        user = request.user
+        existing_user_ids = set(
+            User.objects.filter(id__in=self.get_numeric_ids(ids)).values_list(
+                "id", flat=True
+            )
+        )
+        valid_ids = [friend_id for friend_id in ids if friend_id in existing_user_ids]
+
+        # Check the rate limit once for all valid items, the first ones fit
+        limiter = get_rate_limiter("friend_request_send")
+        allowed_count = (
+            limiter.hit_many(f"friend_request_send:{user.id}", len(valid_ids)).allowed
+            if valid_ids
+            else 0
+        )
+        allowed_ids = set(valid_ids[:allowed_count])
+        blocked_ids = get_blocked_among(user.id, allowed_ids)
+
+        # Friend requests already sent between the users, in either direction.
+        # Rejected requests sent by the user still block a new one, as the
+        # (from_user, to_user) pair is unique.
+        already_sent_ids = set()
+        for from_user_id, to_user_id in FriendRequest.objects.filter(
+            Q(from_user=user, to_user_id__in=allowed_ids)
+            | Q(from_user_id__in=allowed_ids, to_user=user, rejected=False)
+        ).values_list("from_user_id", "to_user_id"):
+            already_sent_ids.add(
+                to_user_id if from_user_id == user.id else from_user_id
+            )
+        already_friend_ids = get_friends_among(user.id, allowed_ids)
+
+        results = []
+        new_requests = []
+        for friend_id in ids:
+            if friend_id not in existing_user_ids:
+                results.append(
+                    self.get_result(
+                        False,
+                        "Please select valid friend!",
+                        status.HTTP_400_BAD_REQUEST,
+                        friend_id=friend_id,
+                    )
+                )
+            elif friend_id not in allowed_ids:
+                results.append(
+                    self.get_result(
+                        False,
+                        f"You can send only {limiter.describe()}!",
+                        status.HTTP_429_TOO_MANY_REQUESTS,
+                        friend_id=friend_id,
+                    )
+                )
+            elif friend_id in blocked_ids:
+                results.append(
+                    self.get_result(
+                        False,
+                        "You cannot send a friend request to this user!",
+                        status.HTTP_403_FORBIDDEN,
+                        friend_id=friend_id,
+                    )
+                )
+            elif friend_id in already_sent_ids:
+                results.append(
+                    self.get_result(
+                        False,
+                        "Friend request already sent!",
+                        status.HTTP_400_BAD_REQUEST,
+                        friend_id=friend_id,
+                    )
+                )
+            elif friend_id in already_friend_ids:
+                results.append(
+                    self.get_result(
+                        False,
+                        "Friend request already accepted!",
+                        status.HTTP_400_BAD_REQUEST,
+                        friend_id=friend_id,
+                    )
+                )
+            else:
+                new_requests.append(FriendRequest(from_user=user, to_user_id=friend_id))
+                results.append(
+                    self.get_result(
+                        True,
+                        "Friend request sent successfully!",
+                        status.HTTP_200_OK,
+                        friend_id=friend_id,
+                    )
+                )
+
+        with transaction.atomic():
+            FriendRequest.objects.bulk_create(new_requests)
+            record_requests_sent(
+                (user.id, friend_request.to_user_id) for friend_request in new_requests
+            )
+
+        return results
+
+    def handle_bulk_accept(self, request, ids):
+        """
+        Handles accepting many friend requests.
+        """
+        with transaction.atomic():
+            # Lock the requests so the counters follow their state exactly
+            friend_requests = {
+                friend_request_id: (from_user_id, accepted, rejected)
+                for friend_request_id, from_user_id, accepted, rejected in (
+                    FriendRequest.objects.select_for_update()
+                    .filter(id__in=self.get_numeric_ids(ids), to_user=request.user)
+                    .values_list("id", "from_user_id", "accepted", "rejected")
+                )
+            }
+            pending_pairs = [
+                (from_user_id, request.user.id)
+                for from_user_id, accepted, rejected in friend_requests.values()
+                if not accepted and not rejected
+            ]
+            rejected_pairs = [
+                (from_user_id, request.user.id)
+                for from_user_id, accepted, rejected in friend_requests.values()
+                if not accepted and rejected
+            ]
+
+            FriendRequest.objects.filter(id__in=friend_requests, accepted=False).update(
+                accepted=True, accepted_at=timezone.now()
+            )
+            record_requests_accepted(
+                pending_pairs, create_friendships(pending_pairs + rejected_pairs)
+            )
+
+        return [
+            (
+                self.get_result(
+                    True,
+                    "Friend request accepted successfully!",
+                    status.HTTP_200_OK,
+                    friend_request_id=friend_request_id,
+                )
+                if friend_request_id in friend_requests
+                else self.get_result(
+                    False,
+                    "Friend request not found!",
+                    status.HTTP_404_NOT_FOUND,
+                    friend_request_id=friend_request_id,
+                )
+            )
+            for friend_request_id in ids
+        ]
+
+    def handle_bulk_reject(self, request, ids):
+        """
+        Handles rejecting many friend requests.
+        """
+        with transaction.atomic():
+            # Lock the requests so the counters follow their state exactly
+            friend_requests = {
+                friend_request_id: (from_user_id, accepted, rejected)
+                for friend_request_id, from_user_id, accepted, rejected in (
+                    FriendRequest.objects.select_for_update()
+                    .filter(id__in=self.get_numeric_ids(ids), to_user=request.user)
+                    .values_list("id", "from_user_id", "accepted", "rejected")
+                )
+            }
+
+            FriendRequest.objects.filter(id__in=friend_requests).update(
+                rejected=True, rejected_at=timezone.now()
+            )
+            record_requests_resolved(
+                [
+                    (from_user_id, request.user.id)
+                    for from_user_id, accepted, rejected in friend_requests.values()
+                    if not accepted and not rejected
+                ]
+            )
+
+        return [
+            (
+                self.get_result(
+                    True,
+                    "Friend request rejected successfully!",
+                    status.HTTP_200_OK,
+                    friend_request_id=friend_request_id,
+                )
+                if friend_request_id in friend_requests
+                else self.get_result(
+                    False,
+                    "Friend request not found!",
+                    status.HTTP_404_NOT_FOUND,
+                    friend_request_id=friend_request_id,
+                )
+            )
+            for friend_request_id in ids
+        ]
+
+    def post(self, request):
+        """
+        Handles POST requests to manage many friend requests.
+        """
+        action = request.data.get("action")
+        friend_ids = request.data.get("friend_ids")
+        friend_request_ids = request.data.get("friend_request_ids")
+
+        if not action:
+            return get_api_response(
+                False,
+                {"message": "Please enter action!"},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        if action not in ["send", "accept", "reject"]:
+            return get_api_response(
+                False,
+                {"message": "Please enter valid action!"},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        ids = friend_ids if action == "send" else friend_request_ids
+        if not ids or not isinstance(ids, list):
+            return get_api_response(
+                False,
+                {
+                    "message": (
+                        "Please select friend!"
+                        if action == "send"
+                        else "Please select friend request!"
+                    )
+                },
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        if len(ids) > self.MAX_ITEMS:
+            return get_api_response(
+                False,
+                {"message": f"Please select at most {self.MAX_ITEMS} items!"},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Drop duplicate ids, malformed ids are kept as strings so that they
+        # are reported as not found
+        ids = list(dict.fromkeys(int(i) if str(i).isdigit() else str(i) for i in ids))
+
+        results = getattr(self, self.ACTIONS[action])(request, ids)
+
+        return get_api_response(
+            all(result["success"] for result in results),
+            {"results": results},
+            status.HTTP_200_OK,
+        )
+
+
+class FriendListAPI(PaginationModeMixin, APIView):
     """
     API endpoint for getting friend list.
     """
@@ -214,35 +555,230 @@ class FriendListAPI(APIView):
     permission_classes = [IsAuthenticated]
     pagination_class = PageNumberPagination
     pagination_class.page_size = 10
+    cursor_pagination_class = EmailCursorPagination
 
     def get(self, request):
         """
         Handles GET requests to get friend list.
         """
-        # Get user IDs of friends
-        friend_ids = Friend.objects.filter(
-            Q(friend1=request.user) | Q(friend2=request.user)
-        ).values_list("friend1_id", "friend2_id")
-
-        # Flatten the list of IDs and exclude current user's ID
-        friend_ids = [
-            friend_id
-            for friend_tuple in friend_ids
-            for friend_id in friend_tuple
-            if friend_id != request.user.id
-        ]
+        # Serve the page from the cache if the friend list has not changed
+        friend_list_cache = get_friend_list_cache()
+        if friend_list_cache is not None:
+            page_key = request.build_absolute_uri()
+            version = friend_list_cache.get_version(request.user.id)
+            data = friend_list_cache.get(request.user.id, version, page_key)
+            if data is not None:
+                response = Response(dict(data))
+                response.data["counters"] = get_counters(request.user.id)
+                return response
+
+        # Get user IDs of friends. Cached pages are built from the Friend
+        # table, as this process's graph index may lag behind the version
+        # that was read from the shared cache
+        if friend_list_cache is not None:
+            friend_ids = Friend.objects.friend_ids(request.user.id)
+        else:
+            friend_ids = get_friend_ids(request.user.id)
 
         # Fetch friends from User queryset
-        friend_list = User.objects.filter(id__in=friend_ids).order_by("email")
+        friend_list = (
+            User.objects.filter(id__in=friend_ids)
+            .order_by("email")
+            .values(*USER_VALUE_FIELDS)
+        )
 
-        paginator = self.pagination_class()
+        paginator = self.get_paginator(request)
+        paginated_queryset = paginator.paginate_queryset(friend_list, request)
+
+        response = paginator.get_paginated_response(serialize_users(paginated_queryset))
+        if friend_list_cache is not None:
+            friend_list_cache.set(
+                request.user.id, version, page_key, dict(response.data)
+            )
+        response.data["counters"] = get_counters(request.user.id)
+        return response
+
+
+class AsyncFriendListAPI(AsyncAPIView):
+    """
+    Async version of FriendListAPI, served when ASYNC_VIEWS is enabled.
+    """
+
+    cursor_pagination_class = EmailCursorPagination
+
+    async def get(self, request):
+        """
+        Handles GET requests to get friend list.
+        """
+        # The friend list cache is not async, its lookups run in a thread
+        friend_list_cache = get_friend_list_cache()
+        if friend_list_cache is not None:
+            page_key = request.build_absolute_uri()
+            version = await sync_to_async(friend_list_cache.get_version)(
+                request.user.id
+            )
+            data = await sync_to_async(friend_list_cache.get)(
+                request.user.id, version, page_key
+            )
+            if data is not None:
+                data = dict(data)
+                data["counters"] = await aget_counters(request.user.id)
+                return self.render(data)
+
+        # Without the graph index this is a lazy subquery, with it the first
+        # call may load the index from the database. Cached pages are built
+        # from the Friend table, as in FriendListAPI
+        if friend_list_cache is not None:
+            friend_ids = Friend.objects.friend_ids(request.user.id)
+        elif get_friend_graph_index() is not None:
+            friend_ids = await sync_to_async(get_friend_ids)(request.user.id)
+        else:
+            friend_ids = get_friend_ids(request.user.id)
+
+        friend_list = (
+            User.objects.filter(id__in=friend_ids)
+            .order_by("email")
+            .values(*USER_VALUE_FIELDS)
+        )
+
+        paginator = self.get_paginator(request)
+        paginated_queryset = await paginator.apaginate_queryset(friend_list, request)
+
+        data = paginator.get_paginated_response(
+            serialize_users(paginated_queryset)
+        ).data
+        if friend_list_cache is not None:
+            await sync_to_async(friend_list_cache.set)(
+                request.user.id, version, page_key, dict(data)
+            )
+        data["counters"] = await aget_counters(request.user.id)
+        return self.render(data)
+
+
+class MutualFriendListAPI(PaginationModeMixin, APIView):
+    """
+    API endpoint for getting the friends shared with another user.
+    """
+
+    permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberPagination
+    pagination_class.page_size = 10
+    cursor_pagination_class = EmailCursorPagination
+
+    def get(self, request):
+        """
+        Handles GET requests to get mutual friend list.
+        """
+        user_id = request.GET.get("user_id")
+        if not user_id:
+            return get_api_response(
+                False,
+                {"message": "Please select user!"},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        other_user_id = (
+            User.objects.filter(id=user_id).values_list("id", flat=True).first()
+            if user_id.isdigit()
+            else None
+        )
+        if not other_user_id:
+            return get_api_response(
+                False,
+                {"message": "Please select valid user!"},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Intersect the sorted friend id lists of both users
+        mutual_friend_ids = get_mutual_friend_ids(request.user.id, other_user_id)
+
+        # Fetch mutual friends from User queryset
+        friend_list = (
+            User.objects.filter(id__in=mutual_friend_ids)
+            .order_by("email")
+            .values(*USER_VALUE_FIELDS)
+        )
+
+        paginator = self.get_paginator(request)
         paginated_queryset = paginator.paginate_queryset(friend_list, request)
 
-        serializer = UserSerializer(paginated_queryset, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        return paginator.get_paginated_response(serialize_users(paginated_queryset))
 
 
-class PendingFriendListAPI(APIView):
+class ConnectionPathAPI(APIView):
+    """
+    API endpoint for getting the shortest chain of friends to another user.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Handles GET requests to get the connection path to a user.
+        Takes the other `user_id` and an optional `max_depth`, capped at CONNECTION_PATH["MAX_DEPTH"].
+        Returns the users along a shortest path, both ends included, and the degrees of separation.
+        """
+        user_id = request.GET.get("user_id")
+        if not user_id:
+            return get_api_response(
+                False,
+                {"message": "Please select user!"},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        other_user_id = (
+            User.objects.filter(id=user_id).values_list("id", flat=True).first()
+            if user_id.isdigit()
+            else None
+        )
+        if not other_user_id:
+            return get_api_response(
+                False,
+                {"message": "Please select valid user!"},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        config = settings.CONNECTION_PATH
+        max_depth = request.GET.get("max_depth", "")
+        max_depth = int(max_depth) if max_depth.isdigit() else config["MAX_DEPTH"]
+        max_depth = max(1, min(max_depth, config["MAX_DEPTH"]))
+
+        try:
+            path = find_connection_path(
+                request.user.id,
+                other_user_id,
+                max_depth=max_depth,
+                max_visits=config["MAX_VISITS"],
+            )
+        except VisitBudgetExceeded:
+            return get_api_response(
+                False,
+                {"message": "Search limit reached before finding a connection!"},
+                status.HTTP_404_NOT_FOUND,
+            )
+
+        if path is None:
+            return get_api_response(
+                False,
+                {"message": f"No connection within {max_depth} degrees!"},
+                status.HTTP_404_NOT_FOUND,
+            )
+
+        users = {
+            row["id"]: row
+            for row in User.objects.filter(id__in=path).values(*USER_VALUE_FIELDS)
+        }
+        return get_api_response(
+            True,
+            {
+                "degrees": len(path) - 1,
+                "path": serialize_users(users[path_user_id] for path_user_id in path),
+            },
+            status.HTTP_200_OK,
+        )
+
+
+class PendingFriendListAPI(PaginationModeMixin, APIView):
     """
     API endpoint for getting friend list.
     """
@@ -250,22 +786,223 @@ class PendingFriendListAPI(APIView):
     permission_classes = [IsAuthenticated]
     pagination_class = PageNumberPagination
     pagination_class.page_size = 10
+    cursor_pagination_class = CreatedAtCursorPagination
 
     def get(self, request):
         """
         Handles GET requests to get friend list.
         """
         # Retrieve pending friend requests involving the current user
-        pending_friend_requests = FriendRequest.objects.filter(
-            Q(from_user=request.user, accepted=False)
-            | Q(to_user=request.user, accepted=False)
-        ).exclude(Q(rejected=True) | Q(accepted=True))
+        pending_friend_requests = (
+            FriendRequest.objects.filter(
+                Q(from_user=request.user, accepted=False)
+                | Q(to_user=request.user, accepted=False)
+            )
+            .exclude(Q(rejected=True) | Q(accepted=True))
+            .order_by("-created_at", "id")
+            # Both users are joined in the same query
+            .values(*FRIEND_REQUEST_VALUE_FIELDS)
+        )
 
         # Apply pagination
-        paginator = self.pagination_class()
+        paginator = self.get_paginator(request)
         paginated_queryset = paginator.paginate_queryset(
             pending_friend_requests, request
         )
 
-        serializer = FriendRequestSerializer(paginated_queryset, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        response = paginator.get_paginated_response(
+            serialize_friend_requests(paginated_queryset)
+        )
+        response.data["counters"] = get_counters(request.user.id)
+        return response
+
+
+class AsyncPendingFriendListAPI(AsyncAPIView):
+    """
+    Async version of PendingFriendListAPI, served when ASYNC_VIEWS is enabled.
+    """
+
+    cursor_pagination_class = CreatedAtCursorPagination
+
+    async def get(self, request):
+        """
+        Handles GET requests to get pending friend list.
+        """
+        pending_friend_requests = (
+            FriendRequest.objects.filter(
+                Q(from_user=request.user, accepted=False)
+                | Q(to_user=request.user, accepted=False)
+            )
+            .exclude(Q(rejected=True) | Q(accepted=True))
+            .order_by("-created_at", "id")
+            .values(*FRIEND_REQUEST_VALUE_FIELDS)
+        )
+
+        paginator = self.get_paginator(request)
+        paginated_queryset = await paginator.apaginate_queryset(
+            pending_friend_requests, request
+        )
+
+        data = paginator.get_paginated_response(
+            serialize_friend_requests(paginated_queryset)
+        ).data
+        data["counters"] = await aget_counters(request.user.id)
+        return self.render(data)
+
+
+class FriendSuggestionListAPI(APIView):
+    """
+    API endpoint for getting "people you may know" suggestions.
+    """
+
+    permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberPagination
+    pagination_class.page_size = 10
+
+    def get(self, request):
+        """
+        Handles GET requests to get friend suggestions.
+        """
+        # Suggestions are precomputed by the build_friend_suggestions command,
+        # users who became friends since the last run and blocked users are
+        # filtered out
+        suggestions = FriendSuggestion.objects.filter(user=request.user).exclude(
+            suggested_user_id__in=Friend.objects.friend_ids(request.user.id)
+        )
+        blocked_ids = get_blocked_ids(request.user.id)
+        if blocked_ids:
+            suggestions = suggestions.exclude(suggested_user_id__in=blocked_ids)
+        suggestions = suggestions.order_by("rank").values(
+            *FRIEND_SUGGESTION_VALUE_FIELDS
+        )
+
+        paginator = self.pagination_class()
+        paginated_queryset = paginator.paginate_queryset(suggestions, request)
+
+        return paginator.get_paginated_response(
+            serialize_friend_suggestions(paginated_queryset)
+        )
+
+
+class BlockAPI(APIView):
+    """
+    API endpoint for blocking users and listing the users blocked.
+    """
+
+    permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberPagination
+    pagination_class.page_size = 10
+
+    def get(self, request):
+        """
+        Handles GET requests to list the users blocked by the current user,
+        most recently blocked first.
+        """
+        users_queryset = User.objects.filter(blocked_by__blocker=request.user).order_by(
+            "-blocked_by__created_at", "-id"
+        )
+
+        paginator = self.pagination_class()
+        paginated_queryset = paginator.paginate_queryset(
+            users_queryset.values(*USER_VALUE_FIELDS), request
+        )
+
+        return paginator.get_paginated_response(serialize_users(paginated_queryset))
+
+    def post(self, request):
+        """
+        Handles POST requests to block or unblock a user.
+        Takes the `action`, block or unblock, and the `user_id` of the other user.
+        Blocked users cannot send friend requests to each other and are left out of each other's searches.
+        """
+        action = request.data.get("action")
+        user_id = request.data.get("user_id")
+
+        if action not in ["block", "unblock"]:
+            return get_api_response(
+                False,
+                {"message": "Please enter valid action!"},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        if not user_id:
+            return get_api_response(
+                False,
+                {"message": "Please select user!"},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        other_user_id = (
+            User.objects.filter(id=user_id).values_list("id", flat=True).first()
+            if str(user_id).isdigit()
+            else None
+        )
+        if not other_user_id or other_user_id == request.user.id:
+            return get_api_response(
+                False,
+                {"message": "Please select valid user!"},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        if action == "block":
+            block_user(request.user.id, other_user_id)
+            message = "User blocked successfully!"
+        else:
+            if not unblock_user(request.user.id, other_user_id):
+                return get_api_response(
+                    False,
+                    {"message": "User is not blocked!"},
+                    status.HTTP_404_NOT_FOUND,
+                )
+            message = "User unblocked successfully!"
+
+        return get_api_response(True, {"message": message}, status.HTTP_200_OK)
+
+
+class SocialGraphExportAPI(APIView):
+    """
+    API endpoint streaming the whole friendship graph, for admins only.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+    def get(self, request):
+        """
+        Handles GET requests to export friendships and friend requests.
+        Takes the `output` format (ndjson or csv), an optional `since` timestamp to only
+        export records created or resolved since then, and `gzip=true` to compress.
+        The response is streamed while rows are read, see graph_export.export_graph.
+        """
+        output_format = request.GET.get("output", "ndjson")
+        if output_format not in FORMATS:
+            return get_api_response(
+                False,
+                {"message": "Output must be ndjson or csv."},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        since = request.GET.get("since")
+        if since:
+            try:
+                since = parse_since(since)
+            except ValueError:
+                return get_api_response(
+                    False,
+                    {"message": "Since must be an ISO 8601 timestamp."},
+                    status.HTTP_400_BAD_REQUEST,
+                )
+        else:
+            since = None
+
+        gzip = request.GET.get("gzip", "").lower() in ("1", "true")
+        filename = f"social_graph.{output_format}" + (".gz" if gzip else "")
+        response = StreamingHttpResponse(
+            export_graph(output_format, since=since, gzip=gzip),
+            content_type=(
+                "application/gzip" if gzip else self.CONTENT_TYPES[output_format]
+            ),
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
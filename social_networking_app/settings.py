@@ -44,6 +44,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "utitlities.middleware.MetricsMiddleware",
+    # Both are disabled unless TRAFFIC_RECORDER or QUERY_COUNT_HEADER is set
+    "utitlities.middleware.TrafficRecorderMiddleware",
+    "utitlities.middleware.QueryCountMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -73,6 +77,13 @@ TEMPLATES = [
 WSGI_APPLICATION = "social_networking_app.wsgi.application"
 
 
+# Serve the friend list, pending friend request and user search endpoints
+# with native async views. Only useful when running under an ASGI server
+# (social_networking_app.asgi), under WSGI every async view is run to
+# completion on the request thread.
+ASYNC_VIEWS = False
+
+
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
@@ -84,6 +95,25 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# The local memory cache is private to each worker process, use a shared
+# backend such as django.core.cache.backends.redis.RedisCache when running
+# several workers with FRIEND_LIST_CACHE, BLOCK_FILTER, TOKEN_AUTHENTICATION
+# or the rate limit CacheBackend.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+
+AUTHENTICATION_BACKENDS = [
+    "user_operations.backends.PooledModelBackend",
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -132,5 +162,204 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.SessionAuthentication",
-    ]
+        # After sessions, so unauthenticated requests keep getting a 403
+        "user_operations.authentication.SignedTokenAuthentication",
+    ],
+    "DEFAULT_THROTTLE_RATES": {
+        "per_minute": "60/min",
+    },
+}
+
+
+# Rate Limit Related Settings
+
+RATE_LIMITS = {
+    # Where hit counters are kept. DatabaseBackend shares them between all
+    # workers through the default database, CacheBackend uses a Django cache
+    # (e.g. Redis, set "OPTIONS": {"CACHE": "<alias>"}), LocMemBackend keeps
+    # them in process memory and is only suitable for a single worker.
+    "BACKEND": "social_interactions.throttles.rate_limiter.DatabaseBackend",
+    "OPTIONS": {},
+    "RATES": {
+        "friend_request_send": "3/min",
+    },
+}
+
+
+# Social Graph Related Settings
+
+SOCIAL_GRAPH_INDEX = {
+    # Serve friend lists and friendship checks from an in-process CSR index
+    "ENABLED": False,
+    # Rebuild the index after this many seconds to pick up edges created by
+    # other worker processes, None keeps the first build forever
+    "MAX_AGE": 300,
+    # Rows fetched per round trip while streaming the Friend table
+    "CHUNK_SIZE": 10000,
+    # Load the index from a snapshot written by the write_graph_snapshot
+    # command plus the friendships created since, instead of the whole
+    # Friend table. None, or a missing file, builds it from the table.
+    "SNAPSHOT_PATH": None,
+    # Friendships created this many seconds before the snapshot are read
+    # again, to catch transactions committed while it was being written
+    "SNAPSHOT_OVERLAP": 300,
+    # Read the whole snapshot to check its checksum on every load. The
+    # write_graph_snapshot command checks it once before replacing the file.
+    "SNAPSHOT_VERIFY": False,
+    # Log a warning when more friendships than this were created since the
+    # snapshot, as a reminder to write a new one. None never warns.
+    "SNAPSHOT_DELTA_WARNING": 100000,
+}
+
+
+CONNECTION_PATH = {
+    # Longest chain of friendships searched by the connection path endpoint,
+    # and the default when the request does not set max_depth
+    "MAX_DEPTH": 6,
+    # Friendships read per search before giving up, bounds the latency of
+    # searches through users with very many friends
+    "MAX_VISITS": 100000,
+}
+
+BLOCK_FILTER = {
+    # Check blocks between users against in-process bloom filters, so users
+    # without blocks cost no query when sending friend requests. Disabled,
+    # every check reads the Block table.
+    "ENABLED": False,
+    # Django cache alias holding the block generation, bumped on every block
+    # and unblock. It must be shared by all workers, a local memory cache
+    # fails the social_interactions.E001 system check.
+    "CACHE": "default",
+    # Blocks the filters are sized for at least, they are sized for twice
+    # the existing blocks when there are more
+    "CAPACITY": 100000,
+    # False positive rate of the filters at capacity, each false positive
+    # costs one query
+    "ERROR_RATE": 0.01,
+    # Rebuild the filters after this many seconds to forget unblocked pairs,
+    # None keeps them until they are full
+    "MAX_AGE": 3600,
+    # Exact block sets of users with blocks kept in each process, least
+    # recently used ones are evicted first
+    "EXACT_MAX_ENTRIES": 10000,
+}
+
+FRIEND_REQUEST_RETENTION = {
+    # Pending friend requests sent more than this many days ago are expired
+    # by the expire_friend_requests command, None keeps them
+    "PENDING_DAYS": 90,
+    # Rejected friend requests are removed this many days after they were
+    # rejected, None keeps them. A removed rejection no longer stops the
+    # sender from sending the same request again.
+    "REJECTED_DAYS": 30,
+    # Move removed requests to ArchivedFriendRequest instead of deleting them
+    "ARCHIVE": True,
+    # Requests removed per transaction, smaller batches hold locks shorter
+    "BATCH_SIZE": 1000,
+    # Seconds to sleep between batches, leaves room for other writes
+    "BATCH_PAUSE": 0.1,
+}
+
+
+# User Search Related Settings
+
+USER_AUTOCOMPLETE = {
+    # Reload the in-memory index after this many seconds to pick up users who
+    # signed up on other worker processes, None keeps the first load forever
+    "MAX_AGE": 300,
+    # Default and maximum number of matches returned
+    "LIMIT": 10,
+    "MAX_LIMIT": 50,
+}
+
+FRIEND_LIST_CACHE = {
+    # Cache friend list pages per user, invalidated when friendships change.
+    # Needs a CACHES backend shared by all workers to never serve stale pages.
+    "ENABLED": False,
+    # Django cache alias holding the versions and pages
+    "CACHE": "default",
+    # Seconds a page is kept in both the shared and the per-process cache
+    "TTL": 300,
+    # Pages kept in each process, least recently used ones are evicted first
+    "LOCAL_MAX_ENTRIES": 10000,
+}
+
+
+# Password Hashing Related Settings
+
+PASSWORD_POOL = {
+    # Hash and verify passwords in worker processes instead of the request
+    # thread, disabled runs them inline like Django does
+    "ENABLED": True,
+    # Worker processes per server process
+    "WORKERS": 2,
+    # Operations waiting for a worker beyond which requests get a 503
+    "MAX_QUEUE": 16,
+    # Seconds to wait for a result before answering with a 503
+    "TIMEOUT": 10,
+    # "spawn" is safe with threaded servers, "fork" starts workers faster
+    "START_METHOD": "spawn",
+}
+
+LOGIN_FAILURE_CACHE = {
+    # Count failed logins per email and client IP, and reject attempts
+    # without hashing once there are too many
+    "ENABLED": True,
+    # Django cache alias holding the failure counts, see CACHES
+    "CACHE": "default",
+    # Failed logins after which attempts are rejected until the TTL runs out
+    "MAX_FAILURES": 5,
+    # Seconds a failure count is kept, from the first failure
+    "TTL": 300,
+}
+
+USER_IMPORT = {
+    # Largest body in bytes and most rows accepted by the import endpoint,
+    # which hashes the passwords within the request. Import larger files
+    # with the import_users command.
+    "MAX_UPLOAD_SIZE": 4 * 1024,
+    "MAX_ROWS": 20,
+}
+
+
+# Token Authentication Related Settings
+
+TOKEN_AUTHENTICATION = {
+    # Seconds a token issued on login stays valid
+    "TTL": 86400,
+    # Seconds a user is kept in each process before being read again
+    "USER_CACHE_TTL": 60,
+    # Users kept in each process, least recently used ones are evicted first
+    "USER_CACHE_MAX_ENTRIES": 10000,
+    # Django cache alias holding token revocations, see CACHES
+    "CACHE": "default",
+    # Seconds a token found unrevoked is cached. Revocations reach workers
+    # that do not share the cache within this time.
+    "REVOCATION_CACHE_TTL": 60,
+}
+
+
+# Benchmark Related Settings
+
+TRAFFIC_RECORDER = {
+    # Append every request to a JSONL trace that benchmarks.replay can replay
+    "ENABLED": False,
+    "PATH": BASE_DIR / "recorded_traffic.jsonl",
+    # Bodies larger than this many bytes are not recorded
+    "MAX_BODY_SIZE": 65536,
+}
+
+# Add the number of database queries of each request as X-Query-Count
+QUERY_COUNT_HEADER = False
+
+METRICS = {
+    # Record per-view latency, status and query metrics, exported in the
+    # Prometheus text format at /metrics. Values are kept per process, so
+    # every worker process has to be scraped.
+    "ENABLED": True,
+    # Client addresses allowed to read /metrics besides staff users, such as
+    # the Prometheus server. Behind a proxy this is the proxy's address.
+    "ALLOWED_IPS": (),
+    # Upper bounds in seconds of the request latency histogram buckets
+    "BUCKETS": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
 }
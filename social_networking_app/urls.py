@@ -18,8 +18,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from utitlities.views import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("user/", include("user_operations.urls")),
     path("social/", include("social_interactions.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
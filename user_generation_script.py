@@ -1,30 +1,324 @@
 """
 This script is used to generate random users for testing purposes.
+
+Users are created with `bulk_create` in chunks across several processes and
+share one precomputed password hash. Friendships follow a power-law degree
+distribution (Chung-Lu model), and pending and rejected friend requests are
+sent mostly to popular users. The same seed always produces the same graph.
+
+Usage:
+    python user_generation_script.py --users 1000000 --average-degree 20
 """
 
 import os
+import time
+import random
+import argparse
+from itertools import accumulate
+from bisect import bisect_right
+from multiprocessing import Pool
+
 import django
 
 # Set up Django environment
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_networking_app.settings")
 django.setup()
 
+from django.db import connection, connections, transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
+
+from user_operations.profiles import sync_profiles
+from user_operations.search_index import index_users
+from social_interactions.models import Friend, FriendRequest
+from social_interactions.counters import reconcile_counters
+
+# Set in each worker process by `init_worker`
+options = None
+user_ids = None
+cum_weights = None
+
+
+def get_weights(num_users, average_degree, exponent, seed):
+    """
+    Returns the expected degree of each user.
+
+    Degrees follow a power law with the given exponent, scaled to the average
+    degree and capped at the number of other users. Which user gets which
+    degree is shuffled with the seed.
+    """
+    if num_users < 2:
+        return [0.0] * num_users
+
+    weights = [(i + 1) ** (-1 / (exponent - 1)) for i in range(num_users)]
+    scale = average_degree * num_users / sum(weights)
+    weights = [min(weight * scale, num_users - 1) for weight in weights]
+    random.Random(seed).shuffle(weights)
+    return weights
+
+
+def poisson_round(value, rng):
+    """
+    Rounds a value up or down at random, keeping its expected value.
+    """
+    whole = int(value)
+    return whole + (rng.random() < value - whole)
+
+
+def init_worker(worker_options, worker_user_ids, worker_cum_weights):
+    global options, user_ids, cum_weights
+
+    options = worker_options
+    user_ids = worker_user_ids
+    cum_weights = worker_cum_weights
+
+
+def create_user_chunk(chunk):
+    """
+    Creates users `start` to `end`, their profiles and search index rows.
+
+    Returns their ids in order.
+    """
+    start, end, password = chunk
+    users = [
+        User(
+            first_name=f"user_{i}",
+            username=f"user_{i}@example.com",
+            email=f"user_{i}@example.com",
+            password=password,
+        )
+        for i in range(start, end)
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        sync_profiles(users)
+        index_users(users)
+    return [user.id for user in users]
+
+
+def sample_targets(source, count, rng):
+    """
+    Samples up to `count` distinct users other than `source`, proportionally
+    to their expected degree.
+    """
+    total = cum_weights[-1]
+    targets = set()
+    for _ in range(count):
+        target = bisect_right(cum_weights, rng.random() * total)
+        if target != source and target < len(cum_weights):
+            targets.add(target)
+    return targets
+
+
+def create_friendship_chunk(chunk):
+    """
+    Creates the friendships started by users `start` to `end`.
+
+    Each user starts about half of its expected degree worth of friendships,
+    and receives the other half from friendships started by other users.
+    Friendships started from both sides are stored once.
+    """
+    start, end = chunk
+    rng = random.Random(f"{options['seed']}:friends:{start}")
+
+    pairs = []
+    for source in range(start, end):
+        weight = cum_weights[source] - (cum_weights[source - 1] if source else 0)
+        count = poisson_round(weight / 2, rng)
+        for target in sample_targets(source, count, rng):
+            pairs.append((user_ids[source], user_ids[target]))
+
+    with transaction.atomic():
+        Friend.objects.create_friendships(pairs)
+    return len(pairs)
+
+
+def create_friend_request_chunk(chunk):
+    """
+    Creates the pending and rejected friend requests sent by users `start` to
+    `end`, skipping users who are already friends.
+    """
+    start, end = chunk
+    rng = random.Random(f"{options['seed']}:requests:{start}")
+    now = timezone.now()
+
+    sent = {}
+    for source in range(start, end):
+        pending = poisson_round(options["pending_per_user"], rng)
+        rejected = poisson_round(options["rejected_per_user"], rng)
+        targets = list(sample_targets(source, pending + rejected, rng))
+        sent[user_ids[source]] = [
+            (user_ids[target], position >= pending)
+            for position, target in enumerate(targets)
+        ]
+
+    friends = set(
+        Friend.objects.filter(friend1_id__in=sent.keys()).values_list(
+            "friend1_id", "friend2_id"
+        )
+    )
+    friend_requests = [
+        FriendRequest(
+            from_user_id=from_user_id,
+            to_user_id=to_user_id,
+            rejected=rejected,
+            rejected_at=now if rejected else None,
+        )
+        for from_user_id, targets in sent.items()
+        for to_user_id, rejected in targets
+        if (from_user_id, to_user_id) not in friends
+    ]
+
+    with transaction.atomic():
+        FriendRequest.objects.bulk_create(friend_requests, ignore_conflicts=True)
+    return len(friend_requests)
+
+
+def get_chunks(start, end, chunk_size):
+    return [
+        (chunk_start, min(chunk_start + chunk_size, end))
+        for chunk_start in range(start, end, chunk_size)
+    ]
+
+
+def run_phase(name, function, chunks, pool):
+    """
+    Runs a function over the chunks, in the pool if there is one, and prints
+    the progress. Returns the results in chunk order.
+    """
+    started = time.monotonic()
+    results = []
+    mapped = pool.imap(function, chunks) if pool else map(function, chunks)
+    for done, result in enumerate(mapped, start=1):
+        results.append(result)
+        print(f"\r{name}: {done}/{len(chunks)} chunks", end="", flush=True)
+    print(f"\r{name}: {len(chunks)} chunks in {time.monotonic() - started:.1f}s")
+    return results
+
+
+def generate(args):
+    """
+    Creates the users, friendships and friend requests described by `args`.
+    """
+    start, end = args.start, args.start + args.users
+    if User.objects.filter(username=f"user_{start}@example.com").exists():
+        raise SystemExit(
+            f"user_{start}@example.com already exists, use --start to add more users"
+        )
+
+    workers = args.workers
+    if connection.vendor == "sqlite" and workers > 1:
+        # SQLite allows a single writer, extra processes would only wait
+        print("SQLite only allows one writer, using a single process")
+        workers = 1
+
+    password = make_password(args.password)
+    weights = get_weights(args.users, args.average_degree, args.exponent, args.seed)
+    worker_options = {
+        "seed": args.seed,
+        "pending_per_user": args.pending_per_user,
+        "rejected_per_user": args.rejected_per_user,
+    }
+    worker_cum_weights = list(accumulate(weights))
+
+    pool = None
+    if workers > 1:
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+        pool = Pool(workers)
+
+    try:
+        chunks = get_chunks(start, end, args.chunk_size)
+        id_chunks = run_phase(
+            "Users",
+            create_user_chunk,
+            [(chunk_start, chunk_end, password) for chunk_start, chunk_end in chunks],
+            pool,
+        )
+        worker_user_ids = [user_id for ids in id_chunks for user_id in ids]
+
+        # Workers started before the user ids were known, so they are handed
+        # the ids and weights through a new pool
+        init_worker(worker_options, worker_user_ids, worker_cum_weights)
+        if pool is not None:
+            pool.close()
+            pool.join()
+            connections.close_all()
+            pool = Pool(
+                workers,
+                initializer=init_worker,
+                initargs=(worker_options, worker_user_ids, worker_cum_weights),
+            )
+
+        chunks = get_chunks(0, args.users, args.chunk_size)
+        if args.average_degree and args.users > 1:
+            friendships = run_phase(
+                "Friendships", create_friendship_chunk, chunks, pool
+            )
+            print(f"Created up to {sum(friendships)} friendships")
+        if (args.pending_per_user or args.rejected_per_user) and args.users > 1:
+            friend_requests = run_phase(
+                "Friend requests", create_friend_request_chunk, chunks, pool
+            )
+            print(f"Created up to {sum(friend_requests)} friend requests")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    started = time.monotonic()
+    reconcile_counters(chunk_size=args.chunk_size)
+    print(f"Counters: {time.monotonic() - started:.1f}s")
 
 
 def create_users(num_users=100):
-    for i in range(num_users):
-        first_name = f"user_{i}"
-        username = f"{first_name}@example.com"
-        email = f"{first_name}@example.com"
-        password = "Test@123"
-
-        # Create the user
-        user = User.objects.create_user(
-            first_name=first_name, username=username, email=email, password=password
+    """
+    Creates `num_users` users without friendships or friend requests.
+    """
+    generate(
+        parse_args(
+            [
+                f"--users={num_users}",
+                "--average-degree=0",
+                "--pending-per-user=0",
+                "--rejected-per-user=0",
+            ]
         )
-        print(f"Created user: {username}")
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument(
+        "--start",
+        type=int,
+        default=0,
+        help="Number of the first user, to add users to an existing dataset",
+    )
+    parser.add_argument("--password", default="Test@123")
+    parser.add_argument("--average-degree", type=float, default=10)
+    parser.add_argument(
+        "--exponent",
+        type=float,
+        default=2.5,
+        help="Power-law exponent of the degree distribution, greater than 2",
+    )
+    parser.add_argument("--pending-per-user", type=float, default=1)
+    parser.add_argument("--rejected-per-user", type=float, default=0.5)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count() or 1, 8))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    if args.exponent <= 2:
+        parser.error("--exponent must be greater than 2")
+    return args
 
 
 if __name__ == "__main__":
-    create_users()
+    started = time.monotonic()
+    generate(parse_args())
+    print(f"Done in {time.monotonic() - started:.1f}s")
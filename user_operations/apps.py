@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class UserOperationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user_operations'
+
+    def ready(self):
+        from . import signals  # noqa: F401
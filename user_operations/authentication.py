@@ -0,0 +1,256 @@
+import copy
+import time
+import secrets
+import threading
+from collections import OrderedDict
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.utils import timezone
+from django.contrib.auth.models import User
+from django.utils.crypto import constant_time_compare
+
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+from utitlities.metrics import get_metrics
+
+from .models import RevokedToken
+
+TOKEN_SALT = "user_operations.token"
+
+
+def get_token_config():
+    return settings.TOKEN_AUTHENTICATION
+
+
+def get_auth_hash(user):
+    # Tokens stop verifying once the password changes, like sessions do
+    return user.get_session_auth_hash()[:16]
+
+
+def issue_token(user):
+    """
+    Returns a signed token for `user`, valid for `TOKEN_AUTHENTICATION["TTL"]`
+    seconds.
+    """
+    payload = {
+        "user_id": user.id,
+        "token_id": secrets.token_urlsafe(8),
+        "hash": get_auth_hash(user),
+        "issued_at": int(time.time()),
+    }
+    return signing.dumps(payload, salt=TOKEN_SALT)
+
+
+def load_token(token):
+    """
+    Returns the payload of a valid, unexpired and unrevoked token, raises
+    AuthenticationFailed otherwise.
+    """
+    try:
+        payload = signing.loads(
+            token, salt=TOKEN_SALT, max_age=get_token_config().get("TTL", 86400)
+        )
+    except signing.SignatureExpired:
+        raise AuthenticationFailed("Token has expired.")
+    except signing.BadSignature:
+        raise AuthenticationFailed("Invalid token.")
+
+    if is_revoked(payload):
+        raise AuthenticationFailed("Token has been revoked.")
+    return payload
+
+
+def get_revocation_key(token_id):
+    return f"revoked_token:{token_id}"
+
+
+def get_remaining_lifetime(payload):
+    return max(
+        payload["issued_at"] + get_token_config().get("TTL", 86400) + 1 - time.time(),
+        1,
+    )
+
+
+def is_revoked(payload):
+    """
+    Checks if a token was revoked, reading the RevokedToken table only when
+    the Django cache has no answer for it yet.
+
+    Revocations are cached until the token expires. Tokens found unrevoked
+    are cached for `REVOCATION_CACHE_TTL` seconds, the longest a revocation
+    takes to reach workers that do not share the cache.
+    """
+    config = get_token_config()
+    revocation_cache = caches[config.get("CACHE", "default")]
+    key = get_revocation_key(payload["token_id"])
+
+    revoked = revocation_cache.get(key)
+    get_metrics().increment(
+        "cache_requests_total",
+        cache="token_revocation",
+        result="miss" if revoked is None else "hit",
+    )
+    if revoked is None:
+        revoked = RevokedToken.objects.filter(token_id=payload["token_id"]).exists()
+        # Added, not set, so a revocation cached meanwhile is kept
+        revocation_cache.add(
+            key,
+            revoked,
+            timeout=(
+                get_remaining_lifetime(payload)
+                if revoked
+                else min(
+                    config.get("REVOCATION_CACHE_TTL", 60),
+                    get_remaining_lifetime(payload),
+                )
+            ),
+        )
+    return revoked
+
+
+def revoke_token(token):
+    """
+    Adds a token to the RevokedToken table until it would have expired
+    anyway, so the table only ever holds tokens that are still live, and to
+    the revocation cache, see is_revoked. Rows of tokens that have expired
+    since are deleted on the way.
+    """
+    config = get_token_config()
+    ttl = config.get("TTL", 86400)
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT, max_age=ttl)
+    except signing.BadSignature:
+        return
+    expires_at = datetime.fromtimestamp(
+        payload["issued_at"] + ttl + 1, tz=dt_timezone.utc
+    )
+    RevokedToken.objects.bulk_create(
+        [RevokedToken(token_id=payload["token_id"], expires_at=expires_at)],
+        ignore_conflicts=True,
+    )
+    caches[config.get("CACHE", "default")].set(
+        get_revocation_key(payload["token_id"]),
+        True,
+        timeout=get_remaining_lifetime(payload),
+    )
+    RevokedToken.objects.filter(expires_at__lt=timezone.now()).delete()
+
+
+class UserCache:
+    """
+    Size-bounded LRU of active users by id, kept in process memory.
+
+    Entries expire after `ttl` seconds, so users deactivated or changed on
+    another worker are picked up within that time. Saves on this process
+    evict the user immediately, see signals.py. Each lookup returns a copy,
+    so requests never share an instance.
+    """
+
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """
+        Returns the user with `user_id`, loading it on a miss, or None.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._users.move_to_end(user_id)
+                get_metrics().increment(
+                    "cache_requests_total", cache="token_user", result="hit"
+                )
+                return copy.copy(entry[1])
+
+        get_metrics().increment(
+            "cache_requests_total", cache="token_user", result="miss"
+        )
+        user = User._default_manager.filter(pk=user_id).first()
+        if user is None:
+            return None
+        with self._lock:
+            self._users[user_id] = (now + self.ttl, user)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_entries:
+                self._users.popitem(last=False)
+        return copy.copy(user)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+
+def get_user_cache():
+    """
+    Returns the process-wide user cache.
+    """
+    global _user_cache
+
+    if _user_cache is None:
+        with _user_cache_lock:
+            if _user_cache is None:
+                config = get_token_config()
+                _user_cache = UserCache(
+                    ttl=config.get("USER_CACHE_TTL", 60),
+                    max_entries=config.get("USER_CACHE_MAX_ENTRIES", 10000),
+                )
+    return _user_cache
+
+
+def reset_user_cache():
+    """
+    Drops the process-wide user cache.
+    """
+    global _user_cache
+    _user_cache = None
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates `Authorization: Bearer <token>` headers with tokens issued
+    by the login endpoint.
+
+    Tokens are signed with SECRET_KEY and carry the user id and issue time,
+    so verifying one needs no session row. Revocation is read from the
+    Django cache, falling back to one indexed lookup of the RevokedToken
+    table, and the user comes from the in-process UserCache, so
+    authenticated requests usually run no authentication query.
+    """
+
+    keyword = "Bearer"
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed("Invalid token header.")
+
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed("Invalid token header.")
+
+        payload = load_token(token)
+        user = get_user_cache().get(payload["user_id"])
+        if user is None or not user.is_active:
+            raise AuthenticationFailed("User inactive or deleted.")
+        if not constant_time_compare(payload["hash"], get_auth_hash(user)):
+            raise AuthenticationFailed("Invalid token.")
+        return user, token
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,307 @@
+import time
+import heapq
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connections
+from django.contrib.auth.models import User
+
+from social_interactions.models import Block
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixIndex:
+    """
+    Sorted in-memory index of lowercased user emails and first names.
+
+    `keys` is a sorted list of lowercased emails and first names and
+    `user_ids` the parallel array of the users they belong to, so a prefix
+    lookup is a binary search followed by a scan of the matching run. Email
+    and name of each user are kept to answer without touching the database.
+
+    Keys of users created or changed after the build go to a small sorted
+    side list, searched along with the main one and merged into it once it
+    holds `MAX_ADDED` keys or when the index is reloaded. Keys of a deleted
+    user, or of an email or name since changed, stay until then and are
+    skipped by search.
+
+    The ids of users involved in any block are kept too, so lookups of the
+    users without blocks need no query to leave blocked users out. Unblocks
+    only take effect on reload.
+    """
+
+    MAX_ADDED = 1024
+
+    def __init__(self, entries=(), users=None, blocked_user_ids=()):
+        entries = sorted(entries)
+        self.keys = [key for key, _ in entries]
+        self.user_ids = array("q", (user_id for _, user_id in entries))
+        self.users = users or {}
+        self.blocked_user_ids = set(blocked_user_ids)
+        self.built_at = time.monotonic()
+        self._added_keys = []
+        self._added_user_ids = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, chunk_size=10000):
+        """
+        Builds the index from the User table with one streamed query, and
+        one query for the users involved in blocks.
+        """
+        entries = []
+        users = {}
+        for user_id, email, first_name in (
+            User.objects.order_by()
+            .values_list("id", "email", "first_name")
+            .iterator(chunk_size=chunk_size)
+        ):
+            users[user_id] = (email, first_name)
+            entries.extend((key, user_id) for key in cls.get_keys(email, first_name))
+
+        blocked_user_ids = set()
+        for user_ids in Block.objects.values_list("blocker_id", "blocked_id"):
+            blocked_user_ids.update(user_ids)
+        return cls(entries, users, blocked_user_ids)
+
+    @staticmethod
+    def get_keys(email, first_name):
+        """
+        Returns the keys a user is indexed under.
+        """
+        return {value.lower() for value in (email, first_name) if value}
+
+    def is_current(self, key, user_id):
+        """
+        Checks if a key still belongs to the current email or name of a user.
+        """
+        user = self.users.get(user_id)
+        return user is not None and key in self.get_keys(*user)
+
+    def add_user(self, user_id, email, first_name):
+        """
+        Adds a user created or changed after the index was built.
+        """
+        with self._lock:
+            user = self.users.get(user_id)
+            old_keys = self.get_keys(*user) if user is not None else set()
+            self.users[user_id] = (email, first_name)
+            # The side lists are replaced rather than changed in place, so
+            # searches walking the previous ones are not disturbed
+            added_keys = list(self._added_keys)
+            added_user_ids = list(self._added_user_ids)
+            for key in self.get_keys(email, first_name) - old_keys:
+                position = bisect_left(added_keys, key)
+                added_keys.insert(position, key)
+                added_user_ids.insert(position, user_id)
+            self._added_keys, self._added_user_ids = added_keys, added_user_ids
+            if len(self._added_keys) >= self.MAX_ADDED:
+                self._merge_added()
+
+    def remove_user(self, user_id):
+        """
+        Removes a deleted user from the results.
+        """
+        with self._lock:
+            self.users.pop(user_id, None)
+
+    def add_block(self, blocker_id, blocked_id):
+        """
+        Records a block made after the index was built.
+        """
+        with self._lock:
+            self.blocked_user_ids.update((blocker_id, blocked_id))
+
+    def may_have_blocks(self, user_id):
+        """
+        Checks if a user might have blocked or been blocked by anyone.
+        """
+        return user_id in self.blocked_user_ids
+
+    def _merge_added(self):
+        # One pass over both sorted lists, dropping keys no longer current
+        entries = [
+            (key, user_id)
+            for key, user_id in heapq.merge(
+                zip(self.keys, self.user_ids),
+                zip(self._added_keys, self._added_user_ids),
+            )
+            if self.is_current(key, user_id)
+        ]
+        self.keys = [key for key, _ in entries]
+        self.user_ids = array("q", (user_id for _, user_id in entries))
+        self._added_keys = []
+        self._added_user_ids = []
+
+    def search(self, prefix, limit, exclude_user_id=None, exclude_user_ids=()):
+        """
+        Returns up to `limit` users with an email or name starting with `prefix`,
+        ordered by the matching key, leaving out `exclude_user_id` and
+        `exclude_user_ids`.
+        """
+        prefix = prefix.lower()
+        results = []
+        seen = {exclude_user_id, *exclude_user_ids}
+
+        # Only the references are read under the lock, the lists are never
+        # changed in place, so lookups do not wait for each other
+        with self._lock:
+            lists = (self.keys, self.user_ids, self._added_keys, self._added_user_ids)
+        keys, user_ids, added_keys, added_user_ids = lists
+
+        # Walk the matching runs of the main and side lists in key order
+        runs = [
+            self.iter_run(keys, user_ids, prefix),
+            self.iter_run(added_keys, added_user_ids, prefix),
+        ]
+        for key, user_id in heapq.merge(*runs):
+            if len(results) >= limit:
+                break
+            if user_id in seen:
+                continue
+            user = self.users.get(user_id)
+            # Keys of deleted users, or of an email or name since changed
+            if user is None or key not in self.get_keys(*user):
+                continue
+
+            seen.add(user_id)
+            results.append({"id": user_id, "email": user[0], "name": user[1]})
+
+        return results
+
+    @staticmethod
+    def iter_run(keys, user_ids, prefix):
+        """
+        Yields the `(key, user_id)` pairs whose key starts with `prefix`.
+        """
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            yield keys[position], user_ids[position]
+            position += 1
+
+    @property
+    def age(self):
+        """
+        Seconds since the index was built.
+        """
+        return time.monotonic() - self.built_at
+
+
+_index = None
+_build_lock = threading.Lock()
+# Guards recording users into the index against the swap of a rebuilt one
+_changes_lock = threading.Lock()
+# Users recorded while a rebuild runs, replayed on the rebuilt index
+_pending_changes = None
+
+
+def apply_change(index, change):
+    method, args = change
+    getattr(index, method)(*args)
+
+
+def rebuild_in_background(index):
+    """
+    Rebuilds a stale index in a background thread and swaps it in once it is
+    finished, with the users recorded meanwhile. Call with `_build_lock`
+    held, the thread releases it.
+    """
+    global _pending_changes
+
+    with _changes_lock:
+        _pending_changes = []
+
+    def rebuild():
+        global _index, _pending_changes
+
+        try:
+            rebuilt = PrefixIndex.build()
+            with _changes_lock:
+                for change in _pending_changes:
+                    apply_change(rebuilt, change)
+                if _index is index:
+                    _index = rebuilt
+        except Exception:
+            logger.exception("Rebuilding the autocomplete index failed")
+        finally:
+            with _changes_lock:
+                _pending_changes = None
+            connections.close_all()
+            _build_lock.release()
+
+    threading.Thread(
+        target=rebuild, name="autocomplete-index-rebuild", daemon=True
+    ).start()
+
+
+def get_autocomplete_index():
+    """
+    Returns the process-wide autocomplete index.
+
+    The index is loaded on first use and reloaded once it is older than
+    `USER_AUTOCOMPLETE["MAX_AGE"]` seconds, so that users who signed up on
+    other worker processes are picked up. Only the first load runs in the
+    calling thread, a stale index is reloaded in a background thread and
+    keeps serving lookups until the new one is swapped in.
+    """
+    global _index
+
+    index = _index
+    if index is None:
+        with _build_lock:
+            if _index is None:
+                _index = PrefixIndex.build()
+        return _index
+
+    max_age = settings.USER_AUTOCOMPLETE.get("MAX_AGE")
+    if max_age is not None and index.age > max_age:
+        if _build_lock.acquire(blocking=False):
+            if _index is index:
+                rebuild_in_background(index)
+            else:
+                _build_lock.release()
+
+    return index
+
+
+def record_change(change):
+    with _changes_lock:
+        if _index is not None:
+            apply_change(_index, change)
+        if _pending_changes is not None:
+            _pending_changes.append(change)
+
+
+def record_user(user):
+    """
+    Adds a new or changed user to the index if it has been loaded in this
+    process.
+    """
+    record_change(("add_user", (user.id, user.email or "", user.first_name)))
+
+
+def forget_user(user_id):
+    """
+    Removes a deleted user from the index if it has been loaded in this
+    process.
+    """
+    record_change(("remove_user", (user_id,)))
+
+
+def record_block(blocker_id, blocked_id):
+    """
+    Adds a new block to the index if it has been loaded in this process.
+    """
+    record_change(("add_block", (blocker_id, blocked_id)))
+
+
+def reset_autocomplete_index():
+    """
+    Drops the process-wide index, it is reloaded on next use.
+    """
+    global _index
+    _index = None
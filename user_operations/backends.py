@@ -0,0 +1,97 @@
+import hmac
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.contrib.auth import hashers
+from django.contrib.auth.models import User
+from django.contrib.auth.backends import ModelBackend
+
+from utitlities.metrics import get_metrics
+
+from .password_pool import check_password, make_password
+
+
+def get_failure_key(username, client_ip, encoded):
+    """
+    Returns the failure counter cache key of an email and client IP.
+
+    The key is an HMAC under SECRET_KEY, so the cache never holds the emails
+    or addresses. It covers the stored hash, so a password change lifts the
+    limit.
+    """
+    message = "\0".join((username, client_ip, encoded)).encode()
+    digest = hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256)
+    return f"login_failure:{digest.hexdigest()}"
+
+
+def get_client_ip(request):
+    if request is None:
+        return ""
+    return request.META.get("REMOTE_ADDR", "")
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend verifying passwords in the password pool.
+
+    Failed logins are counted per email and client IP. After
+    `LOGIN_FAILURE_CACHE["MAX_FAILURES"]` within `TTL` seconds every attempt
+    is rejected without hashing until the TTL runs out, and a successful
+    login resets the count. Like ModelBackend, a password is hashed for
+    unknown emails too, to not reveal which ones are registered.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        user = User._default_manager.filter(**{User.USERNAME_FIELD: username}).first()
+        encoded = user.password if user is not None else ""
+
+        config = settings.LOGIN_FAILURE_CACHE
+        failure_cache = caches[config.get("CACHE", "default")]
+        failure_key = get_failure_key(username, get_client_ip(request), encoded)
+        if config.get("ENABLED"):
+            locked = failure_cache.get(failure_key, 0) >= config.get("MAX_FAILURES", 5)
+            get_metrics().increment(
+                "cache_requests_total",
+                cache="login_failure",
+                result="hit" if locked else "miss",
+            )
+            if locked:
+                return None
+
+        if user is None:
+            make_password(password)
+            valid = False
+        else:
+            valid = check_password(password, encoded)
+
+        if not valid:
+            if config.get("ENABLED"):
+                # The TTL runs from the first failure, incr keeps it
+                failure_cache.add(failure_key, 0, config.get("TTL", 300))
+                try:
+                    failure_cache.incr(failure_key)
+                except ValueError:
+                    failure_cache.set(failure_key, 1, config.get("TTL", 300))
+            return None
+
+        if config.get("ENABLED"):
+            failure_cache.delete(failure_key)
+
+        hasher = hashers.identify_hasher(encoded)
+        if hasher.algorithm != hashers.get_hasher().algorithm or hasher.must_update(
+            encoded
+        ):
+            # Upgrade hashes made with fewer iterations or an older hasher,
+            # as User.check_password does
+            user.password = make_password(password)
+            user.save(update_fields=["password"])
+
+        if self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,249 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
+
+from .models import UserProfile
+from .profiles import is_valid_email, sync_profiles
+from .search_index import index_users
+
+# Rejected rows reported back, further ones are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+def read_csv(lines):
+    """
+    Yields `(line_number, row)` for a CSV with a name,email,password header.
+    """
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(lines):
+    """
+    Yields `(line_number, row)` for JSON objects, one per line. Rows that
+    are not JSON objects are yielded as None.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+class ImportResult:
+    """
+    Running totals of an import.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.created = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+
+    def reject(self, line_number, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "message": message})
+
+    @property
+    def processed(self):
+        return self.created + self.duplicates + self.invalid
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def users_per_second(self):
+        elapsed = self.elapsed
+        return self.created / elapsed if elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "duplicates": self.duplicates,
+            "invalid": self.invalid,
+            "seconds": round(self.elapsed, 3),
+            "users_per_second": round(self.users_per_second, 1),
+            "errors": self.errors,
+        }
+
+
+def validate_row(line_number, row, result):
+    """
+    Returns `(line_number, name, email, password)` with the email
+    lowercased, or None after recording why the row is rejected. Validates
+    like SignupAPIView, except that a missing password gives the user an
+    unusable one.
+    """
+    if row is None:
+        result.reject(line_number, "Invalid row!")
+        return None
+
+    name = (row.get("name") or "").strip()
+    email = (row.get("email") or "").strip()
+    password = row.get("password") or None
+    if not name:
+        result.reject(line_number, "Please enter name!")
+        return None
+    if not email:
+        result.reject(line_number, "Please enter email!")
+        return None
+    if not is_valid_email(email):
+        result.reject(line_number, "Please enter valid email!")
+        return None
+    return line_number, name, email.lower(), password
+
+
+def get_existing_emails(emails):
+    """
+    Returns the emails among `emails` already used by a user.
+    """
+    existing = set(
+        UserProfile.objects.filter(email_normalized__in=emails).values_list(
+            "email_normalized", flat=True
+        )
+    )
+    # Users created without a profile are still found by their username
+    existing.update(
+        User.objects.filter(username__in=emails).values_list("username", flat=True)
+    )
+    return existing
+
+
+def build_users(candidates, hash_passwords):
+    """
+    Returns `(line_number, user)` pairs of unsaved users for
+    `(line_number, name, email, password)` candidates, with their passwords
+    hashed.
+    """
+    passwords = [candidate[3] for candidate in candidates if candidate[3] is not None]
+    hashes = iter(hash_passwords(passwords))
+    return [
+        (
+            line_number,
+            User(
+                first_name=name,
+                username=email,
+                email=email,
+                password=next(hashes) if password is not None else make_password(None),
+            ),
+        )
+        for line_number, name, email, password in candidates
+    ]
+
+
+def save_users(users):
+    """
+    Inserts `(line_number, user)` pairs with their profiles and search
+    trigrams in one transaction. The users are left unsaved if it fails.
+    """
+    users = [user for _, user in users]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            sync_profiles(users)
+            index_users(users)
+    except IntegrityError:
+        for user in users:
+            user.pk = None
+        raise
+
+
+def insert_users(candidates, hash_passwords, result):
+    """
+    Creates users for `(line_number, name, email, password)` candidates,
+    skipping emails already in use, and adds them to the ImportResult.
+
+    Passwords are hashed once. If a signup takes one of the emails before
+    the insert, the taken emails are skipped and the insert retried, and if
+    it still conflicts the users are inserted one by one, rejecting the rows
+    that fail.
+    """
+    existing = get_existing_emails([candidate[2] for candidate in candidates])
+    result.duplicates += sum(candidate[2] in existing for candidate in candidates)
+    candidates = [candidate for candidate in candidates if candidate[2] not in existing]
+    if not candidates:
+        return
+
+    users = build_users(candidates, hash_passwords)
+    try:
+        save_users(users)
+        result.created += len(users)
+        return
+    except IntegrityError:
+        pass
+
+    # A user signed up with one of the emails since they were checked, leave
+    # out the emails taken since and retry once with the same hashes
+    existing = get_existing_emails([user.email for _, user in users])
+    result.duplicates += sum(user.email in existing for _, user in users)
+    users = [
+        (line_number, user) for line_number, user in users if user.email not in existing
+    ]
+    try:
+        save_users(users)
+        result.created += len(users)
+        return
+    except IntegrityError:
+        pass
+
+    # Still conflicting, insert the users one by one and report the ones
+    # that cannot be inserted
+    for line_number, user in users:
+        try:
+            save_users([(line_number, user)])
+            result.created += 1
+        except IntegrityError:
+            result.reject(line_number, "Email already registered with another user!")
+
+
+def import_users(rows, hash_passwords, batch_size=1000, progress=None):
+    """
+    Creates users from `(line_number, row)` pairs in batches of `batch_size`.
+
+    Only one batch is held in memory at a time, so `rows` can be a stream of
+    any length. Rows with an invalid or missing name or email are rejected,
+    emails already in use or repeated in the input are skipped, see
+    insert_users for emails taken while importing. Passwords are hashed with
+    `hash_passwords(passwords)`, which returns the hashes in order.
+    `progress(result)` is called after every batch.
+
+    Returns the ImportResult.
+    """
+    result = ImportResult()
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+
+        candidates = {}
+        for line_number, row in batch:
+            candidate = validate_row(line_number, row, result)
+            if candidate is None:
+                continue
+            if candidate[2] in candidates:
+                result.duplicates += 1
+                continue
+            candidates[candidate[2]] = candidate
+
+        insert_users(list(candidates.values()), hash_passwords, result)
+
+        if progress is not None:
+            progress(result)
+    return result
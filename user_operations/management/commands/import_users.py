@@ -0,0 +1,82 @@
+import os
+import sys
+import contextlib
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user_operations.password_pool import PasswordPool
+from user_operations.bulk_import import READERS, import_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates users from a CSV file with a name,email,password header or a "
+        "JSONL file of objects with those keys, streaming it in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, - reads standard input.")
+        parser.add_argument(
+            "--format",
+            choices=sorted(READERS),
+            help="Input format, by default taken from the file extension.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of users checked and inserted per transaction.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of processes hashing passwords.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["format"]
+        if input_format is None:
+            input_format = os.path.splitext(path)[1].lstrip(".").lower()
+            if input_format == "ndjson":
+                input_format = "jsonl"
+        if input_format not in READERS:
+            raise CommandError("Cannot tell the input format, use --format.")
+
+        if path == "-":
+            lines = contextlib.nullcontext(sys.stdin)
+        else:
+            try:
+                lines = open(path, newline="", encoding="utf-8")
+            except OSError as error:
+                raise CommandError(f"Cannot read {path}: {error.strerror}")
+
+        def progress(result):
+            self.stdout.write(
+                f"Processed {result.processed} rows, created {result.created} "
+                f"users ({result.users_per_second:.0f}/s)"
+            )
+
+        workers = max(options["workers"], 1)
+        pool = PasswordPool(workers=workers, max_queue=workers)
+        try:
+            with lines as rows:
+                result = import_users(
+                    READERS[input_format](rows),
+                    pool.make_passwords,
+                    batch_size=options["batch_size"],
+                    progress=progress,
+                )
+        finally:
+            pool.shutdown()
+
+        for error in result.errors:
+            self.stderr.write(f"Line {error['line']}: {error['message']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {result.created} users, skipped {result.duplicates} "
+                f"existing and {result.invalid} invalid rows in "
+                f"{result.elapsed:.1f}s ({result.users_per_second:.0f} users/s)"
+            )
+        )
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user_operations.search_index import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the trigram index used by user search."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of users indexed per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(indexed):
+            self.stdout.write(f"Indexed {indexed} users")
+
+        indexed = rebuild_search_index(
+            chunk_size=options["chunk_size"], progress=progress
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {indexed} users in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchTrigram",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "trigram",
+                    models.CharField(
+                        help_text="Three consecutive characters of the user's lowercased email or name.",
+                        max_length=3,
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        help_text="The user whose email or name contains the trigram.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_trigrams",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Search Trigram",
+                "verbose_name_plural": "Search Trigrams",
+                "unique_together": {("trigram", "user")},
+            },
+        ),
+    ]
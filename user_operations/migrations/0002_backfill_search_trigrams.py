@@ -0,0 +1,48 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def get_trigrams(text):
+    text = (text or "").lower()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def backfill_search_trigrams(apps, schema_editor):
+    """
+    Indexes the users that existed before the search index.
+    """
+    User = apps.get_model("auth", "User")
+    SearchTrigram = apps.get_model("user_operations", "SearchTrigram")
+
+    last_id = 0
+    while True:
+        users = list(
+            User.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "email", "first_name")[:BATCH_SIZE]
+        )
+        if not users:
+            break
+
+        SearchTrigram.objects.bulk_create(
+            [
+                SearchTrigram(trigram=trigram, user_id=user_id)
+                for user_id, email, first_name in users
+                for trigram in get_trigrams(email) | get_trigrams(first_name)
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        last_id = users[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_operations", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_trigrams, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("user_operations", "0002_backfill_search_trigrams"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserProfile",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        help_text="The user this profile belongs to.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="profile",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "email_normalized",
+                    models.CharField(
+                        blank=True,
+                        help_text="The user's lowercased email, null for users without an email.",
+                        max_length=254,
+                        null=True,
+                        unique=True,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "User Profile",
+                "verbose_name_plural": "User Profiles",
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def normalize_email(email):
+    email = (email or "").strip().lower()
+    return email or None
+
+
+def backfill_user_profiles(apps, schema_editor):
+    """
+    Creates the profiles of the users that existed before them.
+
+    Where several users share an email in different cases, the oldest one
+    keeps it and the others get a null email_normalized.
+    """
+    User = apps.get_model("auth", "User")
+    UserProfile = apps.get_model("user_operations", "UserProfile")
+
+    last_id = 0
+    while True:
+        users = list(
+            User.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "email")[:BATCH_SIZE]
+        )
+        if not users:
+            break
+
+        # Conflicting emails are skipped here and given a null one below
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(user_id=user_id, email_normalized=normalize_email(email))
+                for user_id, email in users
+            ],
+            ignore_conflicts=True,
+        )
+        last_id = users[-1][0]
+
+    while True:
+        user_ids = list(
+            User.objects.filter(profile__isnull=True)
+            .order_by("id")
+            .values_list("id", flat=True)[:BATCH_SIZE]
+        )
+        if not user_ids:
+            break
+
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(user_id=user_id, email_normalized=None)
+                for user_id in user_ids
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_operations", "0003_user_profile"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class SearchTrigram(models.Model):
+    trigram = models.CharField(
+        max_length=3,
+        help_text="Three consecutive characters of the user's lowercased email or name.",
+    )
+    user = models.ForeignKey(
+        User,
+        related_name="search_trigrams",
+        on_delete=models.CASCADE,
+        help_text="The user whose email or name contains the trigram.",
+    )
+
+    class Meta:
+        verbose_name = "Search Trigram"
+        verbose_name_plural = "Search Trigrams"
+        unique_together = ("trigram", "user")
+
+    def __str__(self):
+        return f"Search Trigram: {self.trigram} -> {self.user.first_name}"
+
+
+class UserProfile(models.Model):
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name="profile",
+        on_delete=models.CASCADE,
+        help_text="The user this profile belongs to.",
+    )
+    email_normalized = models.CharField(
+        max_length=254,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text="The user's lowercased email, null for users without an email.",
+    )
+
+    class Meta:
+        verbose_name = "User Profile"
+        verbose_name_plural = "User Profiles"
+
+    def __str__(self):
+        return f"User Profile: {self.email_normalized} -> {self.user.first_name}"
+
+
+class RevokedToken(models.Model):
+    token_id = models.CharField(
+        max_length=32,
+        unique=True,
+        help_text="The id of the revoked token.",
+    )
+    expires_at = models.DateTimeField(
+        db_index=True,
+        help_text="The date and time when the token would have expired anyway.",
+    )
+
+    class Meta:
+        verbose_name = "Revoked Token"
+        verbose_name_plural = "Revoked Tokens"
+
+    def __str__(self):
+        return f"Revoked Token: {self.token_id} until {self.expires_at}"
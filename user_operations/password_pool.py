@@ -0,0 +1,200 @@
+import os
+import time
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from utitlities.metrics import get_metrics
+
+
+class PasswordPoolSaturated(Exception):
+    """
+    Raised when a password operation cannot be queued or does not finish in
+    time, the view answers with 503 Service Unavailable.
+    """
+
+
+def _init_worker(settings_module):
+    # Spawned workers start from a fresh interpreter without Django set up
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+
+
+def _check_password(password, encoded):
+    return hashers.check_password(password, encoded)
+
+
+def _make_password(password):
+    return hashers.make_password(password)
+
+
+class PasswordPool:
+    """
+    Bounded process pool running password hashing and verification.
+
+    PBKDF2 holds the GIL for its whole run, so hashing on the request thread
+    stalls every other thread of the worker. Here it runs in `workers`
+    separate processes, while the request thread only waits on the result.
+    At most `workers + max_queue` operations are running or queued at once;
+    further ones are rejected immediately rather than piling up behind a
+    burst of logins.
+    """
+
+    def __init__(self, workers=2, max_queue=16, timeout=10, start_method="spawn"):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", ""),),
+        )
+
+    def run(self, function, *args):
+        """
+        Runs `function(*args)` in a worker and returns its result.
+        """
+        if not self._slots.acquire(blocking=False):
+            get_metrics().increment("password_pool_rejected_total", reason="queue_full")
+            raise PasswordPoolSaturated
+
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is freed once the worker is done, even after a timeout
+        future.add_done_callback(lambda future: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            get_metrics().increment("password_pool_rejected_total", reason="timeout")
+            raise PasswordPoolSaturated
+
+    def map(self, function, items):
+        """
+        Returns `[function(item) for item in items]`, computed in the workers.
+
+        Meant for bulk work such as imports: it waits for a free slot rather
+        than failing, and keeps at most one operation per worker in flight,
+        so requests queued meanwhile only wait behind those.
+        """
+        results = []
+        in_flight = deque()
+        for item in items:
+            if len(in_flight) >= self.workers:
+                results.append(in_flight.popleft().result())
+            self._slots.acquire()
+            try:
+                future = self._executor.submit(function, item)
+            except BaseException:
+                self._slots.release()
+                raise
+            future.add_done_callback(lambda future: self._slots.release())
+            in_flight.append(future)
+        results.extend(future.result() for future in in_flight)
+        return results
+
+    def make_passwords(self, passwords):
+        """
+        Returns the hashes of `passwords` in order, see map().
+        """
+        return self.map(_make_password, passwords)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_password_pool():
+    """
+    Returns the process-wide password pool, or None if it is disabled.
+    """
+    global _pool
+
+    config = settings.PASSWORD_POOL
+    if not config.get("ENABLED"):
+        return None
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PasswordPool(
+                    workers=config.get("WORKERS", 2),
+                    max_queue=config.get("MAX_QUEUE", 16),
+                    timeout=config.get("TIMEOUT", 10),
+                    start_method=config.get("START_METHOD", "spawn"),
+                )
+    return _pool
+
+
+def reset_password_pool():
+    """
+    Shuts down the process-wide pool, a new one is started on next use.
+    """
+    global _pool
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def run_password_operation(operation, function, *args):
+    """
+    Runs a hashing function in the pool, or inline if the pool is disabled,
+    and records its duration as `password_hash_seconds`.
+    """
+    started = time.perf_counter()
+    pool = get_password_pool()
+    if pool is None:
+        result = function(*args)
+    else:
+        try:
+            result = pool.run(function, *args)
+        except BrokenProcessPool:
+            # A worker died, e.g. killed by the OOM killer, start a new pool
+            reset_password_pool()
+            result = get_password_pool().run(function, *args)
+    get_metrics().observe(
+        "password_hash_seconds", time.perf_counter() - started, operation=operation
+    )
+    return result
+
+
+def check_password(password, encoded):
+    """
+    Returns whether `password` matches the `encoded` hash, like
+    django.contrib.auth.hashers.check_password without the setter.
+    """
+    return run_password_operation("check", _check_password, password, encoded)
+
+
+def make_password(password):
+    """
+    Returns the hash of `password` made with the default hasher.
+    """
+    return run_password_operation("make", _make_password, password)
+
+
+def make_passwords(passwords):
+    """
+    Returns the hashes of `passwords` in order, made in the password pool
+    if it is enabled.
+    """
+    pool = get_password_pool()
+    if pool is None:
+        return [_make_password(password) for password in passwords]
+    return pool.make_passwords(passwords)
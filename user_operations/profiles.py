@@ -0,0 +1,65 @@
+import re
+import logging
+
+from django.db import IntegrityError, transaction
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+
+
+def is_valid_email(email):
+    """
+    Returns whether the email is valid for signing up.
+    """
+    return EMAIL_PATTERN.match(email) is not None
+
+
+def normalize_email(email):
+    """
+    Returns the lowercased email users are unique by, or None if it is blank.
+    """
+    email = (email or "").strip().lower()
+    return email or None
+
+
+def sync_profiles(users, batch_size=1000):
+    """
+    Creates or updates the profiles of the given users in bulk.
+
+    Raises IntegrityError if one of the emails belongs to another user.
+    """
+    UserProfile.objects.bulk_create(
+        [
+            UserProfile(user_id=user.id, email_normalized=normalize_email(user.email))
+            for user in users
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=["email_normalized"],
+    )
+
+
+def sync_profile(user):
+    """
+    Creates or updates the profile of one user, see sync_profiles.
+
+    Users whose email_normalized was left null because another user has the
+    same email, see migration 0004, keep it null and a warning is logged, so
+    their saves do not fail. Other conflicts raise IntegrityError.
+    """
+    try:
+        with transaction.atomic():
+            sync_profiles([user])
+    except IntegrityError:
+        if not UserProfile.objects.filter(
+            user_id=user.id, email_normalized__isnull=True
+        ).exists():
+            raise
+        logger.warning(
+            "The email of user %s belongs to another user, its profile keeps a null email",
+            user.id,
+        )
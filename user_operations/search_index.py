@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models import Q, Count
+from django.contrib.auth.models import User
+
+from .models import SearchTrigram
+
+
+def get_trigrams(text):
+    """
+    Returns the set of three character substrings of the lowercased text.
+    """
+    text = (text or "").lower()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def get_user_trigrams(email, first_name):
+    """
+    Returns the trigrams a user is indexed under.
+    """
+    return get_trigrams(email) | get_trigrams(first_name)
+
+
+def index_users(users, batch_size=1000):
+    """
+    Replaces the posting rows of the given users.
+    """
+    users = list(users)
+    rows = [
+        SearchTrigram(trigram=trigram, user_id=user.id)
+        for user in users
+        for trigram in get_user_trigrams(user.email, user.first_name)
+    ]
+
+    with transaction.atomic():
+        SearchTrigram.objects.filter(user_id__in=[user.id for user in users]).delete()
+        SearchTrigram.objects.bulk_create(
+            rows, batch_size=batch_size, ignore_conflicts=True
+        )
+
+
+def rebuild_search_index(chunk_size=1000, progress=None):
+    """
+    Rebuilds the whole posting table, walking users in id order.
+
+    Each chunk of users is replaced in its own transaction, so the index
+    keeps answering searches while it is rebuilt. Rows of users that no
+    longer exist are removed at the end. Returns the number of users indexed.
+    """
+    indexed = 0
+    last_id = 0
+    while True:
+        users = list(
+            User.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .only("id", "email", "first_name")[:chunk_size]
+        )
+        if not users:
+            break
+
+        index_users(users)
+        indexed += len(users)
+        last_id = users[-1].id
+        if progress is not None:
+            progress(indexed)
+
+    SearchTrigram.objects.exclude(user_id__in=User.objects.values("id")).delete()
+    return indexed
+
+
+def search_users(query):
+    """
+    Returns a queryset of the users whose email or first name contains the query.
+
+    Matches the same users as `email__icontains` OR `first_name__icontains`.
+    For queries of three or more characters the posting lists of all of the
+    query's trigrams are intersected first, so the containment check only
+    runs on candidate rows instead of the whole user table.
+    """
+    contains_query = Q(email__icontains=query) | Q(first_name__icontains=query)
+
+    trigrams = get_trigrams(query)
+    if not trigrams:
+        return User.objects.filter(contains_query)
+
+    candidate_ids = (
+        SearchTrigram.objects.filter(trigram__in=trigrams)
+        .values("user_id")
+        .annotate(matches=Count("trigram"))
+        .filter(matches=len(trigrams))
+        .values("user_id")
+    )
+    return User.objects.filter(id__in=candidate_ids).filter(contains_query)
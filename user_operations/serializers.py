@@ -12,3 +12,27 @@ class UserSerializer(serializers.ModelSerializer):
         representation = super().to_representation(instance)
         representation["name"] = representation.pop("first_name")
         return representation
+
+
+# Fields to select with `values()` for `serialize_user_values`
+USER_VALUE_FIELDS = ["id", "email", "first_name"]
+
+
+def serialize_user_values(row, prefix=""):
+    """
+    Builds the UserSerializer representation of a `values()` row.
+
+    `prefix` selects the fields of a related user, e.g. "from_user__".
+    """
+    return {
+        "id": row[f"{prefix}id"],
+        "email": row[f"{prefix}email"],
+        "name": row[f"{prefix}first_name"],
+    }
+
+
+def serialize_users(rows):
+    """
+    Serializes `values(*USER_VALUE_FIELDS)` rows like UserSerializer(many=True).
+    """
+    return [serialize_user_values(row) for row in rows]
@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete
+from django.contrib.auth.models import User
+
+from social_interactions.models import Block
+
+from .search_index import index_users
+from .profiles import sync_profile
+from .autocomplete import forget_user, record_block, record_user
+from .authentication import get_user_cache
+
+SEARCH_INDEX_FIELDS = {"email", "first_name"}
+PROFILE_FIELDS = {"email"}
+
+
+@receiver(post_save, sender=User)
+def update_search_index(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Keeps the search trigrams of a user current on signup and profile changes.
+    """
+    if raw:
+        return
+
+    # Saves such as the last_login update on login do not touch the index
+    if update_fields is not None and not SEARCH_INDEX_FIELDS & set(update_fields):
+        return
+
+    index_users([instance])
+
+
+@receiver(post_save, sender=User)
+def update_profile(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Keeps the normalized email of a user current on signup and email changes.
+
+    Raises IntegrityError if another user has the same email, so the save
+    fails as a whole when run in a transaction, except for users whose
+    profile was already left without an email for this reason.
+    """
+    if raw:
+        return
+
+    if update_fields is not None and not PROFILE_FIELDS & set(update_fields):
+        return
+
+    sync_profile(instance)
+
+
+@receiver(post_save, sender=User)
+def update_autocomplete_index(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    """
+    Adds users to the in-memory autocomplete index on signup and profile changes.
+    """
+    if raw:
+        return
+
+    if update_fields is not None and not SEARCH_INDEX_FIELDS & set(update_fields):
+        return
+
+    transaction.on_commit(lambda: record_user(instance))
+
+
+@receiver(post_save, sender=Block)
+def update_autocomplete_blocks(sender, instance, created, raw=False, **kwargs):
+    """
+    Records new blocks in the in-memory autocomplete index.
+    """
+    if created and not raw:
+        blocker_id, blocked_id = instance.blocker_id, instance.blocked_id
+        transaction.on_commit(lambda: record_block(blocker_id, blocked_id))
+
+
+@receiver(post_delete, sender=User)
+def remove_from_autocomplete_index(sender, instance, **kwargs):
+    """
+    Drops deleted users from the in-memory autocomplete index.
+    """
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_user(user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    """
+    Drops a changed or deleted user from this process's token user cache.
+    """
+    get_user_cache().evict(instance.pk)
@@ -1,6 +1,41 @@
+import json
+import threading
+import tempfile
+from io import StringIO
+from pathlib import Path
+from datetime import timedelta
+from unittest import mock
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
 from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import override_settings
+from django.core.management import call_command
+
+from asgiref.sync import async_to_sync
 
 from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.renderers import JSONRenderer
+
+from social_interactions.models import Block
+
+from .models import RevokedToken, SearchTrigram, UserProfile
+from .serializers import UserSerializer
+from .bulk_import import import_users
+from .views import AsyncSearchUserAPIView
+from . import autocomplete
+from .autocomplete import (
+    PrefixIndex,
+    get_autocomplete_index,
+    record_user,
+    reset_autocomplete_index,
+)
+from .password_pool import get_password_pool, reset_password_pool
+from .authentication import reset_user_cache, revoke_token
 
 
 class SignupAPIViewTests(APITestCase):
@@ -84,6 +119,66 @@ class SignupAPIViewTests(APITestCase):
             "Email already registered with another user!",
         )
 
+    def test_signup_creates_profile(self):
+        """
+        Test that signup stores the lowercased email in the user's profile,
+        which rejects the same email in another case.
+        """
+        data = {"name": "Test", "email": "Mixed@Example.com", "password": "pass1234"}
+        response = self.client.post(self.URL, data, format="json")
+        self.assertEqual(response.status_code, 201)  # type: ignore
+        user = User.objects.get(username="mixed@example.com")
+        self.assertEqual(user.profile.email_normalized, "mixed@example.com")
+
+        # A user with the same email under another username, as a concurrent
+        # signup that passed the exists check would be
+        User.objects.filter(id=user.id).update(username="renamed@example.com")
+        with mock.patch("django.db.models.query.QuerySet.exists", return_value=False):
+            data["email"] = "MIXED@example.com"
+            response = self.client.post(self.URL, data, format="json")
+        self.assertEqual(response.status_code, 400)  # type: ignore
+        self.assertEqual(
+            response.data["response"]["message"],  # type: ignore
+            "Email already registered with another user!",
+        )
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_email_change_updates_profile(self):
+        """
+        Test that saving a new email updates the normalized email.
+        """
+        user = User.objects.create_user(username="a@example.com", email="a@example.com")
+        user.email = "B@Example.com"
+        user.save(update_fields=["email"])
+        self.assertEqual(
+            UserProfile.objects.get(user=user).email_normalized, "b@example.com"
+        )
+
+    def test_save_keeps_null_email_of_conflicting_user(self):
+        """
+        Test that a user left without a normalized email, as the profile
+        backfill does for emails shared in another case, can still be saved.
+        """
+        User.objects.create_user(username="a@example.com", email="a@example.com")
+        user = User.objects.create_user(username="A@example.com", email="b@example.com")
+        User.objects.filter(id=user.id).update(email="A@example.com")
+        UserProfile.objects.filter(user=user).update(email_normalized=None)
+
+        user.refresh_from_db()
+        user.first_name = "Renamed"
+        with self.assertLogs("user_operations.profiles", "WARNING"):
+            user.save()
+        self.assertIsNone(UserProfile.objects.get(user=user).email_normalized)
+
+        # Users with an email of their own still cannot take another's
+        other = User.objects.create_user(
+            username="c@example.com", email="c@example.com"
+        )
+        other.email = "A@Example.com"
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                other.save()
+
 
 class LoginAPITestCase(APITestCase):
     URL = "/user/api/v1/login/"
@@ -156,6 +251,380 @@ class LoginAPITestCase(APITestCase):
         self.assertEqual(response.status_code, 200)
 
 
+class PasswordPoolTest(APITestCase):
+    LOGIN_URL = "/user/api/v1/login/"
+    SIGNUP_URL = "/user/api/v1/signup/"
+
+    def setUp(self):
+        reset_password_pool()
+        self.addCleanup(reset_password_pool)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(
+            first_name="Test User",
+            username="test@example.com",
+            email="test@example.com",
+            password="password123",
+        )
+
+    def test_signup_hashes_password_in_pool(self):
+        """
+        Test that a user signed up through the pool can log in.
+        """
+        data = {"name": "New", "email": "New@Example.com", "password": "secret123"}
+        response = self.client.post(self.SIGNUP_URL, data, format="json")
+        self.assertEqual(response.status_code, 201)  # type: ignore
+        user = User.objects.get(username="new@example.com")
+        self.assertTrue(user.check_password("secret123"))
+
+        data = {"email": "new@example.com", "password": "secret123"}
+        response = self.client.post(self.LOGIN_URL, data, format="json")
+        self.assertEqual(response.status_code, 200)  # type: ignore
+
+    @override_settings(
+        PASSWORD_POOL={"ENABLED": True, "WORKERS": 1, "MAX_QUEUE": 0, "TIMEOUT": 10}
+    )
+    def test_saturated_pool_returns_503(self):
+        """
+        Test that logins and signups are rejected while every slot is taken.
+        """
+        slots = get_password_pool()._slots  # type: ignore
+        slots.acquire()
+        self.addCleanup(slots.release)
+
+        data = {"email": "test@example.com", "password": "password123"}
+        response = self.client.post(self.LOGIN_URL, data, format="json")
+        self.assertEqual(response.status_code, 503)  # type: ignore
+        self.assertEqual(response["Retry-After"], "1")
+
+        data = {"name": "New", "email": "new@example.com", "password": "secret123"}
+        response = self.client.post(self.SIGNUP_URL, data, format="json")
+        self.assertEqual(response.status_code, 503)  # type: ignore
+        self.assertFalse(User.objects.filter(username="new@example.com").exists())
+
+    @override_settings(
+        LOGIN_FAILURE_CACHE={
+            "ENABLED": True,
+            "CACHE": "default",
+            "MAX_FAILURES": 3,
+            "TTL": 300,
+        }
+    )
+    def test_failures_stop_hashing(self):
+        """
+        Test that after too many failed logins from an IP, any password for
+        the email is rejected without hashing, while other IPs still log in.
+        """
+        with mock.patch(
+            "user_operations.backends.check_password", return_value=False
+        ) as check_password:
+            for i in range(5):
+                data = {"email": "test@example.com", "password": f"wrong{i}"}
+                response = self.client.post(self.LOGIN_URL, data, format="json")
+                self.assertEqual(response.status_code, 401)  # type: ignore
+            self.assertEqual(check_password.call_count, 3)
+
+        data = {"email": "test@example.com", "password": "password123"}
+        response = self.client.post(self.LOGIN_URL, data, format="json")
+        self.assertEqual(response.status_code, 401)  # type: ignore
+
+        response = self.client.post(
+            self.LOGIN_URL, data, format="json", REMOTE_ADDR="10.0.0.2"
+        )
+        self.assertEqual(response.status_code, 200)  # type: ignore
+
+    def test_success_resets_failures(self):
+        """
+        Test that a successful login resets the failure count.
+        """
+        for password in ("wrong1", "wrong2", "wrong3", "wrong4", "password123"):
+            data = {"email": "test@example.com", "password": password}
+            response = self.client.post(self.LOGIN_URL, data, format="json")
+        self.assertEqual(response.status_code, 200)  # type: ignore
+
+        for password in ("wrong1", "wrong2", "wrong3", "wrong4", "password123"):
+            data = {"email": "test@example.com", "password": password}
+            response = self.client.post(self.LOGIN_URL, data, format="json")
+        self.assertEqual(response.status_code, 200)  # type: ignore
+
+    @override_settings(PASSWORD_POOL={"ENABLED": False})
+    def test_login_upgrades_hasher(self):
+        """
+        Test that a password hashed with another hasher is rehashed with the
+        preferred one on login.
+        """
+        self.user.password = make_password("password123", hasher="pbkdf2_sha1")
+        self.user.save(update_fields=["password"])
+
+        data = {"email": "test@example.com", "password": "password123"}
+        response = self.client.post(self.LOGIN_URL, data, format="json")
+        self.assertEqual(response.status_code, 200)  # type: ignore
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+    def test_password_change_clears_failures(self):
+        """
+        Test that a cached failure no longer applies after a password change.
+        """
+        data = {"email": "test@example.com", "password": "newpassword"}
+        response = self.client.post(self.LOGIN_URL, data, format="json")
+        self.assertEqual(response.status_code, 401)  # type: ignore
+
+        self.user.set_password("newpassword")
+        self.user.save()
+        response = self.client.post(self.LOGIN_URL, data, format="json")
+        self.assertEqual(response.status_code, 200)  # type: ignore
+
+
+class TokenAuthenticationTest(APITestCase):
+    LOGIN_URL = "/user/api/v1/login/"
+    LOGOUT_URL = "/user/api/v1/logout/"
+    URL = "/user/api/v1/autocomplete/?prefix=other"
+
+    def setUp(self):
+        reset_user_cache()
+        self.addCleanup(reset_user_cache)
+        reset_autocomplete_index()
+        self.addCleanup(reset_autocomplete_index)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(
+            first_name="Test User",
+            username="test@example.com",
+            email="test@example.com",
+            password="password123",
+        )
+        User.objects.create_user(
+            first_name="Other", username="other@example.com", email="other@example.com"
+        )
+
+    def get_token(self):
+        data = {"email": "test@example.com", "password": "password123"}
+        response = self.client.post(self.LOGIN_URL, data, format="json")
+        self.assertEqual(response.status_code, 200)  # type: ignore
+        # Only the token authenticates the following requests
+        self.client.logout()
+        return response.data["response"]["token"]  # type: ignore
+
+    def test_token_authenticates_without_queries(self):
+        """
+        Test that once the user and the revocation check are cached, token
+        requests run no query.
+        """
+        token = self.get_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)  # type: ignore
+
+        # The user has no blocks either
+        with self.assertNumQueries(0):
+            response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)  # type: ignore
+        self.assertEqual(len(response.data["results"]), 1)  # type: ignore
+
+    def test_logout_revokes_token(self):
+        """
+        Test that a token is rejected after logging out with it.
+        """
+        token = self.get_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.post(self.LOGOUT_URL)
+        self.assertEqual(response.status_code, 200)  # type: ignore
+
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 403)  # type: ignore
+        self.assertEqual(
+            response.data["detail"], "Token has been revoked."  # type: ignore
+        )
+
+    def test_revocation_survives_cache_reset(self):
+        """
+        Test that a revoked token stays revoked when the caches are emptied or
+        replaced, and that expired revocations are purged.
+        """
+        token = self.get_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.client.post(self.LOGOUT_URL)
+
+        cache.clear()
+        other_cache = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "other-worker",
+            }
+        }
+        with override_settings(CACHES=other_cache):
+            response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 403)  # type: ignore
+
+        RevokedToken.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.client.credentials()
+        revoke_token(self.get_token())
+        self.assertEqual(RevokedToken.objects.count(), 1)
+
+    def test_expired_and_invalid_tokens_are_rejected(self):
+        """
+        Test that expired, tampered and outdated tokens are rejected.
+        """
+        token = self.get_token()
+        with override_settings(TOKEN_AUTHENTICATION={"TTL": -1}):
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 403)  # type: ignore
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}x")
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 403)  # type: ignore
+
+        # Changing the password invalidates issued tokens, as for sessions
+        self.user.set_password("newpassword")
+        self.user.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 403)  # type: ignore
+
+
+class ImportUsersTest(APITestCase):
+    URL = "/user/api/v1/import/"
+
+    def setUp(self):
+        reset_password_pool()
+        self.addCleanup(reset_password_pool)
+        User.objects.create_user(
+            first_name="Existing",
+            username="existing@example.com",
+            email="existing@example.com",
+        )
+
+    def test_command_imports_csv(self):
+        """
+        Test that the command creates valid rows and skips the others.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "users.csv"
+        path.write_text(
+            "name,email,password\n"
+            "Alice,Alice@Example.com,secret123\n"
+            "Bob,bob@example.com,\n"
+            "Invalid,not-an-email,secret123\n"
+            "Existing,EXISTING@example.com,secret123\n"
+            "Alice Again,alice@example.com,secret123\n"
+        )
+        stdout = StringIO()
+        call_command(
+            "import_users",
+            str(path),
+            "--batch-size=2",
+            "--workers=1",
+            stdout=stdout,
+            stderr=StringIO(),
+        )
+        self.assertIn(
+            "Created 2 users, skipped 2 existing and 1 invalid", stdout.getvalue()
+        )
+
+        alice = User.objects.get(username="alice@example.com")
+        self.assertTrue(alice.check_password("secret123"))
+        self.assertEqual(alice.profile.email_normalized, "alice@example.com")
+        self.assertTrue(SearchTrigram.objects.filter(user=alice).exists())
+        bob = User.objects.get(username="bob@example.com")
+        self.assertFalse(bob.has_usable_password())
+
+    def test_endpoint_imports_jsonl_for_admins(self):
+        """
+        Test that admins can import JSONL and that other users cannot.
+        """
+        admin = User.objects.create_user(
+            username="admin@example.com", email="admin@example.com", is_staff=True
+        )
+        body = "\n".join(
+            [
+                json.dumps({"name": "Carol", "email": "carol@example.com"}),
+                "not json",
+                json.dumps({"name": "Dave", "email": "dave@example.com"}),
+            ]
+        )
+        user = User.objects.get(username="existing@example.com")
+        self.client.force_authenticate(user=user)
+        response = self.client.post(self.URL, body, content_type="application/jsonl")
+        self.assertEqual(response.status_code, 403)  # type: ignore
+
+        self.client.force_authenticate(user=admin)
+        response = self.client.post(self.URL, body, content_type="application/json")
+        self.assertEqual(response.status_code, 415)  # type: ignore
+
+        response = self.client.post(self.URL, body, content_type="application/jsonl")
+        self.assertEqual(response.status_code, 200)  # type: ignore
+        result = response.data["response"]  # type: ignore
+        self.assertEqual(result["created"], 2)
+        self.assertEqual(result["invalid"], 1)
+        self.assertEqual(result["errors"], [{"line": 2, "message": "Invalid row!"}])
+        self.assertTrue(User.objects.filter(username="dave@example.com").exists())
+
+        with override_settings(USER_IMPORT={"MAX_UPLOAD_SIZE": 10}):
+            response = self.client.post(
+                self.URL, body, content_type="application/jsonl"
+            )
+        self.assertEqual(response.status_code, 413)  # type: ignore
+
+        with override_settings(USER_IMPORT={"MAX_ROWS": 2}):
+            response = self.client.post(
+                self.URL, body, content_type="application/jsonl"
+            )
+        self.assertEqual(response.status_code, 413)  # type: ignore
+
+    def test_endpoint_requires_content_length(self):
+        """
+        Test that bodies without a length, such as chunked ones, are refused.
+        """
+        admin = User.objects.create_user(
+            username="admin@example.com", email="admin@example.com", is_staff=True
+        )
+        self.client.force_authenticate(user=admin)
+        body = json.dumps({"name": "Carol", "email": "carol@example.com"})
+        response = self.client.generic(
+            "POST",
+            self.URL,
+            body,
+            content_type="application/jsonl",
+            CONTENT_LENGTH="",
+        )
+        self.assertEqual(response.status_code, 411)  # type: ignore
+        self.assertFalse(User.objects.filter(username="carol@example.com").exists())
+
+    def test_conflicts_are_reported_per_row(self):
+        """
+        Test that emails taken after the check are rejected row by row,
+        without hashing the passwords again.
+        """
+        hashed = []
+
+        def hash_passwords(passwords):
+            hashed.extend(passwords)
+            return [make_password(password) for password in passwords]
+
+        rows = [
+            (2, {"name": "Erin", "email": "erin@example.com", "password": "secret"}),
+            (3, {"name": "Taken", "email": "existing@example.com"}),
+        ]
+        # As if the existing user signed up after both checks
+        with mock.patch(
+            "user_operations.bulk_import.get_existing_emails", return_value=set()
+        ):
+            result = import_users(rows, hash_passwords)
+
+        self.assertEqual(hashed, ["secret"])
+        self.assertEqual(result.created, 1)
+        self.assertEqual(
+            result.errors,
+            [{"line": 3, "message": "Email already registered with another user!"}],
+        )
+        self.assertTrue(
+            User.objects.get(username="erin@example.com").check_password("secret")
+        )
+
+
 class SearchUserAPIViewTest(APITestCase):
     URL = "/user/api/v1/search/"
 
@@ -175,6 +644,16 @@ class SearchUserAPIViewTest(APITestCase):
         response = self.client.get(self.URL, {"q": query})
         self.assertEqual(response.status_code, 200)
 
+    def test_search_user_exact_match_is_normalized(self):
+        # Test the exact email match ignores case and surrounding spaces
+        other = User.objects.create_user(
+            username="other@example.com", email="other@example.com"
+        )
+        response = self.client.get(self.URL, {"q": " Other@Example.COM "})
+        self.assertEqual(
+            [user["id"] for user in response.data["results"]], [other.id]  # type: ignore
+        )
+
     def test_search_user_with_query_partial_match(self):
         # Test searching for a user with a partial email match
         query = "test"
@@ -186,6 +665,40 @@ class SearchUserAPIViewTest(APITestCase):
         response = self.client.get(self.URL)
         self.assertEqual(response.status_code, 400)
 
+    def test_search_user_matches_serializer_output(self):
+        # Test the rendered results match UserSerializer byte for byte
+        for i in range(3):
+            User.objects.create_user(
+                first_name=f"Test {i}",
+                username=f"test{i}",
+                email=f"test{i}@example.com",
+                password="password",
+            )
+        response = self.client.get(self.URL, {"q": "test"})
+        expected = UserSerializer(
+            User.objects.exclude(id=self.user.id).order_by("email"), many=True
+        ).data
+        self.assertEqual(
+            JSONRenderer().render(response.data["results"]),  # type: ignore
+            JSONRenderer().render(expected),
+        )
+
+    def test_async_search_matches_sync_search(self):
+        # Test the async view returns the same bodies as the sync view
+        for i in range(12):
+            User.objects.create_user(
+                username=f"test{i}",
+                email=f"test{i:02}@example.com",
+                password="password",
+            )
+        for params in ({"q": "test"}, {"q": "test", "pagination": "cursor"}, {}):
+            request = APIRequestFactory().get(self.URL, params)
+            force_authenticate(request, user=self.user)
+            response = async_to_sync(AsyncSearchUserAPIView.as_view())(request)
+            expected = self.client.get(self.URL, params)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(response.content, expected.content)
+
     def test_search_user_nonexistent_query(self):
         # Test searching for a user with a query that does not match any user
         query = "nonexistent@example.com"
@@ -219,3 +732,232 @@ class SearchUserAPIViewTest(APITestCase):
 
         # Check if the number of users in the response matches the expected count
         self.assertEqual(response.data["count"], expected_users_count)  # type: ignore
+
+    def test_search_user_matches_icontains(self):
+        # Verify that indexed search returns the same users as a containment scan
+        for i, name in enumerate(["Alice", "Malice Doe", "Bob", "al"]):
+            User.objects.create_user(
+                first_name=name,
+                username=f"member{i}",
+                email=f"member{i}@Example.com",
+                password="password",
+            )
+
+        for query in ["ali", "ALIC", "e d", "al", "mple.c", "xyz"]:
+            response = self.client.get(self.URL, {"q": query})
+            self.assertEqual(response.status_code, 200)
+
+            expected_ids = list(
+                User.objects.filter(
+                    Q(email__icontains=query) | Q(first_name__icontains=query)
+                )
+                .exclude(id=self.user.id)  # type: ignore
+                .order_by("email")
+                .values_list("id", flat=True)[:10]
+            )
+            self.assertEqual(
+                [user["id"] for user in response.data["results"]],  # type: ignore
+                expected_ids,
+            )
+
+    def test_rebuild_search_index(self):
+        # Verify that the rebuild command restores a cleared index
+        User.objects.create_user(
+            first_name="Other User",
+            username="other",
+            email="other@example.com",
+            password="password",
+        )
+        SearchTrigram.objects.all().delete()
+        response = self.client.get(self.URL, {"q": "other"})
+        self.assertEqual(response.data["count"], 0)  # type: ignore
+
+        # Rows of a user deleted without the cascade
+        SearchTrigram.objects.create(trigram="oth", user_id=999999)
+
+        call_command("rebuild_search_index", stdout=StringIO())
+        response = self.client.get(self.URL, {"q": "other"})
+        self.assertEqual(response.data["count"], 1)  # type: ignore
+        self.assertFalse(SearchTrigram.objects.filter(user_id=999999).exists())
+
+
+class AutocompleteUserAPIViewTest(APITestCase):
+    URL = "/user/api/v1/autocomplete/"
+
+    def setUp(self):
+        # Create users for testing and start from an empty in-memory index
+        reset_autocomplete_index()
+        self.addCleanup(reset_autocomplete_index)
+
+        self.user = User.objects.create_user(
+            first_name="Alex",
+            username="alex@example.com",
+            email="alex@example.com",
+            password="password",
+        )
+        for name, email in [("Alice", "zed@example.com"), ("Bob", "alba@example.com")]:
+            User.objects.create_user(
+                first_name=name, username=email, email=email, password="password"
+            )
+        self.client.force_authenticate(user=self.user)  # type: ignore
+
+    def test_autocomplete_prefix(self):
+        # Test matching emails and names by prefix, excluding the current user
+        get_autocomplete_index()
+
+        # Users without blocks are answered from memory
+        with self.assertNumQueries(0):
+            response = self.client.get(self.URL, {"prefix": "AL"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [user["email"] for user in response.data["results"]],  # type: ignore
+            ["alba@example.com", "zed@example.com"],
+        )
+        self.assertEqual(response.data["results"][1]["name"], "Alice")  # type: ignore
+
+        response = self.client.get(self.URL, {"prefix": "al", "limit": 1})
+        self.assertEqual(len(response.data["results"]), 1)  # type: ignore
+
+    def test_autocomplete_excludes_blocked_users(self):
+        # Test that users blocked after the index is loaded are not matched
+        get_autocomplete_index()
+        bob = User.objects.get(username="alba@example.com")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Block.objects.create(blocker=bob, blocked=self.user)
+
+        # One query for the user's blocks
+        with self.assertNumQueries(1):
+            response = self.client.get(self.URL, {"prefix": "al"})
+        self.assertEqual(
+            [user["email"] for user in response.data["results"]],  # type: ignore
+            ["zed@example.com"],
+        )
+
+    def test_autocomplete_without_prefix(self):
+        # Test autocompleting without a prefix
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 400)
+
+    def test_autocomplete_includes_new_signup(self):
+        # Test that users who sign up after the index is loaded are matched
+        get_autocomplete_index()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/user/api/v1/signup/",
+                {"name": "Alma", "email": "Alma@Example.com", "password": "password"},
+                format="json",
+            )
+
+        response = self.client.get(self.URL, {"prefix": "alm"})
+        self.assertEqual(
+            [user["email"] for user in response.data["results"]],  # type: ignore
+            ["alma@example.com"],
+        )
+
+    def test_autocomplete_follows_changes_and_deletes(self):
+        # Test that renamed users are matched by their new name only and
+        # deleted users are no longer matched
+        get_autocomplete_index()
+        alice = User.objects.get(username="zed@example.com")
+        bob = User.objects.get(username="alba@example.com")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            alice.first_name = "Carla"
+            alice.save(update_fields=["first_name"])
+            bob.delete()
+
+        response = self.client.get(self.URL, {"prefix": "al"})
+        self.assertEqual(response.data["results"], [])  # type: ignore
+        response = self.client.get(self.URL, {"prefix": "car"})
+        self.assertEqual(
+            [user["name"] for user in response.data["results"]],  # type: ignore
+            ["Carla"],
+        )
+
+    def test_stale_index_reloads_in_background(self):
+        # Test that a stale index keeps serving while it is reloaded in another
+        # thread, and that users recorded meanwhile reach the new index
+        stale = get_autocomplete_index()
+        stale.built_at -= 3600
+        rebuilt = PrefixIndex()
+        threads = []
+
+        def build():
+            threads.append(threading.current_thread())
+            # A signup committed by another request meanwhile
+            record_user(User(id=999, first_name="Alma", email="alma@example.com"))
+            return rebuilt
+
+        with mock.patch("user_operations.autocomplete.PrefixIndex.build", build):
+            self.assertIs(get_autocomplete_index(), stale)
+            # Held until the reload is swapped in
+            with autocomplete._build_lock:
+                pass
+
+        self.assertIsNot(threads[0], threading.current_thread())
+        self.assertIs(get_autocomplete_index(), rebuilt)
+        self.assertEqual(
+            [user["email"] for user in rebuilt.search("alm", 10)], ["alma@example.com"]
+        )
+
+    def test_added_keys_are_merged(self):
+        # Test that the side list of added keys is merged once full, in key
+        # order and without the keys no longer current
+        index = PrefixIndex([("bob", 1)], {1: ("", "Bob")})
+        index.MAX_ADDED = 3
+        index.add_user(2, "", "Anna")
+        index.add_user(1, "", "Zoe")
+        self.assertEqual(index._added_keys, ["anna", "zoe"])
+        self.assertEqual([user["id"] for user in index.search("", 10)], [2, 1])
+
+        index.add_user(3, "carl@example.com", "Carl")
+        self.assertEqual(index._added_keys, [])
+        self.assertEqual(index.keys, ["anna", "carl", "carl@example.com", "zoe"])
+        self.assertEqual(list(index.user_ids), [2, 3, 3, 1])
+
+
+class TrafficRecorderMiddlewareTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="test@example.com",
+            email="test@example.com",
+            password="password123",
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "trace.jsonl"
+
+    def test_requests_are_recorded_without_passwords(self):
+        # Test each request is appended to the trace with the password redacted
+        with override_settings(TRAFFIC_RECORDER={"ENABLED": True, "PATH": self.path}):
+            self.client.post(
+                "/user/api/v1/login/",
+                {"email": "test@example.com", "password": "password123"},
+                format="json",
+            )
+            self.client.get("/user/api/v1/search/", {"q": "test"})
+
+        login, search = [
+            json.loads(line) for line in self.path.read_text().splitlines()
+        ]
+        self.assertEqual(login["method"], "POST")
+        self.assertEqual(login["data"], {"email": "test@example.com", "password": None})
+        self.assertEqual(login["status"], 200)
+        self.assertEqual(search["path"], "/user/api/v1/search/?q=test")
+        self.assertEqual(search["user"], "test@example.com")
+        self.assertIsNone(search["data"])
+
+    def test_disabled_by_default(self):
+        # Test nothing is recorded and no header is added unless enabled
+        response = self.client.get("/user/api/v1/search/", {"q": "test"})
+        self.assertNotIn("X-Query-Count", response)
+
+    @override_settings(QUERY_COUNT_HEADER=True)
+    def test_query_count_header(self):
+        # Test the number of queries is returned as a header
+        self.client.force_authenticate(user=self.user)  # type: ignore
+        with self.assertNumQueries(2):
+            response = self.client.get("/user/api/v1/search/", {"q": "nobody"})
+        self.assertEqual(response["X-Query-Count"], "2")
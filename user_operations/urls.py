@@ -1,10 +1,31 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import SignupAPIView, LoginAPIView, LogoutAPIView, SearchUserAPIView
+from .views import (
+    SignupAPIView,
+    LoginAPIView,
+    LogoutAPIView,
+    SearchUserAPIView,
+    AsyncSearchUserAPIView,
+    AutocompleteUserAPIView,
+    ImportUsersAPIView,
+)
+
+# Read endpoints with an async version, see ASYNC_VIEWS
+if settings.ASYNC_VIEWS:
+    search_user_view = AsyncSearchUserAPIView.as_view()
+else:
+    search_user_view = SearchUserAPIView.as_view()
 
 urlpatterns = [
     path("api/v1/signup/", SignupAPIView.as_view(), name="signup"),
     path("api/v1/login/", LoginAPIView.as_view(), name="login"),
     path("api/v1/logout/", LogoutAPIView.as_view(), name="logout"),
-    path("api/v1/search/", SearchUserAPIView.as_view(), name="user_search"),
+    path("api/v1/search/", search_user_view, name="user_search"),
+    path(
+        "api/v1/autocomplete/",
+        AutocompleteUserAPIView.as_view(),
+        name="user_autocomplete",
+    ),
+    path("api/v1/import/", ImportUsersAPIView.as_view(), name="user_import"),
 ]
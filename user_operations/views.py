@@ -1,6 +1,10 @@
-import re
+import codecs
+from itertools import islice
 
-from django.db.models import Q
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 
@@ -9,12 +13,59 @@ from django.views.decorators.csrf import csrf_exempt
 
 from rest_framework import status
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.pagination import PageNumberPagination
 
 from utitlities.utils import get_api_response
+from utitlities.async_views import AsyncAPIView
+from utitlities.pagination import PaginationModeMixin, EmailCursorPagination
+from social_interactions.blocks import exclude_blocked, get_blocked_ids
+from social_interactions.block_filter import get_block_filter
+
+from .models import UserProfile
+from .profiles import is_valid_email, normalize_email
+from .serializers import USER_VALUE_FIELDS, serialize_users
+from .bulk_import import READERS, import_users
+from .password_pool import PasswordPoolSaturated, make_password, make_passwords
+from .authentication import SignedTokenAuthentication, issue_token, revoke_token
+from .search_index import search_users
+from .autocomplete import get_autocomplete_index
+
+
+def get_busy_response():
+    """
+    Returns the 503 response sent when the password pool is saturated.
+    """
+    response = get_api_response(
+        False,
+        {"message": "Server is busy, please try again later!"},
+        status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response["Retry-After"] = "1"
+    return response
+
+
+def get_email_taken_response():
+    """
+    Returns the 400 response sent when the email is used by another user.
+    """
+    return get_api_response(
+        False,
+        {"message": "Email already registered with another user!"},
+        status.HTTP_400_BAD_REQUEST,
+    )
+
 
-from .serializers import UserSerializer
+def get_exact_email_matches(search_query):
+    """
+    Returns a queryset of the users whose email is the search query, compared
+    like emails are at signup.
+    """
+    email = normalize_email(search_query)
+    if email is None:
+        return User.objects.none()
+    return User.objects.filter(profile__email_normalized=email).order_by("email")
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -27,8 +78,7 @@ class SignupAPIView(APIView):
         """
         A function that checks if the provided email is valid or not.
         """
-        pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-        return re.match(pattern, email) is not None
+        return is_valid_email(email)
 
     def post(self, request):
         """
@@ -72,18 +122,31 @@ class SignupAPIView(APIView):
         # Convert email to lowercase to match case-insensitive comparison
         email = email.lower()
 
-        # Check if email is already registered with another user
-        if User.objects.filter(email__iexact=email).exists():
-            return get_api_response(
-                False,
-                {"message": "Email already registered with another user!"},
-                status.HTTP_400_BAD_REQUEST,
-            )
-
-        # Create new user
-        user_obj = User.objects.create_user(
-            first_name=name, username=email, email=email, password=password
+        # Check if email is already registered with another user, a probe
+        # of the unique index on the normalized email
+        if UserProfile.objects.filter(email_normalized=normalize_email(email)).exists():
+            return get_email_taken_response()
+
+        # Hash the password in the password pool rather than on this thread
+        try:
+            encoded_password = make_password(password)
+        except PasswordPoolSaturated:
+            return get_busy_response()
+
+        # Create new user, the post_save signals add its profile and add it
+        # to the search index. The unique indexes reject a concurrent signup
+        # with the same email that passed the check above.
+        user_obj = User(
+            first_name=name,
+            username=User.normalize_username(email),
+            email=User.objects.normalize_email(email),
+            password=encoded_password,
         )
+        try:
+            with transaction.atomic():
+                user_obj.save()
+        except IntegrityError:
+            return get_email_taken_response()
 
         return get_api_response(
             True, {"message": "Signup successfully Completed!"}, status.HTTP_201_CREATED
@@ -100,8 +163,7 @@ class LoginAPIView(APIView):
         """
         A function that checks if the provided email is valid or not.
         """
-        pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-        return re.match(pattern, email) is not None
+        return is_valid_email(email)
 
     def post(self, request):
         """
@@ -139,14 +201,25 @@ class LoginAPIView(APIView):
         # Convert username to lowercase to ensure case-insensitive comparison
         email = email.lower()
 
-        # Authenticate the user using Django's authenticate function
-        user = authenticate(username=email, password=password)
+        # Authenticate the user using Django's authenticate function, the
+        # PooledModelBackend verifies the password in the password pool
+        try:
+            user = authenticate(request, username=email, password=password)
+        except PasswordPoolSaturated:
+            return get_busy_response()
 
         if user is not None:
             # If the user is authenticated, log in the user and return a success response
             login(request, user)
+            # Clients may also send the token as `Authorization: Bearer`
             return get_api_response(
-                True, {"message": "Login successful"}, status.HTTP_200_OK
+                True,
+                {
+                    "message": "Login successful",
+                    "token": issue_token(user),
+                    "expires_in": settings.TOKEN_AUTHENTICATION.get("TTL", 86400),
+                },
+                status.HTTP_200_OK,
             )
         else:
             return get_api_response(
@@ -164,13 +237,15 @@ class LogoutAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
+        if isinstance(request.successful_authenticator, SignedTokenAuthentication):
+            revoke_token(request.auth)
         logout(request)
         return get_api_response(
             True, {"message": "Logout successful"}, status.HTTP_200_OK
         )
 
 
-class SearchUserAPIView(APIView):
+class SearchUserAPIView(PaginationModeMixin, APIView):
     """
     A view for searching users.
     """
@@ -178,6 +253,7 @@ class SearchUserAPIView(APIView):
     permission_classes = [IsAuthenticated]
     pagination_class = PageNumberPagination
     pagination_class.page_size = 10
+    cursor_pagination_class = EmailCursorPagination
 
     def get(self, request):
         """
@@ -185,7 +261,7 @@ class SearchUserAPIView(APIView):
         Retrieves the search query from the request object. If no query is provided, returns a bad request response.
         Filters the User queryset based on the search query, excluding the current user. Orders the results by email.
         Paginates the queryset using the pagination class specified.
-        Serializes the paginated queryset using the UserSerializer.
+        Serializes the paginated rows like the UserSerializer.
         Returns the paginated response.
         """
         search_query = request.GET.get("q")
@@ -199,22 +275,187 @@ class SearchUserAPIView(APIView):
         # Filter the queryset based on the search query
         # Excluding the current user as we should only see other users in search
         # Checking if we find the exact match first, if not we check for partial matches
-        users_queryset = User.objects.filter(Q(email__iexact=search_query)).exclude(
-            id=self.request.user.id  # type: ignore
+        # Users blocked either way are left out with subqueries of the same query
+        users_queryset = exclude_blocked(
+            get_exact_email_matches(search_query).exclude(
+                id=self.request.user.id  # type: ignore
+            ),
+            self.request.user.id,  # type: ignore
         )
 
         if not users_queryset.exists():
-            users_queryset = (
-                User.objects.filter(
-                    Q(email__icontains=search_query)
-                    | Q(first_name__icontains=search_query)
-                )
+            users_queryset = exclude_blocked(
+                search_users(search_query)
                 .exclude(id=self.request.user.id)  # type: ignore
-                .order_by("email")
+                .order_by("email"),
+                self.request.user.id,  # type: ignore
             )
 
-        paginator = self.pagination_class()
-        paginated_queryset = paginator.paginate_queryset(users_queryset, request)
+        paginator = self.get_paginator(request)
+        paginated_queryset = paginator.paginate_queryset(
+            users_queryset.values(*USER_VALUE_FIELDS), request
+        )
+
+        return paginator.get_paginated_response(serialize_users(paginated_queryset))
+
+
+class AsyncSearchUserAPIView(AsyncAPIView):
+    """
+    Async version of SearchUserAPIView, served when ASYNC_VIEWS is enabled.
+    """
+
+    cursor_pagination_class = EmailCursorPagination
+
+    async def get(self, request):
+        """
+        Handles GET requests for searching users, see SearchUserAPIView.
+        """
+        search_query = request.GET.get("q")
+        if not search_query:
+            return self.render(
+                {
+                    "success": False,
+                    "response": {"message": "Please enter email or name to search."},
+                },
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        users_queryset = await sync_to_async(exclude_blocked)(
+            get_exact_email_matches(search_query).exclude(id=request.user.id),
+            request.user.id,
+        )
+
+        if not await users_queryset.aexists():
+            users_queryset = await sync_to_async(exclude_blocked)(
+                search_users(search_query)
+                .exclude(id=request.user.id)
+                .order_by("email"),
+                request.user.id,
+            )
+
+        paginator = self.get_paginator(request)
+        paginated_queryset = await paginator.apaginate_queryset(
+            users_queryset.values(*USER_VALUE_FIELDS), request
+        )
+
+        return self.render(
+            paginator.get_paginated_response(serialize_users(paginated_queryset)).data
+        )
+
+
+class AutocompleteUserAPIView(APIView):
+    """
+    A view for autocompleting users by email or name prefix.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        A function to handle GET requests for autocompleting users.
+        Retrieves the prefix and optional limit from the request object. If no prefix is provided, returns a bad request response.
+        Looks the prefix up in the in-memory autocomplete index, excluding the current user.
+        Returns the top matches ordered by the matching email or name.
+        """
+        prefix = request.GET.get("prefix")
+        if not prefix:
+            return get_api_response(
+                False,
+                {"message": "Please enter prefix to search."},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        config = settings.USER_AUTOCOMPLETE
+        limit = request.GET.get("limit", "")
+        limit = int(limit) if limit.isdigit() else config["LIMIT"]
+        limit = max(1, min(limit, config["MAX_LIMIT"]))
+
+        # The user's blocks are only read for users who may have any, most
+        # lookups are answered from memory
+        index = get_autocomplete_index()
+        block_filter = get_block_filter()
+        if block_filter is not None:
+            may_have_blocks = block_filter.may_have_blocks(request.user.id)
+        else:
+            may_have_blocks = index.may_have_blocks(request.user.id)
+
+        results = index.search(
+            prefix,
+            limit,
+            exclude_user_id=request.user.id,
+            exclude_user_ids=(
+                get_blocked_ids(request.user.id) if may_have_blocks else ()
+            ),
+        )
+        return Response({"results": results})
+
+
+class ImportUsersAPIView(APIView):
+    """
+    A view for creating users in bulk, for admins only.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    # Accepted content types and the reader of each
+    CONTENT_TYPES = {
+        "text/csv": "csv",
+        "application/jsonl": "jsonl",
+        "application/x-ndjson": "jsonl",
+    }
+
+    def post(self, request):
+        """
+        A function to handle POST requests for importing users.
+        Streams the CSV or JSONL request body in batches without loading it whole, see
+        bulk_import.import_users, hashing passwords in the password pool.
+        Returns the number of users created, skipped and rejected and the first errors.
+        Bodies without a Content-Length are refused with a 411, bodies over
+        USER_IMPORT["MAX_UPLOAD_SIZE"] bytes or USER_IMPORT["MAX_ROWS"] rows with a 413.
+        """
+        input_format = self.CONTENT_TYPES.get(request.content_type.split(";")[0])
+        if input_format is None:
+            return get_api_response(
+                False,
+                {"message": "Please send text/csv or application/jsonl!"},
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+
+        # Chunked bodies have no length to check up front
+        content_length = request.META.get("CONTENT_LENGTH")
+        if not content_length:
+            return get_api_response(
+                False,
+                {"message": "Please send the Content-Length of the file!"},
+                status.HTTP_411_LENGTH_REQUIRED,
+            )
+
+        # Passwords are hashed within the request, larger files go through
+        # the import_users command
+        config = settings.USER_IMPORT
+        max_size = config.get("MAX_UPLOAD_SIZE")
+        max_rows = config.get("MAX_ROWS")
+        too_large_response = get_api_response(
+            False,
+            {"message": "Please import larger files with the import_users command!"},
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+        if max_size is not None and int(content_length) > max_size:
+            return too_large_response
+
+        lines = codecs.iterdecode(request.stream or [], "utf-8")
+        try:
+            rows = READERS[input_format](lines)
+            if max_rows is not None:
+                rows = list(islice(rows, max_rows + 1))
+                if len(rows) > max_rows:
+                    return too_large_response
+            result = import_users(rows, make_passwords)
+        except UnicodeDecodeError:
+            return get_api_response(
+                False,
+                {"message": "Please send UTF-8 encoded data!"},
+                status.HTTP_400_BAD_REQUEST,
+            )
 
-        serializer = UserSerializer(paginated_queryset, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        return get_api_response(True, result.as_dict(), status.HTTP_200_OK)
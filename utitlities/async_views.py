@@ -0,0 +1,98 @@
+from asgiref.sync import sync_to_async
+
+from django.views import View
+from django.http import HttpResponse
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    NotAuthenticated,
+)
+
+from .pagination import AsyncPageNumberPagination
+
+
+class AsyncAPIView(View):
+    """
+    Native async base view for authenticated read endpoints.
+
+    DRF views are synchronous, so under ASGI every request runs in a worker
+    thread. Subclasses implement `async def get(self, request)` with the
+    async ORM instead. Requests are authenticated with the configured DRF
+    authentication classes and responses are rendered with JSONRenderer, so
+    bodies, status codes and error messages match the equivalent APIView.
+    Only the authentication step runs in a thread, as Django 4.2 has no
+    async user lookup.
+    """
+
+    http_method_names = ["get", "head"]
+    renderer = JSONRenderer()
+    pagination_class = AsyncPageNumberPagination
+    cursor_pagination_class = None
+
+    def get_authenticators(self):
+        return [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+
+    def render(self, data, status_code=status.HTTP_200_OK, headers=None):
+        """
+        Returns `data` rendered as JSON, like a DRF Response.
+        """
+        return HttpResponse(
+            self.renderer.render(data),
+            status=status_code,
+            content_type="application/json",
+            headers=headers,
+        )
+
+    def handle_exception(self, request, exc):
+        """
+        Renders an APIException like DRF's exception handler.
+        """
+        headers = None
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            # 401 with a challenge if the first authenticator has one, as DRF
+            authenticators = request.authenticators
+            header = (
+                authenticators[0].authenticate_header(request)
+                if authenticators
+                else None
+            )
+            if header:
+                exc.status_code = status.HTTP_401_UNAUTHORIZED
+                headers = {"WWW-Authenticate": header}
+            else:
+                exc.status_code = status.HTTP_403_FORBIDDEN
+        return self.render({"detail": exc.detail}, exc.status_code, headers)
+
+    def get_paginator(self, request):
+        """
+        Returns the paginator for the pagination mode requested, see
+        PaginationModeMixin.
+        """
+        if (
+            self.cursor_pagination_class is not None
+            and request.query_params.get("pagination") == "cursor"
+        ):
+            return self.cursor_pagination_class()
+        return self.pagination_class()
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request, authenticators=self.get_authenticators())
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            return self.render(
+                {"detail": f'Method "{request.method}" not allowed.'},
+                status.HTTP_405_METHOD_NOT_ALLOWED,
+            )
+
+        try:
+            user = await sync_to_async(lambda: request.user)()
+            if not user.is_authenticated:
+                raise NotAuthenticated()
+            return await handler(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(request, exc)
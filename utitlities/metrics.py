@@ -0,0 +1,223 @@
+import weakref
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Type and help text of the metrics exported at /metrics
+METRICS = {
+    "http_request_duration_seconds": (
+        "histogram",
+        "Time spent processing requests, by URL name and method.",
+    ),
+    "http_requests_total": (
+        "counter",
+        "Requests processed, by URL name, method and status code.",
+    ),
+    "http_throttled_total": (
+        "counter",
+        "Requests rejected with 429 Too Many Requests, by URL name.",
+    ),
+    "db_queries_total": ("counter", "Database queries run, by URL name."),
+    "db_query_duration_seconds_total": (
+        "counter",
+        "Time spent running database queries, by URL name.",
+    ),
+    "cache_requests_total": (
+        "counter",
+        "Cache lookups, by cache and result (hit, local_hit, shared_hit or miss).",
+    ),
+    "block_filter_checks_total": (
+        "counter",
+        "Block checks, by result (negative, false_positive or blocked).",
+    ),
+    "friend_request_retention_total": (
+        "counter",
+        "Friend requests removed by retention, by status (expired or rejected).",
+    ),
+    "friend_request_retention_batch_seconds": (
+        "histogram",
+        "Time spent archiving and deleting one batch of friend requests.",
+    ),
+    "password_hash_seconds": (
+        "histogram",
+        "Time spent hashing or checking passwords, by operation.",
+    ),
+    "password_pool_rejected_total": (
+        "counter",
+        "Password operations rejected with 503, by reason (queue_full or timeout).",
+    ),
+}
+
+
+def get_label_key(labels):
+    """
+    Returns the label pairs sorted by name, with string values.
+    """
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def merge_shard(total, shard):
+    """
+    Adds the counters and histograms of a shard to `total`, copying the
+    shard's dicts before reading them.
+    """
+    counters = total["counters"]
+    for key, value in dict(shard["counters"]).items():
+        counters[key] = counters.get(key, 0) + value
+    histograms = total["histograms"]
+    for key, histogram in dict(shard["histograms"]).items():
+        summed = histograms.setdefault(key, [0] * len(histogram))
+        for position, value in enumerate(list(histogram)):
+            summed[position] += value
+
+
+def retire_shard(lock, shards, base, shard):
+    # Runs once the thread owning the shard has ended, so nothing writes it
+    with lock:
+        merge_shard(base, shard)
+        shards.remove(shard)
+
+
+class ShardOwner:
+    """
+    Kept in a thread's local storage, collected when the thread ends.
+    """
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms aggregated per process.
+
+    Every thread writes to its own shard, so recording a value takes no lock:
+    a shard is only ever modified by the thread that owns it. Shards are
+    summed when the metrics are collected, which copies each shard's dicts
+    before reading them. When a thread ends its shard is folded into a base
+    shard, so short-lived threads do not leave a shard each behind.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._base = {"counters": {}, "histograms": {}}
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _get_shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {"counters": {}, "histograms": {}}
+            owner = self._local.owner = ShardOwner()
+            # Taken once per thread, never while recording
+            with self._shards_lock:
+                self._shards.append(shard)
+            weakref.finalize(
+                owner, retire_shard, self._shards_lock, self._shards, self._base, shard
+            )
+            return shard
+
+    def increment(self, name, amount=1, **labels):
+        """
+        Adds `amount` to a counter.
+        """
+        counters = self._get_shard()["counters"]
+        key = (name, get_label_key(labels))
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """
+        Records a value in a histogram.
+        """
+        histograms = self._get_shard()["histograms"]
+        key = (name, get_label_key(labels))
+        histogram = histograms.get(key)
+        if histogram is None:
+            # One count per bucket, one for +Inf, then the sum of values
+            histogram = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect_left(self.buckets, value)] += 1
+        histogram[-1] += value
+
+    def collect(self):
+        """
+        Returns the counters and histograms summed over all threads.
+        """
+        total = {"counters": {}, "histograms": {}}
+        # Held while summing, so a shard being retired is counted once
+        with self._shards_lock:
+            for shard in [self._base, *self._shards]:
+                merge_shard(total, shard)
+        return total["counters"], total["histograms"]
+
+    def render(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        counters, histograms = self.collect()
+        samples = {}
+        for (name, labels), value in sorted(counters.items()):
+            samples.setdefault(name, []).append((name, labels, value))
+        bounds = [str(bucket) for bucket in self.buckets] + ["+Inf"]
+        for (name, labels), histogram in sorted(histograms.items()):
+            lines = samples.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(bounds, histogram):
+                cumulative += count
+                lines.append((f"{name}_bucket", labels + (("le", bound),), cumulative))
+            lines.append((f"{name}_sum", labels, histogram[-1]))
+            lines.append((f"{name}_count", labels, cumulative))
+
+        output = []
+        for name in sorted(samples):
+            if name in METRICS:
+                metric_type, help_text = METRICS[name]
+                output.append(f"# HELP {name} {help_text}")
+                output.append(f"# TYPE {name} {metric_type}")
+            for sample_name, labels, value in samples[name]:
+                output.append(f"{sample_name}{format_labels(labels)} {value}")
+        return "\n".join(output) + "\n"
+
+
+def format_labels(labels):
+    """
+    Formats label pairs as {name="value",...}, escaping the values.
+    """
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Returns the process-wide metrics registry.
+    """
+    global _registry
+
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry(
+                    settings.METRICS.get("BUCKETS", DEFAULT_BUCKETS)
+                )
+    return _registry
+
+
+def reset_metrics():
+    """
+    Drops the process-wide registry and all recorded values.
+    """
+    global _registry
+    _registry = None
@@ -0,0 +1,191 @@
+import json
+import time
+import threading
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.db import connection
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import get_metrics
+
+# Request fields never written to a trace, the replay fills in its own value
+REDACTED_FIELDS = {"password"}
+
+
+class TrafficRecorderMiddleware:
+    """
+    Appends every request to a JSONL trace for `benchmarks.replay`.
+
+    Each line holds the method, full path, email of the authenticated user,
+    JSON body, response status and elapsed milliseconds. Passwords are
+    replaced by null. Enabled with `TRAFFIC_RECORDER["ENABLED"]`.
+    """
+
+    def __init__(self, get_response):
+        config = settings.TRAFFIC_RECORDER
+        if not config.get("ENABLED"):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.path = config["PATH"]
+        self.max_body_size = config.get("MAX_BODY_SIZE", 65536)
+        self._lock = threading.Lock()
+
+    def get_data(self, request):
+        """
+        Returns the JSON body of the request with passwords redacted, or None.
+        """
+        if request.content_type != "application/json" or not request.body:
+            return None
+        if len(request.body) > self.max_body_size:
+            return None
+
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return None
+        if isinstance(data, dict):
+            data = {
+                key: None if key in REDACTED_FIELDS else value
+                for key, value in data.items()
+            }
+        return data
+
+    def __call__(self, request):
+        # The body must be read before the view consumes the stream
+        data = self.get_data(request)
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        user = getattr(request, "user", None)
+        entry = {
+            "method": request.method,
+            "path": request.get_full_path(),
+            "user": user.email if user is not None and user.is_authenticated else None,
+            "data": data,
+            "status": response.status_code,
+            "elapsed_ms": round(elapsed * 1000, 3),
+        }
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a") as trace:
+                trace.write(line)
+
+        return response
+
+
+class QueryCountMiddleware:
+    """
+    Adds the number of database queries run for a request as the
+    `X-Query-Count` response header, read by `benchmarks.replay` when it
+    targets a running server. Enabled with `QUERY_COUNT_HEADER`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_COUNT_HEADER:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            response = self.get_response(request)
+
+        response["X-Query-Count"] = str(queries)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, status and database queries of every request for
+    the /metrics endpoint, labelled with the URL name of the view. Enabled
+    with `METRICS["ENABLED"]`.
+
+    Supports both sync and async requests, so that async views are not
+    pushed to a thread under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS.get("ENABLED"):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, timer)
+        return response
+
+    def record(self, request, response, elapsed, timer):
+        resolver_match = request.resolver_match
+        view = resolver_match.url_name if resolver_match else None
+        view = view or "unmatched"
+
+        metrics = get_metrics()
+        metrics.observe(
+            "http_request_duration_seconds",
+            elapsed,
+            view=view,
+            method=request.method,
+        )
+        metrics.increment(
+            "http_requests_total",
+            view=view,
+            method=request.method,
+            status=response.status_code,
+        )
+        if response.status_code == 429:
+            metrics.increment("http_throttled_total", view=view)
+        if timer.queries:
+            metrics.increment("db_queries_total", timer.queries, view=view)
+            metrics.increment(
+                "db_query_duration_seconds_total", timer.seconds, view=view
+            )
+
+
+class QueryTimer:
+    """
+    Database execute wrapper counting queries and the time spent in them.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += time.perf_counter() - started
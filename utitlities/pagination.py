@@ -0,0 +1,164 @@
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    CursorPagination,
+    PageNumberPagination,
+    _reverse_ordering,
+)
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """
+    Page-number pagination that can also fetch a page with the async ORM.
+
+    Pages, links and error messages are the same as PageNumberPagination.
+    """
+
+    page_size = 10
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        Async counterpart of `paginate_queryset`, without the browsable API
+        page controls.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Replaces the cached count property, which would run COUNT(*) sync
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        bottom = (number - 1) * page_size
+        object_list = [row async for row in queryset[bottom : bottom + page_size]]
+        self.page = Page(object_list, number, paginator)
+        return object_list
+
+
+class AsyncCursorPagination(CursorPagination):
+    """
+    Cursor pagination that can also fetch a page with the async ORM.
+
+    Cursors are interchangeable with the ones of the sync views.
+    """
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        Async counterpart of `CursorPagination.paginate_queryset`, which it
+        follows step by step apart from fetching the rows.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, None)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = (0, False, None)
+        else:
+            offset, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        # Keyset filter on the first ordering field, nulls are kept where
+        # they sort after the position
+        if str(current_position) != "None":
+            order = self.ordering[0]
+            is_reversed = order.startswith("-")
+            order_attr = order.lstrip("-")
+
+            if self.cursor.reverse != is_reversed:
+                kwargs = {order_attr + "__lt": current_position}
+            else:
+                kwargs = {order_attr + "__gt": current_position}
+
+            filter_query = Q(**kwargs)
+            if (reverse and not is_reversed) or is_reversed:
+                filter_query |= Q(**{order_attr + "__isnull": True})
+            queryset = queryset.filter(filter_query)
+
+        # One extra row tells whether a following page exists
+        results = [row async for row in queryset[offset : offset + self.page_size + 1]]
+        self.page = list(results[: self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        return self.page
+
+
+class EmailCursorPagination(AsyncCursorPagination):
+    """
+    Keyset pagination ordered by email, used by user list endpoints.
+    """
+
+    page_size = 10
+    ordering = "email"
+
+
+class CreatedAtCursorPagination(AsyncCursorPagination):
+    """
+    Keyset pagination ordered by newest first, used by friend request lists.
+    """
+
+    page_size = 10
+    ordering = ("-created_at", "id")
+
+
+class PaginationModeMixin:
+    """
+    Lets a list view serve either page-number or cursor pagination.
+
+    Page-number pagination stays the default for existing clients, clients
+    opt in to cursor pagination with `?pagination=cursor`. Cursor mode skips
+    the COUNT(*) query and returns opaque `next`/`previous` cursors.
+    """
+
+    cursor_pagination_class = None
+
+    def get_paginator(self, request):
+        """
+        Returns the paginator instance for the pagination mode requested.
+        """
+        if (
+            self.cursor_pagination_class is not None
+            and request.query_params.get("pagination") == "cursor"
+        ):
+            return self.cursor_pagination_class()
+        return self.pagination_class()
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from .metrics import get_metrics
+
+
+def metrics_view(request):
+    """
+    Exports the metrics of this process in the Prometheus text format, to
+    staff users and the addresses of `METRICS["ALLOWED_IPS"]`.
+    """
+    config = settings.METRICS
+    if not config.get("ENABLED"):
+        raise Http404
+
+    if not (
+        request.user.is_staff
+        or request.META.get("REMOTE_ADDR") in config.get("ALLOWED_IPS", ())
+    ):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        get_metrics().render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )